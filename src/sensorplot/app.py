@@ -1,34 +1,71 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
+import numpy as np
+import matplotlib
 import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from plotly.colors import qualitative, hex_to_rgb
 import re
-import os
-import tempfile
 import io
-import concurrent.futures
-import threading
 from pathlib import Path
 from datetime import datetime
+from pandas.tseries.frequencies import to_offset
 
 # Import kjernefunksjonalitet
-from sensorplot.core import last_og_rens_data, vask_data, SensorResult
-
-# Lås for å håndtere delt tilgang til fil-cachen i tråder
-cache_lock = threading.Lock()
-
-
-def save_uploaded_file(uploaded_file):
-    """Lagrer opplastet fil midlertidig."""
-    try:
-        suffix = Path(uploaded_file.name).suffix
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(uploaded_file.getvalue())
-            return tmp.name
-    except Exception as e:
-        st.error(f"Feil ved lagring av fil: {e}")
-        return None
+from sensorplot.core import (FIGSIZE, figurstorrelse, flagg_resultat, grupper_paneler, gyldige_rader, lag_paneler,
+                             last_og_rens_data, tegn_serie, tolk_panel, x_locator, Rensing, SensorResult)
+from sensorplot.export import EXCEL_PRESETS, excel_format, write_excel
+from sensorplot.stats import STATS_SUFFIX, compute_stats
+from sensorplot.stitch import OVERLAP_POLICIES, DEFAULT_OVERLAP, consolidate_results
+from sensorplot.window import tolk_tidsgrense
+from sensorplot.formula import expand_template, parse_template
+from sensorplot.interval import AUTO, index_from_labels, parse_tolerance, segment_index, with_breaks
+from sensorplot.pipeline import CancelToken, SeriesJob, SeriesPipeline, STAGES, DEFAULT_WORKERS, group_families
+from sensorplot.memcache import SharedCache, budget_from_env, cache_key, content_hash
+from sensorplot.pyramid import DEFAULT_BUDGET, Pyramid, overview
+
+# Over så mange punkter i ett spor bruker vi WebGL (go.Scattergl) i stedet for SVG
+WEBGL_THRESHOLD = 100_000
+
+HOVER_DEFAULT = '%{y:.2f}<br>%{x|%d.%m.%Y %H:%M}'
+# Kortere mal for store spor: nettleseren slipper å bygge en stor felles boks
+HOVER_LARGE = '%{x|%d.%m.%Y %H:%M}: %{y:.2f}'
+# Høyde per panel (piksler) i det interaktive plottet
+PANEL_HEIGHT_PX = 300
+# Periodene i statistikktabellen (kortformene i sensorplot.stats.PERIODS)
+STATS_PERIODS = {'D': 'Døgn', 'W': 'Uke', 'M': 'Måned', 'Y': 'År'}
+# Visningsnavn for formatene i Excel-eksporten (sensorplot.export.EXCEL_PRESETS)
+EXCEL_PRESET_NAMES = {'no': 'Norsk (dato og tid)', 'iso': 'ISO (én tidskolonne)'}
+
+
+
+@st.cache_resource
+def get_shared_cache() -> SharedCache:
+    """Én cache per prosess, delt av alle økter (budsjett fra $SENSORPLOT_SHARED_CACHE_MB)."""
+    return SharedCache(budget_from_env())
+
+
+def upload_hash(uploaded_file) -> str:
+    """Innholdshash for en opplastet fil. Regnes ut én gang per opplasting, ikke per rerun."""
+    hashes = st.session_state.setdefault('upload_hashes', {})
+    if uploaded_file.file_id not in hashes:
+        hashes[uploaded_file.file_id] = content_hash(uploaded_file.getvalue())
+    return hashes[uploaded_file.file_id]
+
+
+def show_cache_metrics(cache: SharedCache) -> None:
+    """Treff/bom og minnebruk for den delte cachen."""
+    stats = cache.stats()
+    c1, c2 = st.columns(2)
+    c1.metric("Treff", f"{stats.hits}", help=f"Bom: {stats.misses}")
+    c2.metric("Treffrate", f"{stats.hit_rate:.0%}")
+    st.caption(f"{stats.entries} objekter, {stats.bytes / 2**20:.0f} av {stats.budget / 2**20:.0f} MB. "
+               f"Kastet ut: {stats.evictions}.")
+    if st.button("Tøm cache", key="clear_shared_cache"):
+        cache.clear()
 
 
 def sanitize_filename(title):
@@ -52,7 +89,7 @@ def run_app() -> None:
     with st.sidebar:
         st.header("1. Dataflyt")
         uploaded_files = st.file_uploader(
-            "Last opp filer (.xlsx / .csv)", accept_multiple_files=True)
+            "Last opp filer (.xlsx / .csv, også .gz / .zip)", accept_multiple_files=True)
 
         file_registry = {}
         if uploaded_files:
@@ -66,9 +103,8 @@ def run_app() -> None:
                     alias = st.text_input(
                         uf.name, value=clean_name, key=f"alias_{uf.name}", label_visibility="collapsed")
 
-                temp_path = save_uploaded_file(uf)
-                if temp_path:
-                    file_registry[alias] = {'path': temp_path, 'name': uf.name}
+                # Filen leses rett fra opplastingsbufferet, uten midlertidig kopi på disk
+                file_registry[alias] = {'source': uf, 'name': uf.name, 'hash': upload_hash(uf)}
 
         st.divider()
         st.header("2. Konfigurasjon")
@@ -78,28 +114,80 @@ def run_app() -> None:
             col_data = st.text_input("Data", value="ch1")
             if col_time and col_time.lower() == "none":
                 col_time = None
+            overlap = st.selectbox(
+                "Overlapp ved sammenslåing", OVERLAP_POLICIES,
+                index=OVERLAP_POLICIES.index(DEFAULT_OVERLAP),
+                help="Hvordan overlappende tidsrom håndteres når flere formler har samme navn.")
+            tolerance_text = st.text_input(
+                "Toleranse ved sammenslåing", value=AUTO,
+                help="Maks tidsavstand mellom målinger som slås sammen (f.eks. 30s). "
+                     "'auto' velger ut fra måleintervallet til hver fil.")
+            try:
+                tolerance = parse_tolerance(tolerance_text)
+            except ValueError as e:
+                st.warning(str(e))
+                tolerance = None
+
+        with st.expander("Tidsvindu ved innlesing", expanded=False):
+            st.caption("Leser bare data i perioden. Spar tid på store filer.")
+            limit_period = st.checkbox("Begrens periode", value=False)
+            load_start, load_end = None, None
+            if limit_period:
+                c_from, c_to = st.columns(2)
+                with c_from:
+                    load_start = tolk_tidsgrense(st.date_input("Fra", value=None, format="DD.MM.YYYY"))
+                with c_to:
+                    load_end = tolk_tidsgrense(st.date_input("Til", value=None, format="DD.MM.YYYY"), slutt=True)
+
+        with st.expander("Parallellitet", expanded=False):
+            st.caption("Antall tråder per steg i beregningen.")
+            workers = {
+                stage: st.number_input(stage, min_value=1, max_value=32,
+                                       value=DEFAULT_WORKERS[stage], key=f"workers_{stage}")
+                for stage in STAGES
+            }
+
+        with st.expander("Ytelse i plott", expanded=False):
+            plot_budget = st.number_input(
+                "Maks punkter per serie", min_value=100, max_value=5_000_000, value=DEFAULT_BUDGET, step=500,
+                help="Lengre serier tegnes som min/max-bånd fra pyramideindeksen.")
+            webgl_threshold = st.number_input(
+                "WebGL fra antall punkter", min_value=1_000, max_value=10_000_000, value=WEBGL_THRESHOLD,
+                step=10_000, help="Spor med flere punkter tegnes med WebGL (Scattergl).")
+
+        with st.expander("Delt cache", expanded=False):
+            st.caption("Innleste filer og beregnede serier deles mellom alle brukere på serveren.")
+            show_cache_metrics(get_shared_cache())
 
     # --- HOVEDVINDU ---
+    z_score, clean_window = 3.0, None
     if file_registry:
         c1, c2 = st.columns([2, 1])
         with c1:
             st.subheader("3. Beregninger")
             formulas_input = st.text_area(
                 "Definer formler",
-                value="# Eks: Vannstand = L1.ch1 - B.ch1",
+                value="# Eks: Vannstand = L1.ch1 - B.ch1\n# Eget panel: [Trykk] Baro = B.ch1\n"
+                      "# Mal: {alias} = {alias}.ch1 - B.ch1 for alias in L*",
                 height=180
             )
         with c2:
             st.subheader("4. Visning")
             plot_title = st.text_input("Tittel", value="Sensoranalyse")
-            z_score = st.slider("Støyvask (Z-Score)", 1.0, 10.0, 3.0)
+            z_score = st.slider("Støyvask (Z-Score)", 1.0, 10.0, 3.0,
+                                help="Endres terskelen, regnes bare flaggene ut på nytt.")
+            clean_window = parse_clean_window(st.text_input(
+                "Glidende vindu for støyvask", placeholder="Eks: 1D (tomt = av)",
+                help="Flagger også lokale spikes mot glidende median i vinduet."))
             x_int = st.text_input(
                 "X-Akse Intervall (for PNG)", placeholder="Eks: 1M, 2W")
 
         if st.button("🚀 Generer Plott", type="primary", width="stretch"):
-            # Her kaller vi den multithreadede funksjonen
+            # Her kaller vi pipelinen (resultatene strømmes til et foreløpig plott)
             results = calculate_series(
-                formulas_input, file_registry, col_date, col_time, col_data, z_score)
+                formulas_input, file_registry, col_date, col_time, col_data, overlap,
+                start=load_start, end=load_end, workers=workers, live_title=plot_title,
+                tolerance=tolerance)
             if results:
                 st.session_state['sensor_results'] = results
                 st.session_state['sensor_title'] = plot_title
@@ -112,113 +200,210 @@ def run_app() -> None:
     # --- VISNING ---
     if 'sensor_results' in st.session_state:
         current_title = plot_title if plot_title else st.session_state['sensor_title']
+        results, pyramids, flagged = apply_cleaning(
+            st.session_state['sensor_results'], Rensing(z_score=z_score, vindu=clean_window))
+        if flagged:
+            st.caption(f"Støyvask: {flagged} målinger er flagget og vises ikke.")
         display_results_interface(
-            st.session_state['sensor_results'], current_title, x_int)
+            results, current_title, x_int, pyramids, budget=plot_budget, webgl_threshold=webgl_threshold,
+            columns=(col_date, col_time, col_data))
+
+
+def parse_clean_window(text):
+    """Vinduet fra tekstfeltet ('1D', '6h'), eller None hvis det er tomt eller ugyldig."""
+    text = (text or "").strip()
+    if not text:
+        return None
+    try:
+        to_offset(text)
+    except ValueError:
+        st.warning(f"Ugyldig vindu '{text}'. Bruk f.eks. 1D eller 6h.")
+        return None
+    return text
+
+
+def apply_cleaning(results, rensing):
+    """
+    Flagger de beregnede seriene etter gjeldende støyvask. Verdiene er uendret, så en ny
+    terskel gir bare nye flagg (og pyramider), uten ny innlesing og sammenslåing.
+    Huskes i økten, så en rerun med samme innstillinger ikke gjør noe.
+
+    Returns:
+        tuple: (resultater med flaggkolonne, pyramider, antall flaggede målinger)
+    """
+    key = (st.session_state.get('plot_id'), rensing)
+    memo = st.session_state.get('sensor_cleaning')
+    if memo is not None and memo[0] == key:
+        return memo[1]
+
+    flagged, total = [], 0
+    for res in results:
+        df, count = flagg_resultat(res.df, rensing)
+        flagged.append(SensorResult(label=res.label, df=df, panel=res.panel))
+        total += count
+    value = (flagged, build_pyramids(flagged), total)
+    st.session_state['sensor_cleaning'] = (key, value)
+    return value
 
 
-def _process_single_line(line, file_registry, loaded_dfs, col_date, col_time, col_data, z_score):
+def build_pyramids(results):
     """
-    Hjelpefunksjon som kjøres i en egen tråd for hver formel.
-    Inneholder nå logikken for dynamiske kolonnenavn.
+    Bygger pyramideindeksen én gang per serie som er for lang til å tegnes rad for rad.
+    Bare målinger uten flagg tas med.
+    """
+    valid = {res.label: gyldige_rader(res.df) for res in results}
+    return {
+        label: Pyramid.from_series(df['Datetime'], df['Resultat'])
+        for label, df in valid.items() if len(df) > DEFAULT_BUDGET
+    }
+
+
+def _expand_line(line, file_registry):
+    """
+    Fyller ut en mal ('{alias} = {alias}.ch1 - Baro.ch1 for alias in L*') med alle alias
+    som passer. Gir (linje, mal, mål-alias); for vanlige linjer er mal og mål None.
+    """
+    if "=" not in line:
+        return [(line, None, None)]
+    label, formula = line.split("=", 1)
+    template = parse_template(formula)
+    if template is None:
+        return [(line, None, None)]
+    body, var, pattern = template
+    return [(f"{m_label} = {m_formula}", line, alias)
+            for m_label, m_formula, alias in expand_template(label.strip(), body, var, pattern, list(file_registry))]
+
+
+def _prepare_line(line, file_registry, col_data):
+    """
+    Tolker én formellinje ('Navn = formel') til en SeriesJob.
+    Returnerer None for linjer uten formel, eller {'error': ...} ved ukjente alias.
     """
     if "=" not in line:
         return None
 
     label, formula = line.split("=", 1)
-    label, formula = label.strip(), formula.strip()
+    # '[Panel] Navn = formel' legger serien i et eget panel
+    label, panel = tolk_panel(label)
+    formula = formula.strip()
 
-    formula = re.sub(r'(\d+),(\d+)', r'\1.\2', formula)
+    # Desimalkomma (9,81 -> 9.81), men ikke komma mellom funksjonsargumenter som 'L1.ch1,2'
+    formula = re.sub(r'(?<![\w.])(\d+),(\d+)', r'\1.\2', formula)
 
     # --- ENDRING: Dynamisk sjekk for Alias.DittKolonneNavn ---
     safe_col_name = re.escape(col_data)
     pattern_aliases = rf'\b([a-zA-Z0-9_\-æøåÆØÅ]+)\.{safe_col_name}\b'
-    needed = re.findall(pattern_aliases, formula)
+    needed = list(dict.fromkeys(re.findall(pattern_aliases, formula)))
 
     if not needed:
         return None
 
-    current_dfs = []
-
-    # Lasting av filer (Thread-safe cache tilgang)
     for alias in needed:
         if alias not in file_registry:
             return {'error': f"Mangler alias: {alias} i formel '{label}'"}
 
-        # Sjekk cache først (med lås for lesing/skriving)
-        already_loaded = False
-        with cache_lock:
-            if alias in loaded_dfs:
-                current_dfs.append(loaded_dfs[alias])
-                already_loaded = True
-
-        if not already_loaded:
-            try:
-                # Tung operasjon: Lese fil
-                # Bruker lås for å unngå race condition ved lasting
-                with cache_lock:
-                    if alias not in loaded_dfs:  # Dobbeltsjekk
-                        loaded_dfs[alias] = last_og_rens_data(
-                            file_registry[alias]['path'], alias, col_date, col_time, col_data
-                        )
-                    current_dfs.append(loaded_dfs[alias])
-            except Exception as e:
-                return {'error': f"Feil i fil {alias}: {e}"}
-
-    # Beregning
-    try:
-        merged = current_dfs[0]
-        for o in current_dfs[1:]:
-            merged = pd.merge_asof(
-                merged, o, on='Datetime', direction='nearest', tolerance=pd.Timedelta('10min'))
-
-        # --- ENDRING: Erstatt Alias.Kolonne med `Alias.Kolonne` (backticks) for eval ---
-        safe_f = re.sub(
-            rf'\b([a-zA-Z0-9_\-æøåÆØÅ]+\.{safe_col_name})\b', r'`\1`', formula)
-
-        result = merged.eval(safe_f, engine='python')
-
-        if isinstance(result, (tuple, list)):
-            return {'error': f"Feil i formel '{label}': Resultat ble liste/tuple."}
+    # --- ENDRING: Erstatt Alias.Kolonne med `Alias.Kolonne` (backticks) for eval ---
+    safe_f = re.sub(
+        rf'\b([a-zA-Z0-9_\-æøåÆØÅ]+\.{safe_col_name})\b', r'`\1`', formula)
 
-        merged['Resultat'] = result
-        merged, _ = vask_data(merged, 'Resultat', z_score)
+    return SeriesJob(label=label, formula=formula, expression=safe_f, aliases=needed, engine='python',
+                     panel=panel)
 
-        return {'success': SensorResult(label=label, df=merged)}
-
-    except Exception as e:
-        return {'error': f"Beregningfeil '{label}': {e}"}
 
+def calculate_series(formulas_text, file_registry, col_date, col_time, col_data, overlap=DEFAULT_OVERLAP,
+                     start=None, end=None, workers=None, live_title=None, tolerance=None):
+    """
+    Kjører data-prosesseringen i en pipeline med trådpooler per steg.
 
-def calculate_series(formulas_text, file_registry, col_date, col_time, col_data, z_score):
-    """Kjører data-prosesseringen parallelt med tråder."""
+    Resultatene vises fortløpende i et foreløpig plott etter hvert som hver serie blir
+    ferdig. Trykker brukeren på knappen igjen, avbrytes en tidligere kjøring.
+    Støyvask gjøres ikke her, men som flagg ved visning (se apply_cleaning).
+    Uten `tolerance` velges toleransen ved sammenslåing ut fra måleintervallet til hver fil.
+    """
     lines = [line.strip() for line in formulas_text.split(
         '\n') if line.strip() and not line.strip().startswith("#")]
     if not lines:
         st.warning("Ingen formler definert.")
         return None
 
-    loaded_dfs = {}
-    raw_results = []
+    jobs = []
     errors = []
+    for line in lines:
+        for expanded, template, target in _expand_line(line, file_registry):
+            job = _prepare_line(expanded, file_registry, col_data)
+            if isinstance(job, SeriesJob):
+                job.template, job.target = template, target
+                jobs.append(job)
+            elif job:
+                errors.append(job['error'])
+
+    # Avbryt en eventuell tidligere kjøring som fortsatt går i bakgrunnen
+    previous_token = st.session_state.get('pipeline_token')
+    if previous_token:
+        previous_token.cancel()
+    token = CancelToken()
+    st.session_state['pipeline_token'] = token
+
+    cache = get_shared_cache()
+    settings = [col_date, col_time, col_data, start, end]
+
+    def loader(alias):
+        # Tung operasjon: Lese fil. Pipelinen sørger for at hvert alias bare lastes én gang,
+        # og den delte cachen at samme fil bare leses én gang for alle økter.
+        info = file_registry[alias]
+
+        def load():
+            return last_og_rens_data(info['source'], alias, col_date, col_time, col_data, start=start, end=end)
+
+        if info.get('hash') is None:
+            return load()
+        df = cache.get_or_compute(cache_key('fil', info['hash'], *settings), load).copy(deep=False)
+        df.columns = ['Datetime', f'{alias}.{col_data}']
+        return df
+
+    def series_key(job):
+        hashes = [(a, file_registry[a].get('hash')) for a in job.aliases]
+        if any(h is None for _, h in hashes):
+            return None
+        return cache_key('serie', job.label, job.expression, job.engine, hashes, *settings, tolerance)
+
+    # Serier som allerede er beregnet (av denne eller en annen økt) hentes fra cachen
+    raw_results = []
+    pending, keys = [], {}
+    for job in jobs:
+        key = series_key(job)
+        cached = cache.get(key) if key else None
+        if cached is not None:
+            raw_results.append(SensorResult(label=job.label, df=cached.df, panel=job.panel))
+        else:
+            pending.append(job)
+            keys[id(job)] = key
+
+    pipeline = SeriesPipeline(loader, workers=workers, token=token, tolerance=tolerance)
 
-    with st.spinner("Leser filer og beregner (Multithreaded)..."):
-        # Bruk ThreadPoolExecutor for å kjøre linjene parallelt
-        with concurrent.futures.ThreadPoolExecutor() as executor:
-            # Start alle oppgaver
-            futures = [
-                executor.submit(_process_single_line, line, file_registry,
-                                loaded_dfs, col_date, col_time, col_data, z_score)
-                for line in lines
-            ]
-
-            # Samle resultater etter hvert som de blir ferdige
-            for future in concurrent.futures.as_completed(futures):
-                res = future.result()
-                if res:
-                    if 'success' in res:
-                        raw_results.append(res['success'])
-                    elif 'error' in res:
-                        errors.append(res['error'])
+    progress = st.progress(0.0, text="Leser filer og beregner...")
+    live_plot = st.empty()
+    completed = False
+    try:
+        for i, res in enumerate(pipeline.run(group_families(pending)),
+                                start=len(jobs) - len(pending) + 1):
+            progress.progress(i / max(len(jobs), 1), text=f"Ferdig med {i} av {len(jobs)} serier")
+            if res.error:
+                errors.append(res.error)
+                continue
+            raw_results.append(res.result)
+            if keys.get(id(res.job)):
+                cache.put(keys[id(res.job)], res.result)
+            # Strøm delresultatet til det foreløpige plottet
+            with live_plot.container():
+                plot_interactive_plotly(
+                    consolidate_results(raw_results, overlap=overlap), live_title or "", key=f"live_{i}")
+        completed = not token.cancelled
+    finally:
+        if not completed:
+            # Skriptet ble avbrutt (f.eks. ny knappetrykk), stopp arbeidet i bakgrunnen
+            token.cancel()
+        progress.empty()
 
     # Vis alle feilmeldinger i hovedtråden
     for err in errors:
@@ -226,41 +411,28 @@ def calculate_series(formulas_text, file_registry, col_date, col_time, col_data,
 
     if raw_results:
         # Konsolidering (Slå sammen serier med samme navn)
-        consolidated = {}
-        for r in raw_results:
-            if r.label not in consolidated:
-                consolidated[r.label] = []
-            consolidated[r.label].append(r.df)
-
-        final_results = []
-        for lbl, dfs in consolidated.items():
-            if len(dfs) == 1:
-                final_results.append(SensorResult(label=lbl, df=dfs[0]))
-            else:
-                final_results.append(SensorResult(
-                    label=lbl, df=pd.concat(dfs).sort_values('Datetime')))
-
-        # Rydd opp temp filer
-        for info in file_registry.values():
-            if os.path.exists(info['path']):
-                try:
-                    os.remove(info['path'])
-                except:
-                    pass
+        final_results = consolidate_results(raw_results, overlap=overlap)
+        order = [job.label for job in jobs]
+        final_results.sort(key=lambda r: order.index(r.label))
 
         return final_results
 
     return None
 
 
-def display_results_interface(results, title, x_interval):
-    """Viser slider, plot og nedlastingsknapp."""
+def display_results_interface(results, title, x_interval, pyramids=None,
+                              budget=DEFAULT_BUDGET, webgl_threshold=WEBGL_THRESHOLD, columns=('Date', 'Time', 'ch1')):
+    """
+    Viser slider, plot og nedlastingsknapper. `columns` (dato, tid, data) er kolonnenavnene
+    i Excel-eksporten, slik at filen kan lastes opp igjen med samme innstillinger.
+    """
     all_datetimes = []
     for res in results:
         if not res.df.empty:
             all_datetimes.append(res.df['Datetime'])
 
     filtered_results = results
+    window = (None, None)
 
     st.divider()
 
@@ -287,22 +459,26 @@ def display_results_interface(results, title, x_interval):
 
             filtered_results = []
             start_filter, end_filter = val_range
+            window = (start_filter, end_filter)
             for res in results:
-                mask = (res.df['Datetime'] >= start_filter) & (
-                    res.df['Datetime'] <= end_filter)
-                filtered_df = res.df.loc[mask]
+                # Seriene er tidssortert, så vinduet finnes med binærsøk
+                times = res.df['Datetime']
+                lo = times.searchsorted(start_filter, side='left')
+                hi = times.searchsorted(end_filter, side='right')
+                filtered_df = res.df.iloc[lo:hi]
                 if not filtered_df.empty:
                     filtered_results.append(SensorResult(
-                        label=res.label, df=filtered_df))
+                        label=res.label, df=filtered_df, panel=res.panel))
 
     st.subheader("📊 Interaktiv Analyse")
-    plot_interactive_plotly(filtered_results, title)
+    plot_interactive_plotly(filtered_results, title, pyramids=pyramids, window=window,
+                            budget=budget, webgl_threshold=webgl_threshold)
 
     st.divider()
-    col_dl, _ = st.columns([1, 2])
+    col_dl, col_xl, _ = st.columns([1, 1, 1])
     with col_dl:
         png_buffer = generate_static_matplotlib(
-            filtered_results, title, x_interval)
+            filtered_results, title, x_interval, pyramids=pyramids)
         safe_name = sanitize_filename(title)
 
         st.download_button(
@@ -312,72 +488,205 @@ def display_results_interface(results, title, x_interval):
             mime="image/png",
             width="stretch"
         )
+    with col_xl:
+        show_excel_download(filtered_results, title, columns)
+
+    show_stats_table(filtered_results, window, title)
+
+
+def show_excel_download(results, title, columns):
+    """
+    Nedlasting av seriene i tidsvinduet som .xlsx (ett ark per serie). Filen lages først
+    når knappen trykkes, og skrives strømmende (se sensorplot.export.write_excel).
+    """
+    c_fmt, c_dec = st.columns(2)
+    with c_fmt:
+        preset = st.selectbox("Excel-format", list(EXCEL_PRESETS), format_func=EXCEL_PRESET_NAMES.get)
+    with c_dec:
+        decimals = st.number_input("Desimaler", min_value=0, max_value=10, value=None,
+                                   placeholder="auto", help="Antall desimaler som vises i Excel.")
+    fmt = excel_format(preset, None if decimals is None else int(decimals))
+    col_date, col_time, col_data = columns
+
+    def build():
+        buffer = io.BytesIO()
+        write_excel(results, buffer, fmt, col_date=col_date, col_time=col_time, col_data=col_data)
+        return buffer.getvalue()
+
+    st.download_button(
+        label="📗 Last ned Excel",
+        data=build,
+        file_name=f"{Path(sanitize_filename(title)).stem}.xlsx",
+        mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+        disabled=not results,
+        width="stretch"
+    )
+
+
+def show_stats_table(results, window, title):
+    """
+    Tabell med min/max/snitt/persentiler og dekning per periode for seriene i tidsvinduet.
+    Beregnes fra de ferdige seriene (ingen ny innlesing) og huskes i økten.
+    """
+    with st.expander("📈 Statistikk per periode"):
+        period = st.selectbox("Periode", list(STATS_PERIODS), format_func=STATS_PERIODS.get,
+                              key=f"stats_period_{st.session_state.get('plot_id', 0)}")
+        # Resultatlisten fra støyvasken er den samme så lenge innstillingene er uendret
+        cleaning_key = (st.session_state.get('sensor_cleaning') or (None,))[0]
+        key = (cleaning_key, window, period)
+        memo = st.session_state.get('sensor_stats')
+        if memo is None or memo[0] != key:
+            memo = (key, compute_stats(results, period))
+            st.session_state['sensor_stats'] = memo
+        stats = memo[1]
+
+        st.dataframe(stats, width="stretch", hide_index=True)
+        st.download_button(
+            label="💾 Last ned statistikk (CSV)",
+            data=stats.to_csv(index=False).encode('utf-8'),
+            file_name=f"{Path(sanitize_filename(title)).stem}{STATS_SUFFIX}",
+            mime="text/csv",
+        )
 
 
-def plot_interactive_plotly(results, title):
-    fig = go.Figure()
-    for serie in results:
-        fig.add_trace(go.Scatter(
-            x=serie.df['Datetime'], y=serie.df['Resultat'],
-            mode='lines', name=serie.label,
-            hovertemplate='%{y:.2f}<br>%{x|%d.%m.%Y %H:%M}'
-        ))
+def to_epoch_ms(times):
+    """
+    Tidsstempler som millisekunder siden epoch. Som float64-array sendes de som
+    base64-kodet typet array i stedet for én datotekst per punkt.
+    """
+    return pd.to_datetime(times).to_numpy(dtype='datetime64[ms]').astype('int64').astype('float64')
+
+
+def add_plotly_series(fig, serie, color, pyramid=None, window=(None, None), budget=DEFAULT_BUDGET,
+                      webgl_threshold=WEBGL_THRESHOLD, row=None):
+    """
+    Legger til én serie. Lange serier tegnes som min/max-bånd + snitt fra
+    pyramiden, slik at nettleseren bare får ca. `budget` punkter.
+    Spor med flere punkter enn `webgl_threshold` tegnes med WebGL.
+    `row` er panelet (1-basert) i en figur fra make_subplots.
+    Linjene (og båndet) brytes ved hull i serien i stedet for å trekkes over dem.
+
+    Returns:
+        bool: True hvis serien ble tegnet med WebGL.
+    """
+    start, end = window
+    df = gyldige_rader(serie.df)
+    ov = overview(df, 'Resultat', start, end, budget, pyramid)
+    points = len(df) if ov is None else len(ov)
+    webgl = points > webgl_threshold
+    trace = go.Scattergl if webgl else go.Scatter
+    hover = HOVER_LARGE if webgl else HOVER_DEFAULT
+    cell = {} if row is None else {'row': row, 'col': 1}
+
+    if ov is None:
+        # Pyramiden har hullene for hele serien, så et utsnitt brytes på samme steder
+        segments = segment_index(df['Datetime'], None if pyramid is None else pyramid.gaps)
+        x, y = with_breaks(segments, to_epoch_ms(df['Datetime']), df['Resultat'])
+        fig.add_trace(trace(
+            x=x, y=y,
+            mode='lines', name=serie.label, line=dict(color=color),
+            hovertemplate=hover
+        ), **cell)
+        return webgl
+
+    segments = index_from_labels(ov['segment'])
+    x, low, high, mean = with_breaks(segments, to_epoch_ms(ov['Datetime']), ov['min'], ov['max'], ov['mean'])
+    r, g, b = hex_to_rgb(color)
+    fig.add_trace(trace(
+        x=x, y=high, mode='lines', line=dict(width=0),
+        legendgroup=serie.label, showlegend=False, hoverinfo='skip'
+    ), **cell)
+    fig.add_trace(trace(
+        x=x, y=low, mode='lines', line=dict(width=0),
+        fill='tonexty', fillcolor=f'rgba({r},{g},{b},0.25)',
+        legendgroup=serie.label, showlegend=False, hoverinfo='skip'
+    ), **cell)
+    fig.add_trace(trace(
+        x=x, y=mean, mode='lines', name=serie.label,
+        legendgroup=serie.label, line=dict(color=color),
+        customdata=np.column_stack([low, high]),
+        hovertemplate=hover + ' (%{customdata[0]:.2f} – %{customdata[1]:.2f})'
+    ), **cell)
+    return webgl
+
+
+def plot_interactive_plotly(results, title, key=None, pyramids=None, window=(None, None),
+                            budget=DEFAULT_BUDGET, webgl_threshold=WEBGL_THRESHOLD):
+    pyramids = pyramids or {}
+    colors = qualitative.Plotly
+    panels = grupper_paneler(results)
+    multi = len(panels) > 1
+    if multi:
+        # Ett panel per gruppe, med felles tidsakse (zoom i ett panel gjelder alle)
+        fig = make_subplots(rows=len(panels), cols=1, shared_xaxes=True, vertical_spacing=0.03)
+    else:
+        fig = go.Figure()
+
+    webgl = False
+    for row, (name, series) in enumerate(panels, start=1):
+        for i, serie in series:
+            webgl |= add_plotly_series(fig, serie, colors[i % len(colors)], pyramids.get(serie.label), window,
+                                       budget=budget, webgl_threshold=webgl_threshold,
+                                       row=row if multi else None)
+        if multi:
+            fig.update_yaxes(title_text=name or "Verdi", row=row, col=1)
 
     fig.update_layout(
-        title=title, xaxis_title="Tid", yaxis_title="Verdi",
-        hovermode="x unified", legend=dict(orientation="h", y=1.02, x=1),
+        title=title,
+        # "x unified" må lete gjennom alle spor ved hver musebevegelse; for store spor holder nærmeste punkt
+        hovermode="closest" if webgl else "x unified",
+        legend=dict(orientation="h", y=1.02, x=1),
         margin=dict(l=40, r=40, t=40, b=40), template="plotly_white"
     )
+    if multi:
+        fig.update_layout(height=PANEL_HEIGHT_PX * len(panels))
+    else:
+        fig.update_layout(xaxis_title="Tid", yaxis_title="Verdi")
+    # x-verdiene er epoch-millisekunder, så aksen må eksplisitt være en tidsakse
+    fig.update_xaxes(type='date')
 
     try:
-        st.plotly_chart(fig, width="stretch")
+        st.plotly_chart(fig, width="stretch", key=key)
     except TypeError:
-        st.plotly_chart(fig, use_container_width=True)
+        st.plotly_chart(fig, use_container_width=True, key=key)
 
 
-def generate_static_matplotlib(results, title, x_interval):
-    fig, ax = plt.subplots(figsize=(14, 7))
-    colors = plt.rcParams['axes.prop_cycle'].by_key()['color']
+def generate_static_matplotlib(results, title, x_interval, pyramids=None):
+    pyramids = pyramids or {}
+    # Egen figur uten pyplot: Streamlit kjører hver økt i sin egen tråd
+    fig = Figure(figsize=figurstorrelse(len(grupper_paneler(results))))
+    FigureCanvasAgg(fig)
+    panels = lag_paneler(fig, results)
+    colors = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
 
     has_data = False
-    for i, serie in enumerate(results):
-        if not serie.df.empty:
-            has_data = True
-            farge = colors[i % len(colors)]
-            ax.plot(serie.df['Datetime'], serie.df['Resultat'],
-                    label=serie.label, color=farge, linewidth=1.5, alpha=0.9)
-
-    ax.set_title(title, fontsize=16)
-    ax.set_ylabel("Verdi")
+    for ax, name, series in panels:
+        for i, serie in series:
+            if not serie.df.empty:
+                has_data = True
+                farge = colors[i % len(colors)]
+                # Budsjett: bredden i piksler ved 300 dpi
+                tegn_serie(ax, serie.df, serie.label, farge, budsjett=FIGSIZE[0] * 300,
+                           pyramid=pyramids.get(serie.label))
+        ax.set_ylabel(name or "Verdi")
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+
+    if len(panels) == 1:
+        panels[0][0].set_title(title, fontsize=16)
+    else:
+        fig.suptitle(title, fontsize=16)
 
     if has_data:
-        locator = None
-        if x_interval:
-            match = re.match(r'^(\d+)([DWMYdwmy])$', x_interval)
-            if match:
-                num = int(match.group(1))
-                unit = match.group(2).upper()
-                if unit == 'D':
-                    locator = mdates.DayLocator(interval=num)
-                elif unit == 'W':
-                    locator = mdates.WeekdayLocator(interval=num)
-                elif unit == 'M':
-                    locator = mdates.MonthLocator(interval=num)
-                elif unit == 'Y':
-                    locator = mdates.YearLocator(base=num)
-        if not locator:
-            locator = mdates.AutoDateLocator()
-        ax.xaxis.set_major_locator(locator)
-        ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y'))
+        # Felles tidsakse: locator og format settes én gang
+        ax_bottom = panels[-1][0]
+        ax_bottom.xaxis.set_major_locator(x_locator(x_interval))
+        ax_bottom.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y'))
         fig.autofmt_xdate()
 
-    ax.grid(True, alpha=0.3)
-    ax.legend()
-
     buf = io.BytesIO()
     fig.savefig(buf, format="png", dpi=300, bbox_inches='tight')
     buf.seek(0)
-    plt.close(fig)
     return buf
 
 
@@ -0,0 +1,158 @@
+import contextlib
+import fnmatch
+import gzip
+import io
+import logging
+import struct
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterator
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Komprimerte kilder som leses strømmende, uten å pakke ut til disk
+COMPRESSED_SUFFIXES = ('.gz', '.zst', '.zip')
+# Filtyper som kan ligge inni et arkiv eller en komprimert fil
+MEMBER_SUFFIXES = ('.csv', '.xlsx')
+# Standard for read_head: nok til header og noen datarader
+HEAD_BYTES = 64 * 1024
+
+
+def is_compressed(path) -> bool:
+    """True for .gz, .zst og .zip ('data.csv.gz', 'felt.zip')."""
+    return Path(str(path)).suffix.lower() in COMPRESSED_SUFFIXES
+
+
+def _zstd():
+    """zstandard er en valgfri avhengighet og trengs bare for .zst."""
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("Lesing av .zst krever pakken 'zstandard' (pip install zstandard).") from None
+    return zstandard
+
+
+# ==============================================================================
+#   MEDLEMMER I ZIP
+# ==============================================================================
+
+def select_member(names: list[str], member: str | None, path) -> str:
+    """
+    Velger ett medlem i et zip-arkiv.
+
+    `member` kan være det fulle navnet ('2024/L1.csv') eller et mønster ('*L1*.csv')
+    som treffer nøyaktig ett medlem. Uten `member` må arkivet ha nøyaktig én CSV/Excel-fil.
+    """
+    files = [n for n in names if not n.endswith('/')]
+    if member is not None:
+        if member in files:
+            return member
+        hits = [n for n in files if fnmatch.fnmatch(n, member) or fnmatch.fnmatch(Path(n).name, member)]
+    else:
+        hits = [n for n in files if Path(n).suffix.lower() in MEMBER_SUFFIXES]
+
+    if len(hits) == 1:
+        return hits[0]
+    if member is None:
+        if not hits:
+            raise FileNotFoundError(f"Fant ingen CSV/Excel-fil i {path}. Innhold: {files}")
+        raise ValueError(f"{path} har flere CSV/Excel-filer: {hits}. Velg én med 'member'.")
+    if not hits:
+        raise FileNotFoundError(f"Fant ikke '{member}' i {path}. Innhold: {files}")
+    raise ValueError(f"'{member}' passer med flere filer i {path}: {hits}.")
+
+
+def list_members(path, data: bytes | None = None) -> list[str]:
+    """Navnene på filene i et zip-arkiv (sti eller innhold i minnet)."""
+    with zipfile.ZipFile(path if data is None else io.BytesIO(data)) as zf:
+        return [n for n in zf.namelist() if not n.endswith('/')]
+
+
+def inner_suffix(path, member: str | None = None, data: bytes | None = None) -> str:
+    """
+    Filtypen til innholdet: 'data.csv.gz' -> '.csv', og for zip endelsen til medlemmet.
+    En .gz/.zst uten egen filtype foran ('data.gz') leses som CSV.
+    """
+    path = Path(str(path))
+    if path.suffix.lower() == '.zip':
+        return Path(select_member(list_members(path, data), member, path)).suffix.lower()
+    if member is not None:
+        raise ValueError(f"'member' gjelder bare zip-arkiver, ikke {path.name}")
+    return Path(path.stem).suffix.lower() or '.csv'
+
+
+# ==============================================================================
+#   STRØMMENDE LESING
+# ==============================================================================
+
+@contextlib.contextmanager
+def open_stream(path, member: str | None = None, data: bytes | None = None) -> Iterator[BinaryIO]:
+    """
+    Åpner innholdet i en komprimert fil som en binær strøm som pakkes ut mens den leses.
+
+    Strømmen kan bare leses forover. Den gis direkte til pandas, så hele filen
+    pakkes ut i én passering uten mellomlagring på disk.
+    Med `data` leses den komprimerte filen fra minnet; `path` gir da bare filtypen.
+    """
+    path = Path(str(path))
+    ext = path.suffix.lower()
+    with contextlib.ExitStack() as stack:
+        raw = io.BytesIO(data) if data is not None else stack.enter_context(open(path, 'rb'))
+        if ext == '.gz':
+            stream = stack.enter_context(gzip.GzipFile(fileobj=raw, mode='rb'))
+        elif ext == '.zst':
+            stream = stack.enter_context(_zstd().ZstdDecompressor().stream_reader(raw))
+        elif ext == '.zip':
+            zf = stack.enter_context(zipfile.ZipFile(raw))
+            name = select_member(zf.namelist(), member, path)
+            logger.debug(f"Leser {name} fra {path}")
+            stream = stack.enter_context(zf.open(name))
+        else:
+            raise ValueError(f"Ikke en komprimert fil: {path}")
+        yield stream
+
+
+def read_head(path, member: str | None = None, data: bytes | None = None, n: int = HEAD_BYTES) -> bytes:
+    """De første `n` utpakkede bytene. Bare starten av filen pakkes ut."""
+    with open_stream(path, member, data) as f:
+        chunks, left = [], n
+        # Strømmer kan gi færre bytes enn bedt om per kall
+        while left > 0:
+            chunk = f.read(left)
+            if not chunk:
+                break
+            chunks.append(chunk)
+            left -= len(chunk)
+    return b''.join(chunks)
+
+
+def read_member(path, member: str | None = None, data: bytes | None = None) -> bytes:
+    """Hele det utpakkede innholdet i minnet (for Excel, som trenger tilfeldig tilgang)."""
+    with open_stream(path, member, data) as f:
+        return f.read()
+
+
+def unpacked_size(path, member: str | None = None) -> int | None:
+    """
+    Utpakket størrelse uten å pakke ut: fra sentralkatalogen i zip, fra rammehodet
+    i zstd og fra de siste fire bytene i gzip (modulo 4 GB). None hvis ukjent.
+    """
+    path = Path(str(path))
+    ext = path.suffix.lower()
+    if ext == '.zip':
+        with zipfile.ZipFile(path) as zf:
+            return zf.getinfo(select_member(zf.namelist(), member, path)).file_size
+    if ext == '.gz':
+        with open(path, 'rb') as f:
+            f.seek(-4, io.SEEK_END)
+            return struct.unpack('<I', f.read(4))[0]
+    if ext == '.zst':
+        with open(path, 'rb') as f:
+            size = _zstd().frame_content_size(f.read(18))
+        return size if size >= 0 else None
+    return None
@@ -0,0 +1,130 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+ENV_CACHE_DIR = 'SENSORPLOT_CACHE_DIR'
+DEFAULT_CACHE_DIR = Path.home() / '.cache' / 'sensorplot'
+# Fingeravtrykket bruker størrelse + starten og slutten av filen. Loggerfiler
+# vokser i enden, så en ny eksport gir nesten alltid et nytt fingeravtrykk.
+FINGERPRINT_BLOCK = 64 * 1024
+# Cache-filer som verken er skrevet eller brukt på så mange dager slettes (se prune_cache)
+CACHE_MAX_AGE_DAYS = 90
+
+_pruned: set[Path] = set()
+_pruned_lock = threading.Lock()
+
+
+def cache_dir() -> Path:
+    """Mappen for sensorplot sine cacher ($SENSORPLOT_CACHE_DIR eller ~/.cache/sensorplot)."""
+    path = Path(os.environ.get(ENV_CACHE_DIR) or DEFAULT_CACHE_DIR)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def file_fingerprint(path: str | Path) -> str:
+    """
+    Billig fingeravtrykk av en fil: sha1 av størrelsen og de første og siste 64 KB.
+    Leser høyst 128 KB uansett filstørrelse.
+    """
+    path = Path(path)
+    size = path.stat().st_size
+    h = hashlib.sha1(str(size).encode())
+    with open(path, 'rb') as f:
+        h.update(f.read(FINGERPRINT_BLOCK))
+        if size > FINGERPRINT_BLOCK:
+            f.seek(max(FINGERPRINT_BLOCK, size - FINGERPRINT_BLOCK))
+            h.update(f.read(FINGERPRINT_BLOCK))
+    return h.hexdigest()
+
+
+def file_version(path: str | Path) -> str:
+    """
+    Fingeravtrykket pluss endringstidspunktet (st_mtime_ns). Fanger også en endring
+    midt i en stor fil som ikke endrer lengden, som fingeravtrykket alene ikke ser.
+    """
+    return f"{file_fingerprint(path)}:{Path(path).stat().st_mtime_ns}"
+
+
+def mark_used(path: str | Path) -> None:
+    """Oppdaterer endringstidspunktet til en cache-fil som ble brukt, så prune_cache lar den være."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+
+def prune_cache(folder: str | Path, max_age_days: float = CACHE_MAX_AGE_DAYS) -> int:
+    """
+    Sletter filene i en cache-mappe som verken er skrevet eller brukt (se mark_used)
+    på `max_age_days` dager. Gjøres bare én gang per mappe per prosess. Returnerer antall slettet.
+    """
+    folder = Path(folder)
+    with _pruned_lock:
+        if folder in _pruned:
+            return 0
+        _pruned.add(folder)
+
+    cutoff = time.time() - max_age_days * 86400
+    removed = 0
+    for path in folder.glob('*'):
+        try:
+            if path.is_file() and path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except OSError as e:
+            logger.debug(f"Kunne ikke rydde {path}: {e}")
+    if removed:
+        logger.info(f"Ryddet {removed} gamle filer fra {folder}.")
+    return removed
+
+
+class JsonRegistry:
+    """
+    Et lite nøkkel/verdi-register som lagres som én JSON-fil i cache-mappen.
+    Trådsikkert, og filen skrives atomisk slik at en avbrutt kjøring ikke ødelegger den.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._data: dict | None = None
+        self._path: Path | None = None
+
+    def _load(self) -> dict:
+        path = cache_dir() / self.name
+        if self._data is None or path != self._path:
+            self._path = path
+            try:
+                self._data = json.loads(path.read_text(encoding='utf-8'))
+            except FileNotFoundError:
+                self._data = {}
+            except (OSError, ValueError) as e:
+                logger.warning(f"Kunne ikke lese {path} ({e}). Starter med tomt register.")
+                self._data = {}
+        return self._data
+
+    def get(self, key: str):
+        with self._lock:
+            return self._load().get(key)
+
+    def put(self, key: str, value) -> None:
+        with self._lock:
+            data = self._load()
+            data[key] = value
+            tmp = self._path.with_name(f"{self._path.name}.{os.getpid()}.tmp")
+            try:
+                tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), encoding='utf-8')
+                os.replace(tmp, self._path)
+            except OSError as e:
+                logger.warning(f"Kunne ikke skrive {self._path}: {e}")
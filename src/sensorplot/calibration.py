@@ -0,0 +1,102 @@
+import logging
+from dataclasses import dataclass
+import numpy as np
+import pandas as pd
+
+from sensorplot.window import tolk_tidsgrense
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KALIBRERINGSTABELL
+# ==============================================================================
+#
+#   En logger som er kalibrert flere ganger beskrives med én tabell per alias:
+#
+#       calibration:
+#         - {from: 2023-01-01, offset: 0.00}
+#         - {from: 2024-03-15 12:00, offset: -0.12, scale: 1.02}
+#
+#   Hver rad gjelder fra 'from' og fram til neste. Kalibrert verdi er
+#   rå * scale + offset. Målinger før første rad brukes som de er.
+
+
+@dataclass(frozen=True, eq=False)
+class CalibrationTable:
+    """
+    Kalibreringene for én logger, sortert på gyldig-fra.
+
+    Args:
+        valid_from (ndarray): Tidspunktet hver kalibrering gjelder fra, datetime64[ns], stigende.
+        offset (ndarray): Forskyvning som legges til etter skaleringen.
+        scale (ndarray): Faktor råverdien ganges med.
+    """
+    valid_from: np.ndarray
+    offset: np.ndarray
+    scale: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.valid_from)
+
+    def apply(self, times, values) -> np.ndarray:
+        """
+        Kalibrerte verdier. Kalibreringen for hver måling finnes med ett searchsorted
+        over hele serien, så antall perioder ikke gir flere passeringer over dataene.
+        """
+        t = np.asarray(times, dtype='datetime64[ns]')
+        v = np.asarray(values, dtype='f8')
+        # Posisjon 0 er "før første kalibrering" (skala 1, forskyvning 0)
+        pos = np.searchsorted(self.valid_from, t, side='right')
+        scale = np.r_[1.0, self.scale][pos]
+        offset = np.r_[0.0, self.offset][pos]
+        return v * scale + offset
+
+
+def parse_calibration(entries) -> CalibrationTable:
+    """
+    Tabellen fra 'calibration' under en fil i YAML: [{from, offset, scale}, ...].
+    'offset' er 0 og 'scale' er 1 hvis de mangler. Rekkefølgen i YAML spiller ingen rolle.
+    """
+    if not isinstance(entries, list) or not entries:
+        raise ValueError(f"'calibration' må være en liste med minst én rad: {entries!r}")
+
+    rows = []
+    for entry in entries:
+        if not isinstance(entry, dict) or 'from' not in entry:
+            raise ValueError(f"Rad i 'calibration' må ha 'from': {entry!r}")
+        unknown = set(entry) - {'from', 'offset', 'scale'}
+        if unknown:
+            raise ValueError(f"Ukjente felt i 'calibration': {', '.join(sorted(unknown))}")
+        try:
+            start = tolk_tidsgrense(entry['from'])
+            if start is None:
+                raise ValueError
+            rows.append((start, float(entry.get('offset', 0.0)), float(entry.get('scale', 1.0))))
+        except (TypeError, ValueError):
+            raise ValueError(f"Ugyldig rad i 'calibration': {entry!r}")
+
+    rows.sort(key=lambda row: row[0])
+    valid_from = np.array([row[0].to_datetime64() for row in rows], dtype='datetime64[ns]')
+    if (np.diff(valid_from.view('i8')) == 0).any():
+        raise ValueError("To rader i 'calibration' har samme 'from'.")
+    return CalibrationTable(
+        valid_from=valid_from,
+        offset=np.array([row[1] for row in rows]),
+        scale=np.array([row[2] for row in rows]),
+    )
+
+
+def calibrate_frame(df: pd.DataFrame, alias: str, table: CalibrationTable | None) -> pd.DataFrame:
+    """
+    Bruker kalibreringen på alle kanalene til aliaset ('Alias.Kolonne') i en innlest fil.
+    Gir en grunn kopi med de kalibrerte kolonnene; uten tabell returneres df uendret.
+    """
+    if table is None or df.empty:
+        return df
+    columns = [c for c in df.columns if c.startswith(f"{alias}.")]
+    out = df.copy(deep=False)
+    for column in columns:
+        out[column] = table.apply(df['Datetime'], df[column])
+    logger.info(f"  -> {alias}: {len(table)} kalibreringer brukt på {', '.join(columns)}.")
+    return out
@@ -1,13 +1,29 @@
 import argparse
+import json
 import sys
 import re
-import pandas as pd
-import concurrent.futures
 import threading
 import logging
 import yaml
+from pandas.tseries.frequencies import to_offset
 from pathlib import Path
-from sensorplot.core import SensorResult, last_og_rens_data, vask_data, plot_resultat
+from sensorplot.core import (FLAG_COLUMN, Rensing, delte_figurer, gyldige_rader, last_og_rens_data, last_arbeidsbok,
+                             last_alle_kanaler, plot_per_serie, plot_resultat, tolk_panel)
+from sensorplot.store import STORE_SUFFIX, read_header, write_store
+from sensorplot.pyramid import build_store_pyramids, load_store_pyramid
+from sensorplot.sources import expand_source, is_multi_source, load_source
+from sensorplot.runcache import (load_series_result, output_is_current, remember_output,
+                                  run_key, save_series_result, series_key)
+from sensorplot.metadata import DEFAULT_INSPECT_WORKERS, inspect_files, validate_metadata
+from sensorplot.window import tolk_tidsgrense
+from sensorplot.calibration import calibrate_frame, parse_calibration
+from sensorplot.interval import IntervalProfile, parse_tolerance, profile_times
+from sensorplot.formula import DEFAULT_TEMPLATE_VAR, expand_template, parse_template
+from sensorplot.pipeline import STAGE_LOAD, SeriesJob, SeriesPipeline, group_families, parse_workers, run_series
+from sensorplot.planner import default_budget, estimate_alias, log_plan, parse_memory, plan_memory
+from sensorplot.export import DEFAULT_EXCEL_PRESET, EXCEL_PRESETS, excel_format, write_excel
+from sensorplot.stats import STATS_FORMATS, compute_stats, parse_period, stats_path, write_stats
+from sensorplot.stitch import OVERLAP_POLICIES, DEFAULT_OVERLAP, consolidate_results, stitch_sorted
 
 # Opprett logger
 logger = logging.getLogger(__name__)
@@ -21,13 +37,32 @@ ARG_FILES = 'files'
 ARG_SERIES = 'series'
 ARG_FORMULA = 'formel'
 ARG_CLEAN = 'clean'
+ARG_CLEAN_WINDOW = 'clean-window'
 ARG_TITLE = 'tittel'
 ARG_OUTPUT = 'output'
 ARG_X_INT = 'x-interval'
+ARG_OVERLAP = 'overlap'
+ARG_FROM = 'from'
+ARG_TO = 'to'
+ARG_WORKERS = 'workers'
+ARG_NO_CACHE = 'no-cache'
+ARG_SPLIT = 'split'
+ARG_TOLERANCE = 'tolerance'
+ARG_STATS = 'stats'
+ARG_STATS_OUT = 'stats-out'
+ARG_EXCEL = 'excel'
+ARG_EXCEL_FORMAT = 'excel-format'
+ARG_DECIMALS = 'decimals'
+ARG_MAX_MEMORY = 'max-memory'
 
 ARG_COL_DATE = 'datecol'
 ARG_COL_TIME = 'timecol'
 ARG_COL_DATA = 'datacol'
+ARG_OUT_DIR = 'out'
+ARG_CHANNELS = 'channels'
+
+CMD_INGEST = 'ingest'
+CMD_INSPECT = 'inspect'
 
 DEFAULT_Z_SCORE = 3.0
 DEF_DATE = 'Date5'
@@ -54,6 +89,31 @@ EKSEMPLER:
 
 4. Overstyr globale kolonner per fil (krever config):
    (Se dokumentasjon for YAML-syntaks)
+
+5. Plott bare en periode (leser bare det som trengs fra filene):
+   sensorplot -c plot_oppsett.yaml --from 2024-03-01 --to 2024-03-31
+
+6. Konverter loggerfiler til lager (.spb) for raskere lasting:
+   sensorplot ingest -c plot_oppsett.yaml --out arkiv/
+
+7. Se kolonner og tidsrom i filene (leser bare header og første/siste rad):
+   sensorplot inspect data/*.csv
+   sensorplot inspect -c plot_oppsett.yaml --output indeks.json
+
+8. Serier i egne paneler med felles tidsakse ('panel:' i YAML, eller [Panel] foran navnet):
+   sensorplot --files L=logger.csv B=baro.csv --datacol Level --series "[Nivå] L=L.Level" "[Trykk] B=B.Level"
+
+9. Skjul støy, også lokale spikes mot glidende median over ett døgn:
+   sensorplot -c plot_oppsett.yaml --clean 3 --clean-window 1D
+
+10. Døgnstatistikk (min/max/snitt/persentiler og dekning) til CSV eller Parquet:
+   sensorplot -c plot_oppsett.yaml --stats D --stats-out statistikk.parquet
+
+11. Eksporter de beregnede seriene til Excel (ett ark per serie, 3 desimaler):
+   sensorplot -c plot_oppsett.yaml --excel resultater.xlsx --decimals 3
+
+12. Store datasett med fast minnegrense (velger float32, bitvis lesing eller én serie om gangen ved behov):
+   sensorplot -c plot_oppsett.yaml --max-memory 4G
 """
 
 cache_lock = threading.Lock()
@@ -76,7 +136,7 @@ def load_config_file(filepath):
 def normalize_files_dict(raw_files_dict):
     """
     Sørger for at alle filer har samme struktur internt:
-    {'alias': {'path': '...', 'cols': {...}}}
+    {'alias': {'path': '...', 'cols': {...}, 'sheet': ...}}
     """
     normalized = {}
     for alias, value in raw_files_dict.items():
@@ -99,6 +159,27 @@ def normalize_files_dict(raw_files_dict):
                 cols['col_data'] = value['col_data']
 
             normalized[alias] = {'path': value['path'], 'cols': cols}
+
+            # Valgfritt ark i en Excel-arbeidsbok (navn eller indeks)
+            if 'sheet' in value:
+                normalized[alias]['sheet'] = value['sheet']
+            # Valgfri fil i et zip-arkiv (navn eller mønster, se sensorplot.archive)
+            if 'member' in value:
+                normalized[alias]['member'] = value['member']
+            # Valgfri overstyring av detektert filformat (se sensorplot.dialect)
+            if 'dialect' in value:
+                normalized[alias]['dialect'] = value['dialect']
+            # Valgfri toleranse når aliaset slås sammen mot andre serier ('30s', 'auto')
+            if 'tolerance' in value:
+                normalized[alias]['tolerance'] = value['tolerance']
+            # Valgfri kalibreringstabell ([{from, offset, scale}, ...]), brukt én gang ved innlesing
+            if 'calibration' in value:
+                try:
+                    parse_calibration(value['calibration'])
+                except ValueError as e:
+                    logger.error(f"Ugyldig kalibrering for '{alias}': {e}")
+                    sys.exit(1)
+                normalized[alias]['calibration'] = value['calibration']
     return normalized
 
 
@@ -122,13 +203,249 @@ def extract_aliases_from_formula(formula):
     return re.findall(pattern, formula)
 
 
+def resolve_columns(file_info, global_args, global_time_col):
+    """
+    Bestemmer kolonnenavn for en fil: Fil-spesifikk override,
+    eller fall tilbake på globale innstillinger. Returnerer (dato, tid, data).
+    """
+    file_cols = file_info['cols']
+    use_date = file_cols.get('col_date', global_args.col_date)
+    use_data = file_cols.get('col_data', global_args.col_data)
+
+    # Tidshåndtering (kan være None)
+    if 'col_time' in file_cols:
+        use_time = file_cols['col_time']
+        if use_time and use_time.lower() == "none":
+            use_time = None
+    else:
+        use_time = global_time_col
+
+    return use_date, use_time, use_data
+
+
+def parse_clean_window(value):
+    """Vinduet for glidende median ('1D', '6h'), eller None. Ugyldige vinduer gir ValueError."""
+    if not value:
+        return None
+    to_offset(str(value))
+    return str(value)
+
+
+def parse_exclude(value):
+    """
+    Manuelt utelatte perioder fra 'exclude' under settings:
+    [{from: 2024-03-01, to: 2024-03-02}, ...]. En ren dato i 'to' tar med hele dagen.
+    """
+    perioder = []
+    for periode in value or []:
+        if not isinstance(periode, dict) or not ({'from', 'to'} & set(periode)):
+            raise ValueError(f"Periode i 'exclude' må ha 'from' og/eller 'to': {periode!r}")
+        perioder.append((tolk_tidsgrense(periode.get('from')), tolk_tidsgrense(periode.get('to'), slutt=True)))
+    return tuple(perioder)
+
+
+def resolve_dialect_overrides(file_info, global_args):
+    """Slår sammen 'dialect' fra settings og fra fil-definisjonen (filen vinner)."""
+    merged = dict(getattr(global_args, 'dialect', None) or {})
+    merged.update(file_info.get('dialect') or {})
+    return merged or None
+
+
+def store_loaded(alias, df, all_files_dict, loaded_dfs_cache, value_dtype=None):
+    """
+    Legger et innlest alias i cachen, kalibrert etter 'calibration' i fil-definisjonen.
+    Med `value_dtype` (f.eks. 'float32' fra minneplanen) nedskaleres datakolonnene.
+    """
+    entries = all_files_dict[alias].get('calibration')
+    table = parse_calibration(entries) if entries else None
+    df = calibrate_frame(df, alias, table)
+    if value_dtype is not None:
+        df = df.astype({c: value_dtype for c in df.columns if c != 'Datetime' and df[c].dtype.kind == 'f'})
+    loaded_dfs_cache[alias] = df
+
+
+def load_alias(alias, all_files_dict, loaded_dfs_cache, global_args, global_time_col, needed=None):
+    """
+    Laster ett alias inn i cachen. Må kalles med fil-låsen for aliaset (se get_or_load).
+
+    Hvis flere alias peker på samme Excel-arbeidsbok (f.eks. ulike ark), lastes
+    alle som ikke allerede er i cachen i samme omgang, slik at filen bare åpnes én gang.
+    Med `needed` tas bare aliasene seriene trenger med; andre ark i arbeidsboken lastes ikke.
+    """
+    file_info = all_files_dict[alias]
+    file_path = file_info['path']
+    use_date, use_time, use_data = resolve_columns(file_info, global_args, global_time_col)
+    start = getattr(global_args, 'start', None)
+    end = getattr(global_args, 'end', None)
+    # Satt av minneplanen (se build_memory_plan)
+    value_dtype = getattr(global_args, 'value_dtype', None)
+    chunk_rows = getattr(global_args, 'chunk_rows', None)
+
+    if is_multi_source(file_path):
+        # Glob-mønster eller mappe: alle filene lastes parallelt og syes sammen
+        store_loaded(alias, load_source(
+            file_path, alias, use_date, use_time, use_data, sheet=file_info.get('sheet'),
+            start=start, end=end, dialect=resolve_dialect_overrides(file_info, global_args),
+            overlap=getattr(global_args, 'overlap', DEFAULT_OVERLAP), member=file_info.get('member'),
+            chunk_rows=chunk_rows
+        ), all_files_dict, loaded_dfs_cache, value_dtype)
+        return
+
+    siblings = []
+    if Path(file_path).suffix.lower() == '.xlsx':
+        target = Path(file_path).resolve()
+        siblings = [
+            a for a, info in all_files_dict.items()
+            if a not in loaded_dfs_cache and not is_multi_source(info['path'])
+            and (needed is None or a == alias or a in needed)
+            and Path(info['path']).resolve() == target
+        ]
+
+    if len(siblings) > 1:
+        logger.info(f"  -> Laster {len(siblings)} alias fra {file_path} i én omgang: {', '.join(siblings)}")
+        oppslag = {}
+        for a in siblings:
+            a_date, a_time, a_data = resolve_columns(all_files_dict[a], global_args, global_time_col)
+            oppslag[a] = {'sheet': all_files_dict[a].get('sheet'), 'col_date': a_date,
+                          'col_time': a_time, 'col_data': a_data,
+                          'dialect': resolve_dialect_overrides(all_files_dict[a], global_args)}
+
+        for a, res in last_arbeidsbok(file_path, oppslag, start=start, end=end).items():
+            if isinstance(res, Exception):
+                if a == alias:
+                    raise res
+                # Søsken som feiler prøves på nytt (og logges) når de faktisk trengs
+                continue
+            store_loaded(a, res, all_files_dict, loaded_dfs_cache, value_dtype)
+        return
+
+    logger.info(
+        f"  -> Laster {alias} (Dato: {use_date}, Tid: {use_time}, Data: {use_data})...")
+    # Merk: last_og_rens_data returnerer nå kolonne navngitt 'Alias.DataKolonne'
+    store_loaded(alias, last_og_rens_data(
+        file_path, alias, use_date, use_time, use_data, sheet=file_info.get('sheet'),
+        start=start, end=end, dialect=resolve_dialect_overrides(file_info, global_args),
+        member=file_info.get('member'), chunk_rows=chunk_rows
+    ), all_files_dict, loaded_dfs_cache, value_dtype)
+
+
+_file_locks = {}
+
+
+def get_or_load(alias, all_files_dict, loaded_dfs_cache, global_args, global_time_col, needed=None):
+    """
+    Henter et alias fra cachen, eller laster det.
+
+    Låsen gjelder per fil, slik at ulike filer kan lastes parallelt mens alias
+    som deler samme fil (f.eks. ark i en arbeidsbok) venter på hverandre.
+    """
+    if alias in loaded_dfs_cache:
+        return loaded_dfs_cache[alias]
+
+    file_key = Path(all_files_dict[alias]['path']).resolve()
+    with cache_lock:
+        file_lock = _file_locks.setdefault(file_key, threading.Lock())
+
+    with file_lock:
+        if alias not in loaded_dfs_cache:
+            load_alias(alias, all_files_dict, loaded_dfs_cache, global_args, global_time_col, needed)
+    return loaded_dfs_cache[alias]
+
+
+def prepare_series(series_label, formula, all_files_dict, panel=None):
+    """
+    Analyserer en formelstreng (f.eks. "L1.Nivå - B1.Trykk") og lager en SeriesJob
+    med aliasene som trengs og en formel som er trygg for DataFrame.eval.
+    Returnerer None hvis formelen ikke refererer til noen kjente alias.
+    `panel` bestemmer hvilket panel serien tegnes i (None = hovedpanelet).
+    """
+    # 1. Finn alle referanser på formen 'Alias.Kolonne' i formelen
+    # Vi leter etter ord som står foran og bak et punktum
+    potential_refs = re.findall(
+        r'\b([a-zA-Z0-9_\-æøåÆØÅ]+)\.([a-zA-Z0-9_\-æøåÆØÅ]+)\b', formula)
+
+    # Sjekk om delen foran punktum faktisk er et kjent fil-alias.
+    # Rekkefølgen beholdes, siden første alias bestemmer tidsaksen ved sammenslåing.
+    needed_aliases = list(dict.fromkeys(
+        alias for alias, col in potential_refs if alias in all_files_dict))
+
+    if not needed_aliases:
+        return None
+
+    # Gjør formelen trygg for eval() ved å sette backticks rundt kjente 'Alias.Kolonne'
+    # Dette gjør at pandas skjønner at "L1.Level" er én kolonne, og ikke objektet L1 sin property Level.
+    def replace_match(match):
+        a, c = match.group(1), match.group(2)
+        if a in all_files_dict:
+            return f"`{a}.{c}`"  # Eks: `L1.Level`
+        return match.group(0)
+
+    safe_formel = re.sub(
+        r'\b([a-zA-Z0-9_\-æøåÆØÅ]+)\.([a-zA-Z0-9_\-æøåÆØÅ]+)\b', replace_match, formula)
+
+    return SeriesJob(label=series_label, formula=formula, expression=safe_formel, aliases=needed_aliases,
+                     panel=panel)
+
+
+def expand_definitions(plot_definitions, all_files_dict):
+    """
+    Fyller ut maler som '{alias} = {alias}.ch1 - Baro.ch1 for alias in L*' med alle alias
+    som passer mønsteret. Returnerer (label, formel, panel, mal, mål-alias) per serie;
+    mal og mål er None for vanlige serier.
+    """
+    expanded = []
+    for label, formula, panel in plot_definitions:
+        template = parse_template(formula)
+        if template is None:
+            expanded.append((label, formula, panel, None, None))
+            continue
+
+        body, var, pattern = template
+        members = expand_template(label, body, var, pattern, list(all_files_dict))
+        if not members:
+            logger.error(f"Ingen alias passer '{pattern}' i malen '{label} = {formula}'.")
+            continue
+        logger.info(f"Mal '{label}': {len(members)} serier ({', '.join(m[2] for m in members)}).")
+        key = f"{label} = {formula}"
+        expanded.extend((m_label, m_formula, panel, key, alias) for m_label, m_formula, alias in members)
+    return expanded
+
+
+def report_series_result(res):
+    """Logger utfallet av en serie. Returnerer SensorResult hvis det er data å plotte."""
+    if res.error:
+        logger.error(f"  -> {res.error}")
+        return None
+    if res.removed > 0:
+        logger.info(f"  -> {res.label}: Flagget {res.removed} punkter som støy (vises ikke).")
+    if res.result.df.empty:
+        logger.warning(
+            f"  -> {res.label}: Ingen data igjen etter prosessering.")
+        return None
+
+    report_gaps(res.label, res.result.df)
+    logger.info(f"Ferdig med del-serie: '{res.label}'")
+    return res.result
+
+
+def report_gaps(label, df):
+    """Logger hullene i serien (de samme stedene plottet bryter linjen)."""
+    profile = profile_times(gyldige_rader(df)['Datetime'])
+    if len(profile.gaps) == 0:
+        return
+    logger.info(
+        f"  -> {label}: {len(profile.gaps)} hull i serien, lengste {profile.longest_gap}, "
+        f"totalt {profile.gap_total} uten målinger.")
+
+
 def process_single_series(series_label, formula, all_files_dict, loaded_dfs_cache, global_args, global_time_col):
     """
-    Behandler en enkelt serie/formel (designet for å kjøres i en tråd).
+    Behandler en enkelt serie/formel synkront.
 
     Denne funksjonen analyserer en formelstreng (f.eks. "L1.Nivå - B1.Trykk"),
     identifiserer hvilke filer og kolonner som trengs, laster dem inn (via cache),
     slår sammen tidsseriene, utfører beregningen og vasker resultatet for støy.
+    main() kjører de samme stegene parallelt via SeriesPipeline.
 
     Args:
         series_label (str): Navnet på serien som skal vises i plottet/legenden.
@@ -144,106 +461,340 @@ def process_single_series(series_label, formula, all_files_dict, loaded_dfs_cach
     """
     logger.info(f"Starter serie: '{series_label}'...")
 
-    # 1. Finn alle referanser på formen 'Alias.Kolonne' i formelen
-    # Vi leter etter ord som står foran og bak et punktum
-    potential_refs = re.findall(
-        r'\b([a-zA-Z0-9_\-æøåÆØÅ]+)\.([a-zA-Z0-9_\-æøåÆØÅ]+)\b', formula)
-
-    needed_aliases = []
-    for alias, col in potential_refs:
-        # Sjekk om delen foran punktum faktisk er et kjent fil-alias
-        if alias in all_files_dict:
-            needed_aliases.append(alias)
-
-    # Fjern duplikater
-    needed_aliases = list(set(needed_aliases))
-
-    if not needed_aliases:
+    job = prepare_series(series_label, formula, all_files_dict)
+    if job is None:
         logger.error(f"Fant ingen kjente aliaser i formelen: {formula}")
         return None
 
     current_dfs = []
+    for alias in job.aliases:
+        try:
+            current_dfs.append(get_or_load(
+                alias, all_files_dict, loaded_dfs_cache, global_args, global_time_col, job.aliases))
+        except Exception as e:
+            logger.error(f"  -> Feil ved lesing av {alias}: {e}")
+            return None
 
-    for alias in needed_aliases:
-        # Hent fil-info
-        file_info = all_files_dict[alias]
-        file_path = file_info['path']
-        file_cols = file_info['cols']
-
-        # BESTEM KOLONNENAVN:
-        # Bruk fil-spesifikk override, eller fall tilbake på global setting
-        use_date = file_cols.get('col_date', global_args.col_date)
-        use_data = file_cols.get('col_data', global_args.col_data)
-
-        # Tidshåndtering (kan være None)
-        if 'col_time' in file_cols:
-            use_time = file_cols['col_time']
-            if use_time and use_time.lower() == "none":
-                use_time = None
-        else:
-            use_time = global_time_col
+    # Eldre kallere gir bare 'clean_threshold' (et tall)
+    cleaning = getattr(global_args, 'cleaning', getattr(global_args, 'clean_threshold', None))
+    res = run_series(job, current_dfs, cleaning)
+    return report_series_result(res)
 
-        # Sjekk cache / Last data
-        if alias not in loaded_dfs_cache:
-            with cache_lock:
-                if alias not in loaded_dfs_cache:
-                    logger.info(
-                        f"  -> Laster {alias} (Dato: {use_date}, Tid: {use_time}, Data: {use_data})...")
-                    try:
-                        # Merk: last_og_rens_data returnerer nå kolonne navngitt 'Alias.DataKolonne'
-                        loaded_dfs_cache[alias] = last_og_rens_data(
-                            file_path, alias, use_date, use_time, use_data
-                        )
-                    except Exception as e:
-                        logger.error(f"  -> Feil ved lesing av {alias}: {e}")
-                        return None
-
-        current_dfs.append(loaded_dfs_cache[alias])
-
-    # Slå sammen (Merge)
-    merged_df = current_dfs[0]
-    for other_df in current_dfs[1:]:
-        merged_df = pd.merge_asof(
-            merged_df, other_df, on='Datetime', direction='nearest', tolerance=pd.Timedelta('10min')
-        )
 
-    # Gjør formelen trygg for eval() ved å sette backticks rundt kjente 'Alias.Kolonne'
-    # Dette gjør at pandas skjønner at "L1.Level" er én kolonne, og ikke objektet L1 sin property Level.
-    def replace_match(match):
-        a, c = match.group(1), match.group(2)
-        if a in all_files_dict:
-            return f"`{a}.{c}`"  # Eks: `L1.Level`
-        return match.group(0)
+def ingest_main(argv):
+    """
+    Underkommandoen 'sensorplot ingest'.
 
-    safe_formel = re.sub(
-        r'\b([a-zA-Z0-9_\-æøåÆØÅ]+)\.([a-zA-Z0-9_\-æøåÆØÅ]+)\b', replace_match, formula)
+    Leser hver loggerfil én gang og skriver den som et lager (.spb) med tid og alle
+    numeriske kanaler, pluss en pyramideindeks (.pyr.npz) for raske oversikter.
+    Lageret kan deretter brukes direkte som fil i 'files:'.
+    """
+    parser = argparse.ArgumentParser(
+        prog=f'sensorplot {CMD_INGEST}',
+        description="Konverterer loggerfiler (.xlsx/.csv) til sensorplot-lager (.spb).")
+    parser.add_argument(f'--{ARG_CONFIG}', '-c', dest='config_file',
+                        type=str, help='Sti til YAML-konfig (bruker filene under files:).')
+    parser.add_argument(f'--{ARG_FILES}', dest='input_files', nargs='+',
+                        help='Liste over filer. Format: Alias=Filnavn.xlsx')
+    parser.add_argument(f'--{ARG_OUT_DIR}', dest='out_dir', type=str, default=None,
+                        help='Mappe for lagrene (standard: samme mappe som kildefilen).')
+    parser.add_argument(f'--{ARG_COL_DATE}', dest='col_date',
+                        type=str, default=None, help='Global Dato-kolonne')
+    parser.add_argument(f'--{ARG_COL_TIME}', dest='col_time',
+                        type=str, default=None, help='Global Tid-kolonne')
+    parser.add_argument(f'--{ARG_CHANNELS}', dest='channels', nargs='+', default=None,
+                        help='Kanaler som skal lagres (standard: alle numeriske kolonner).')
+    args = parser.parse_args(argv)
 
-    try:
-        merged_df['Resultat'] = merged_df.eval(safe_formel)
-    except Exception as e:
-        logger.error(f"  -> Feil i formel '{formula}': {e}")
-        return None
+    files_dict = {}
+    settings = {}
+    if args.config_file:
+        cfg = load_config_file(args.config_file)
+        settings = cfg.get('settings', {})
+        files_dict = normalize_files_dict(cfg.get('files', {}))
+    if args.input_files:
+        files_dict.update(parse_files_arg(args.input_files))
 
-    # Støyvask
-    if global_args.clean_threshold is not None:
-        merged_df, antall = vask_data(
-            merged_df, 'Resultat', z_score=global_args.clean_threshold)
-        if antall > 0:
-            logger.info(f"  -> {series_label}: Renset {antall} punkter.")
+    if not files_dict:
+        logger.error("Ingen filer definert.")
+        sys.exit(1)
 
-    if merged_df.empty:
-        logger.warning(
-            f"  -> {series_label}: Ingen data igjen etter prosessering.")
-        return None
+    col_time = args.col_time if args.col_time else settings.get('col_time', DEF_TIME)
+    if col_time and col_time.lower() == "none":
+        col_time = None
+    global_args = argparse.Namespace(
+        col_date=args.col_date if args.col_date else settings.get('col_date', DEF_DATE),
+        col_data=settings.get('col_data', DEF_DATA),
+        dialect=settings.get('dialect')
+    )
+
+    feil = 0
+    for alias, info in files_dict.items():
+        source = Path(info['path'])
+        if source.suffix.lower() == STORE_SUFFIX:
+            logger.info(f"  -> {alias}: {source} er allerede et lager, hopper over.")
+            continue
+
+        use_date, use_time, _ = resolve_columns(info, global_args, col_time)
+        out_dir = Path(args.out_dir) if args.out_dir else source.parent
+        target = out_dir / f"{alias}{STORE_SUFFIX}"
+
+        logger.info(f"Konverterer {alias} ({source}) -> {target}...")
+        try:
+            kilder = expand_source(source) if is_multi_source(source) else [source]
+            df = stitch_sorted([
+                last_alle_kanaler(kilde, use_date, use_time, sheet=info.get('sheet'), kanaler=args.channels,
+                                  dialect=resolve_dialect_overrides(info, global_args), member=info.get('member'))
+                for kilde in kilder
+            ])
+            out_dir.mkdir(parents=True, exist_ok=True)
+            # Intervallprofilen brukes av pipelinen når lageret slås sammen med andre serier (se stored_profiles)
+            write_store(target, df, meta={
+                'alias': alias, 'source': str(source), 'sheet': info.get('sheet'),
+                'interval': profile_times(df['Datetime']).to_dict()})
+            # Pyramideindeks for raske oversikter, lagret ved siden av lageret
+            build_store_pyramids(target)
+        except Exception as e:
+            logger.error(f"  -> Feil ved konvertering av {alias}: {e}")
+            feil += 1
+
+    if feil:
+        sys.exit(1)
+
+
+def build_inspect_specs(files_dict, aliases, global_args, global_time_col):
+    """Lager oppslaget inspect_files trenger for de valgte aliasene."""
+    specs = {}
+    for alias in aliases:
+        info = files_dict[alias]
+        use_date, use_time, _ = resolve_columns(info, global_args, global_time_col)
+        path = info['path']
+        if is_multi_source(path):
+            # Filene i et mønster har samme oppsett, så den nyeste holder som stikkprøve
+            try:
+                path = str(expand_source(path)[-1])
+            except FileNotFoundError:
+                pass
+        specs[alias] = {'path': path, 'col_date': use_date, 'col_time': use_time,
+                        'sheet': info.get('sheet'), 'member': info.get('member'),
+                        'dialect': resolve_dialect_overrides(info, global_args)}
+    return specs
+
+
+def build_memory_plan(files_dict, jobs, global_args, global_time_col, budget, workers):
+    """
+    Anslår minnebruken per alias fra metadataindeksen og filstørrelsene, og velger
+    strategi mot budsjettet (se sensorplot.planner). Mønstre regnes med alle filene.
+    """
+    aliases = list(dict.fromkeys(a for job in jobs for a in job.aliases))
+    specs = build_inspect_specs(files_dict, aliases, global_args, global_time_col)
+    metas = inspect_files(specs)
+
+    estimates = {}
+    for alias in aliases:
+        path = files_dict[alias]['path']
+        try:
+            paths = expand_source(path) if is_multi_source(path) else [Path(path)]
+        except FileNotFoundError:
+            paths = []
+        estimates[alias] = estimate_alias(
+            alias, metas[alias], paths, specs[alias]['col_date'], specs[alias]['col_time'],
+            member=files_dict[alias].get('member'),
+            start=getattr(global_args, 'start', None), end=getattr(global_args, 'end', None))
+
+    # Samme grense for serier underveis som SeriesPipeline.run bruker
+    in_flight = sum(n for stage, n in workers.items() if stage != STAGE_LOAD)
+    return plan_memory(estimates, [job.aliases for job in jobs], budget, workers[STAGE_LOAD], in_flight)
+
+
+def check_formula_columns(job, files_dict, global_args, global_time_col):
+    """
+    Hver fil lastes bare med sin datakolonne, så 'Alias.Kolonne' i formelen må
+    bruke nettopp den. Sjekkes før lasting, slik at feilen ikke dukker opp først i eval.
+    """
+    feil = []
+    for alias, col in re.findall(r'\b([a-zA-Z0-9_\-æøåÆØÅ]+)\.([a-zA-Z0-9_\-æøåÆØÅ]+)\b', job.formula):
+        if alias not in files_dict:
+            continue
+        _, _, use_data = resolve_columns(files_dict[alias], global_args, global_time_col)
+        if col != use_data:
+            feil.append(f"Formelen '{job.formula}' bruker {alias}.{col}, "
+                        f"men {alias} lastes med datakolonnen '{use_data}'.")
+    return feil
+
+
+def stored_profiles(files_dict, aliases):
+    """
+    Intervallprofilene som 'sensorplot ingest' lagret i headeren til .spb-lagrene.
+    Pipelinen bruker dem i stedet for å profilere tidsstemplene på nytt. Returnerer {'alias': IntervalProfile}.
+    """
+    profiles = {}
+    for alias in aliases:
+        path = files_dict[alias]['path']
+        if is_multi_source(path) or Path(path).suffix.lower() != STORE_SUFFIX:
+            continue
+        try:
+            interval = read_header(path).get('meta', {}).get('interval')
+        except (OSError, ValueError) as e:
+            logger.debug(f"  -> {alias}: kunne ikke lese headeren i {path} ({e}).")
+            continue
+        if interval:
+            profiles[alias] = IntervalProfile.from_dict(interval)
+    return profiles
+
+
+def store_pyramids(results, jobs, files_dict, global_args, global_time_col):
+    """
+    Pyramidene som 'sensorplot ingest' lagret ved siden av .spb-lagrene, for serier som er
+    én kanal rett fra et lager (f.eks. 'L1.LEVEL'). Serien er da lik kanalen, så plottet
+    trenger ikke bygge pyramiden på nytt. Kalibrerte eller flaggede serier er endret og
+    bygges som før. Returnerer {'serienavn': Pyramid}.
+    """
+    jobs_by_label = {}
+    for job in jobs:
+        jobs_by_label.setdefault(job.label, []).append(job)
+
+    pyramids = {}
+    for res in results:
+        matches = jobs_by_label.get(res.label, [])
+        if len(matches) != 1 or len(matches[0].aliases) != 1:
+            continue
+        job, alias = matches[0], matches[0].aliases[0]
+        info = files_dict[alias]
+        path = info['path']
+        if is_multi_source(path) or Path(path).suffix.lower() != STORE_SUFFIX or info.get('calibration'):
+            continue
+        _, _, use_data = resolve_columns(info, global_args, global_time_col)
+        if job.expression.strip() != f"`{alias}.{use_data}`":
+            continue
+        if FLAG_COLUMN in res.df.columns and res.df[FLAG_COLUMN].to_numpy().any():
+            continue
+        pyramid = load_store_pyramid(path, use_data)
+        if pyramid is not None:
+            logger.debug(f"  -> {res.label}: bruker lagret pyramide fra {path}.")
+            pyramids[res.label] = pyramid
+    return pyramids
+
+
+def validate_sources(files_dict, aliases, global_args, global_time_col):
+    """
+    Sjekker at filene finnes og har kolonnene konfigurasjonen bruker, før noe lastes.
+    Leser bare header og første/siste tidsstempel (metadataindeksen).
+    Returnerer aliasene som garantert vil feile ved lasting (tom mengde hvis alt er i orden).
+    """
+    specs = build_inspect_specs(files_dict, aliases, global_args, global_time_col)
+    bad = set()
+    for alias, meta in inspect_files(specs).items():
+        if isinstance(meta, FileNotFoundError):
+            logger.error(f"{alias}: {meta}")
+            bad.add(alias)
+            continue
+        if isinstance(meta, Exception):
+            logger.warning(f"{alias}: kunne ikke inspisere filen på forhånd ({meta}).")
+            continue
+        _, _, use_data = resolve_columns(files_dict[alias], global_args, global_time_col)
+        feil, advarsler = validate_metadata(
+            meta, alias, specs[alias]['col_date'], use_data,
+            getattr(global_args, 'start', None), getattr(global_args, 'end', None))
+        for melding in advarsler:
+            logger.warning(melding)
+        for melding in feil:
+            logger.error(melding)
+        if feil:
+            bad.add(alias)
+    return bad
+
+
+def inspect_main(argv):
+    """
+    Underkommandoen 'sensorplot inspect'.
+
+    Viser kolonner, omtrentlig antall rader, tidsrom og dialekt for mange filer,
+    uten å laste dataene. Resultatene lagres i metadataindeksen i cache-mappen.
+    """
+    parser = argparse.ArgumentParser(
+        prog=f'sensorplot {CMD_INSPECT}',
+        description="Leser bare header og første/siste tidsstempel fra loggerfiler.")
+    parser.add_argument('paths', nargs='*', help='Filer som skal inspiseres (alias = filnavn uten endelse).')
+    parser.add_argument(f'--{ARG_CONFIG}', '-c', dest='config_file',
+                        type=str, help='Sti til YAML-konfig (bruker filene under files:).')
+    parser.add_argument(f'--{ARG_FILES}', dest='input_files', nargs='+',
+                        help='Liste over filer. Format: Alias=Filnavn.xlsx')
+    parser.add_argument(f'--{ARG_COL_DATE}', dest='col_date',
+                        type=str, default=None, help='Global Dato-kolonne')
+    parser.add_argument(f'--{ARG_COL_TIME}', dest='col_time',
+                        type=str, default=None, help='Global Tid-kolonne')
+    parser.add_argument(f'--{ARG_WORKERS}', dest='workers', type=int, default=DEFAULT_INSPECT_WORKERS,
+                        help=f'Antall filer som inspiseres samtidig (standard: {DEFAULT_INSPECT_WORKERS}).')
+    parser.add_argument(f'--{ARG_OUTPUT}', dest='output_file', type=str, default=None,
+                        help='Skriv indeksen som JSON til denne filen.')
+    args = parser.parse_args(argv)
+
+    files_dict = {}
+    settings = {}
+    if args.config_file:
+        cfg = load_config_file(args.config_file)
+        settings = cfg.get('settings', {})
+        files_dict = normalize_files_dict(cfg.get('files', {}))
+    if args.input_files:
+        files_dict.update(parse_files_arg(args.input_files))
+    for p in args.paths:
+        files_dict[Path(p).stem] = {'path': p, 'cols': {}}
+
+    if not files_dict:
+        logger.error("Ingen filer definert.")
+        sys.exit(1)
+
+    col_time = args.col_time if args.col_time else settings.get('col_time', DEF_TIME)
+    if col_time and col_time.lower() == "none":
+        col_time = None
+    global_args = argparse.Namespace(
+        col_date=args.col_date if args.col_date else settings.get('col_date', DEF_DATE),
+        col_data=settings.get('col_data', DEF_DATA),
+        dialect=settings.get('dialect')
+    )
+
+    specs = build_inspect_specs(files_dict, files_dict, global_args, col_time)
+    resultater = inspect_files(specs, workers=args.workers)
+
+    indeks = {}
+    feil = 0
+    for alias, meta in resultater.items():
+        if isinstance(meta, Exception):
+            logger.error(f"{alias}: {meta}")
+            feil += 1
+            continue
+        indeks[alias] = vars(meta)
+        dialekt = ""
+        if meta.dialect:
+            d = meta.dialect
+            dialekt = f" | sep={d['sep']!r} desimal={d['decimal']!r} header={d['header_row']} format={d['date_format']}"
+        logger.info(f"{alias}: {meta.path}")
+        logger.info(f"    rader ≈ {meta.rows_estimate} | {meta.first or '?'} -> {meta.last or '?'}{dialekt}")
+        logger.info(f"    kolonner: {', '.join(meta.columns)}")
+
+    if args.output_file:
+        Path(args.output_file).write_text(json.dumps(indeks, ensure_ascii=False, indent=2), encoding='utf-8')
+        logger.info(f"Indeks skrevet til {args.output_file}")
+
+    if feil:
+        sys.exit(1)
 
-    logger.info(f"Ferdig med del-serie: '{series_label}'")
-    return SensorResult(label=series_label, df=merged_df)
 
+SUBCOMMANDS = {
+    CMD_INGEST: ingest_main,
+    CMD_INSPECT: inspect_main,
+}
 
-def main():
+
+def main(argv=None):
     logging.basicConfig(level=logging.INFO,
                         format='%(levelname)s: %(message)s')
 
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in SUBCOMMANDS:
+        return SUBCOMMANDS[argv[0]](argv[1:])
+
     parser = argparse.ArgumentParser(
         description=BESKRIVELSE, epilog=EKSEMPLER, formatter_class=argparse.RawTextHelpFormatter)
 
@@ -257,12 +808,41 @@ def main():
                         type=str, help='Legacy: Enkel formel.')
     parser.add_argument(f'--{ARG_CLEAN}', dest='clean_threshold', nargs='?',
                         const=DEFAULT_Z_SCORE, type=float, default=None, help=f'Fjern støy.')
+    parser.add_argument(f'--{ARG_CLEAN_WINDOW}', dest='clean_window', type=str, default=None,
+                        help='Flagg også avvik fra glidende median i dette vinduet (f.eks. 1D). Brukes med --clean.')
     parser.add_argument(f'--{ARG_TITLE}', dest='plot_title',
                         type=str, default=None, help='Tittel')
     parser.add_argument(f'--{ARG_OUTPUT}', dest='output_file', nargs='?',
                         const='sensorplot.png', default=None, type=str, help='Lagre plott.')
     parser.add_argument(f'--{ARG_X_INT}', dest='x_interval',
                         type=str, default=None, help='Manuell X-akse.')
+    parser.add_argument(f'--{ARG_OVERLAP}', dest='overlap', choices=OVERLAP_POLICIES,
+                        default=None, help=f'Regel for overlapp ved sammenslåing (standard: {DEFAULT_OVERLAP}).')
+    parser.add_argument(f'--{ARG_WORKERS}', dest='workers', nargs='+', default=None,
+                        help='Arbeidere per steg (load, align, eval, clean). Eks: 4 eller load=8 eval=2')
+    parser.add_argument(f'--{ARG_FROM}', dest='time_from', type=str, default=None,
+                        help='Start på tidsvindu (f.eks. 2024-03-01 eller "2024-03-01 12:00").')
+    parser.add_argument(f'--{ARG_TO}', dest='time_to', type=str, default=None,
+                        help='Slutt på tidsvindu. En ren dato tar med hele dagen.')
+    parser.add_argument(f'--{ARG_SPLIT}', dest='split', action='store_true',
+                        help='Én PNG per serie (navn_Serie.png), tegnet parallelt. Krever --output.')
+    parser.add_argument(f'--{ARG_TOLERANCE}', dest='tolerance', type=str, default=None,
+                        help="Maks tidsavstand ved sammenslåing (f.eks. 30s). Standard 'auto': fra måleintervallet.")
+    parser.add_argument(f'--{ARG_STATS}', dest='stats', type=str, default=None,
+                        help='Statistikk per periode (D, W, M, Y eller f.eks. 6h) i stedet for plott i vindu.')
+    parser.add_argument(f'--{ARG_STATS_OUT}', dest='stats_out', type=str, default=None,
+                        help='Fil for statistikken (.csv eller .parquet). Standard: ved siden av --output.')
+    parser.add_argument(f'--{ARG_EXCEL}', dest='excel', type=str, default=None,
+                        help='Eksporter seriene til Excel (.xlsx), ett ark per serie.')
+    parser.add_argument(f'--{ARG_EXCEL_FORMAT}', dest='excel_format', choices=EXCEL_PRESETS, default=None,
+                        help=f"Dato-/tidsformat i Excel: 'no' (dato og tid hver for seg) eller 'iso' "
+                             f"(standard: {DEFAULT_EXCEL_PRESET}).")
+    parser.add_argument(f'--{ARG_DECIMALS}', dest='decimals', type=int, default=None,
+                        help='Antall desimaler som vises i Excel-eksporten.')
+    parser.add_argument(f'--{ARG_MAX_MEMORY}', dest='max_memory', type=str, default=None,
+                        help='Minnebudsjett (f.eks. 4G eller 512M). Standard: halvparten av maskinens minne.')
+    parser.add_argument(f'--{ARG_NO_CACHE}', dest='no_cache', action='store_true',
+                        help='Beregn og tegn alt på nytt, uten å bruke tidligere resultater.')
 
     # Kolonner (Globale defaults)
     parser.add_argument(f'--{ARG_COL_DATE}', dest='col_date',
@@ -272,7 +852,7 @@ def main():
     parser.add_argument(f'--{ARG_COL_DATA}', dest='col_data',
                         type=str, default=None, help='Global Data-kolonne')
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
     # --- VARIABLER ---
     files_dict = {}  # Format: {'Alias': {'path': '...', 'cols': {...}}}
@@ -284,8 +864,23 @@ def main():
         'col_data': DEF_DATA,
         'title': "Sensor Plot",
         'clean': None,
+        'clean_window': None,
+        'exclude': None,
         'output': None,
-        'x_interval': None
+        'x_interval': None,
+        'overlap': DEFAULT_OVERLAP,
+        'from': None,
+        'to': None,
+        'workers': None,
+        'dialect': None,
+        'split': False,
+        'tolerance': None,
+        'stats': None,
+        'stats_out': None,
+        'excel': None,
+        'excel_format': DEFAULT_EXCEL_PRESET,
+        'decimals': None,
+        'max_memory': None
     }
 
     # 1. LAST FRA CONFIG
@@ -303,7 +898,13 @@ def main():
         files_dict = normalize_files_dict(raw_files)
 
         for s in cfg.get('series', []):
-            plot_definitions.append((s['label'], s['formula']))
+            label, panel = tolk_panel(s['label'])
+            formula = s['formula']
+            if 'for' in s:
+                # 'for: "L*"' er kortform for '... for alias in L*'
+                loop = str(s['for'])
+                formula += f" for {loop}" if ' in ' in loop else f" for {DEFAULT_TEMPLATE_VAR} in {loop}"
+            plot_definitions.append((label, formula, s.get('panel', panel)))
 
     # 2. OVERSTYR MED CLI
     if args.input_files:
@@ -316,9 +917,11 @@ def main():
                 logger.error(f"Serie feilformat: {s}")
                 sys.exit(1)
             lbl, frm = s.split("=", 1)
-            plot_definitions.append((lbl.strip(), frm.strip()))
+            # '[Panel] Navn=formel' legger serien i et eget panel
+            label, panel = tolk_panel(lbl)
+            plot_definitions.append((label, frm.strip(), panel))
     elif args.calc_formula:
-        plot_definitions.append(("Resultat", args.calc_formula))
+        plot_definitions.append(("Resultat", args.calc_formula, None))
 
     if not files_dict:
         logger.error("Ingen filer definert.")
@@ -334,12 +937,94 @@ def main():
     final_title = args.plot_title if args.plot_title else config_defaults['title']
     final_output = args.output_file if args.output_file else config_defaults['output']
     final_x_int = args.x_interval if args.x_interval else config_defaults['x_interval']
+    final_overlap = args.overlap if args.overlap else config_defaults['overlap']
+
+    final_split = args.split or bool(config_defaults['split'])
+    if final_split and not final_output:
+        logger.error(f"--{ARG_SPLIT} krever --{ARG_OUTPUT} (filnavnet brukes som mal).")
+        sys.exit(1)
+
+    if final_overlap not in OVERLAP_POLICIES:
+        logger.error(f"Ugyldig overlapp-regel '{final_overlap}'. Gyldige: {', '.join(OVERLAP_POLICIES)}")
+        sys.exit(1)
+
+    try:
+        final_start = tolk_tidsgrense(args.time_from if args.time_from else config_defaults['from'])
+        final_end = tolk_tidsgrense(args.time_to if args.time_to else config_defaults['to'], slutt=True)
+    except ValueError as e:
+        logger.error(f"Ugyldig tidsvindu: {e}")
+        sys.exit(1)
+
+    try:
+        final_workers = parse_workers(args.workers if args.workers else config_defaults['workers'])
+    except ValueError as e:
+        logger.error(f"Ugyldig antall arbeidere: {e}")
+        sys.exit(1)
+
+    if final_start is not None and final_end is not None and final_start > final_end:
+        logger.error(f"Tidsvinduet starter ({final_start}) etter at det slutter ({final_end}).")
+        sys.exit(1)
 
     if args.clean_threshold is not None:
         final_clean = args.clean_threshold
     else:
         final_clean = config_defaults['clean']
 
+    try:
+        final_cleaning = Rensing(
+            z_score=final_clean,
+            vindu=parse_clean_window(args.clean_window or config_defaults['clean_window']),
+            perioder=parse_exclude(config_defaults['exclude']),
+        )
+    except ValueError as e:
+        logger.error(f"Ugyldig støyvask: {e}")
+        sys.exit(1)
+
+    try:
+        final_tolerance = parse_tolerance(args.tolerance if args.tolerance else config_defaults['tolerance'])
+        alias_tolerances = {alias: parse_tolerance(info['tolerance'])
+                            for alias, info in files_dict.items() if 'tolerance' in info}
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    # 'auto' for ett alias er det samme som ingen overstyring
+    alias_tolerances = {alias: tol for alias, tol in alias_tolerances.items() if tol is not None}
+
+    final_stats = args.stats if args.stats else config_defaults['stats']
+    final_stats_out = args.stats_out if args.stats_out else config_defaults['stats_out']
+    if final_stats:
+        try:
+            final_stats = parse_period(final_stats)
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        final_stats_out = Path(final_stats_out) if final_stats_out else stats_path(final_output)
+        if final_stats_out.suffix.lower() not in STATS_FORMATS:
+            logger.error(f"--{ARG_STATS_OUT} må slutte på {' eller '.join(STATS_FORMATS)}: {final_stats_out}")
+            sys.exit(1)
+
+    final_excel = args.excel if args.excel else config_defaults['excel']
+    if final_excel:
+        final_excel = Path(final_excel)
+        try:
+            final_excel_format = excel_format(
+                args.excel_format if args.excel_format else config_defaults['excel_format'],
+                args.decimals if args.decimals is not None else config_defaults['decimals'])
+        except ValueError as e:
+            logger.error(str(e))
+            sys.exit(1)
+        if final_excel.suffix.lower() != '.xlsx':
+            logger.error(f"--{ARG_EXCEL} må slutte på .xlsx: {final_excel}")
+            sys.exit(1)
+
+    try:
+        final_max_memory = parse_memory(args.max_memory if args.max_memory else config_defaults['max_memory'])
+    except ValueError as e:
+        logger.error(str(e))
+        sys.exit(1)
+    if final_max_memory is None:
+        final_max_memory = default_budget()
+
     if final_col_time and final_col_time.lower() == "none":
         final_col_time = None
 
@@ -353,47 +1038,145 @@ def main():
     global_args = argparse.Namespace(
         col_date=final_col_date,
         col_data=final_col_data,
-        clean_threshold=final_clean
+        cleaning=final_cleaning,
+        start=final_start,
+        end=final_end,
+        dialect=config_defaults['dialect'],
+        overlap=final_overlap
     )
 
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        futures = []
-        for label, formula in plot_definitions:
-            future = executor.submit(
-                process_single_series,
-                label, formula, files_dict, loaded_dfs_cache,
-                global_args, final_col_time
-            )
-            futures.append(future)
-
-        for future in concurrent.futures.as_completed(futures):
-            res = future.result()
-            if res:
-                raw_results.append(res)
+    if final_start is not None or final_end is not None:
+        logger.info(f"Tidsvindu: {final_start or 'start'} -> {final_end or 'slutt'}")
+
+    jobs = []
+    for label, formula, panel, template, target in expand_definitions(plot_definitions, files_dict):
+        job = prepare_series(label, formula, files_dict, panel=panel)
+        if job is not None:
+            job.template, job.target = template, target
+        if job is None:
+            logger.error(f"Fant ingen kjente aliaser i formelen: {formula}")
+            continue
+        feil = check_formula_columns(job, files_dict, global_args, final_col_time)
+        if feil:
+            for melding in feil:
+                logger.error(f"  -> {melding}")
+            continue
+        jobs.append(job)
+
+    # Rekkefølgen i konfigurasjonen bestemmer farger og panelrekkefølge, ikke hvilken serie som ble ferdig først
+    label_order = {label: i for i, label in reversed(list(enumerate(job.label for job in jobs)))}
+
+    # Velg strategi ut fra anslått minnebruk før noe tungt lastes. Planen kommer før
+    # kjøre-cachen, siden float32-resultater ikke skal gjenbrukes som float64 (og omvendt).
+    plan = None
+    if jobs:
+        plan = build_memory_plan(files_dict, group_families(jobs), global_args, final_col_time,
+                                 final_max_memory, final_workers)
+        log_plan(plan)
+        global_args.value_dtype = plan.value_dtype
+        global_args.chunk_rows = plan.chunk_rows
+
+    # Gjenbruk tidligere resultater når konfigurasjon og filer er uendret
+    keys = [None] * len(jobs)
+    full_key = None
+    if not args.no_cache:
+        cache_settings = {
+            'col_date': final_col_date, 'col_time': final_col_time, 'col_data': final_col_data,
+            'clean': final_cleaning, 'start': final_start, 'end': final_end,
+            'overlap': final_overlap, 'dialect': config_defaults['dialect'],
+            'tolerance': final_tolerance, 'value_dtype': plan.value_dtype if plan else None,
+        }
+        keys = [series_key(job, files_dict, cache_settings) for job in jobs]
+        full_key = run_key(keys, {'title': final_title, 'x_interval': final_x_int,
+                                  'output': final_output, 'split': final_split,
+                                  'panels': [job.panel for job in jobs]})
+        # Statistikk og Excel lagres ikke i kjøre-cachen; serieresultatene gjenbrukes likevel under
+        if not (final_stats or final_excel) and output_is_current(final_output, full_key):
+            logger.info(f"Ingen endringer i konfigurasjon eller filer. Gjenbruker tidligere plott ({final_output}).")
+            return
+
+    pending = []
+    for job, key in zip(jobs, keys):
+        cached = load_series_result(key, job.label, job.panel)
+        if cached is None:
+            pending.append((job, key))
+        else:
+            logger.info(f"Ferdig med del-serie: '{job.label}' (uendret, fra cache)")
+            raw_results.append(cached)
+    all_jobs, jobs = jobs, [job for job, _ in pending]
+    pending_keys = {id(job): key for job, key in pending}
+
+    # Sjekk filer og kolonner mot metadataindeksen før noe tungt lastes
+    needed = list(dict.fromkeys(a for job in jobs for a in job.aliases))
+    bad = validate_sources(files_dict, needed, global_args, final_col_time)
+    if bad:
+        # Bare seriene som bruker en fil med feil hoppes over; resten beregnes som vanlig
+        for job in jobs:
+            if bad.intersection(job.aliases):
+                logger.error(f"  -> Hopper over '{job.label}': {', '.join(sorted(bad.intersection(job.aliases)))} "
+                             f"stemmer ikke med konfigurasjonen. Se 'sensorplot inspect' for kolonnene.")
+        jobs = [job for job in jobs if not bad.intersection(job.aliases)]
+        needed = [a for a in needed if a not in bad]
+        # Plottet mangler seriene over, så det huskes ikke som oppdatert
+        full_key = None
+
+    # Ark i en arbeidsbok som ingen serie bruker lastes ikke (og ville aldri blitt sluppet igjen)
+    needed_set = set(needed)
+
+    def loader(alias):
+        return get_or_load(alias, files_dict, loaded_dfs_cache, global_args, final_col_time, needed_set)
+
+    grouped = group_families(jobs)
+    release, max_in_flight = None, None
+    if plan is not None and plan.sequential:
+        # Én serie om gangen; filer fjernes fra cachen når ingen gjenstående serie trenger dem
+        release, max_in_flight = (lambda alias: loaded_dfs_cache.pop(alias, None)), 1
+
+    pipeline = SeriesPipeline(loader, workers=final_workers, tolerance=final_tolerance, tolerances=alias_tolerances,
+                              release=release, profiles=stored_profiles(files_dict, needed))
+    logger.info("Arbeidere per steg: " + ", ".join(f"{k}={v}" for k, v in pipeline.workers.items()))
+    try:
+        for res in pipeline.run(grouped, cleaning=final_cleaning, max_in_flight=max_in_flight):
+            result = report_series_result(res)
+            if result:
+                raw_results.append(result)
+                save_series_result(pending_keys.get(id(res.job)), result)
+    except KeyboardInterrupt:
+        pipeline.token.cancel()
+        logger.warning("Avbrutt av bruker.")
+        sys.exit(130)
 
     if not raw_results:
         logger.warning("Ingen data å plotte.")
         return
 
     logger.info("Konsoliderer serier...")
-    consolidated_dict = {}
-    for res in raw_results:
-        if res.label not in consolidated_dict:
-            consolidated_dict[res.label] = []
-        consolidated_dict[res.label].append(res.df)
-
-    final_results = []
-    for label, dfs in consolidated_dict.items():
-        if len(dfs) == 1:
-            final_results.append(SensorResult(label=label, df=dfs[0]))
-        else:
-            logger.info(f"  -> Slår sammen {len(dfs)} deler for '{label}'.")
-            combined_df = pd.concat(dfs).sort_values('Datetime')
-            final_results.append(SensorResult(label=label, df=combined_df))
+    final_results = consolidate_results(raw_results, overlap=final_overlap)
+    final_results.sort(key=lambda r: label_order.get(r.label, len(label_order)))
+
+    if final_stats:
+        logger.info(f"Beregner statistikk per periode ({final_stats})...")
+        write_stats(compute_stats(final_results, final_stats), final_stats_out)
+    if final_excel:
+        logger.info(f"Eksporterer til Excel ({final_excel})...")
+        # Samme kolonnenavn som i innstillingene, så filen kan leses inn igjen med ark = serienavn
+        write_excel(final_results, final_excel, final_excel_format,
+                    col_date=final_col_date, col_time=final_col_time, col_data=final_col_data)
+    if (final_stats or final_excel) and not final_output:
+        # Eksport-modus: uten --output vises ikke noe plott
+        return
 
     logger.info("Genererer plott...")
-    plot_resultat(final_results, final_title,
-                  output_file=final_output, x_interval=final_x_int)
+    pyramids = store_pyramids(final_results, all_jobs, files_dict, global_args, final_col_time)
+    if final_split:
+        written = plot_per_serie(final_results, final_title, final_output, x_interval=final_x_int,
+                                 pyramids=pyramids)
+        if len(written) == len(delte_figurer(final_results)):
+            remember_output(final_output, full_key, files=written)
+    else:
+        plot_resultat(final_results, final_title,
+                      output_file=final_output, x_interval=final_x_int, pyramids=pyramids)
+        remember_output(final_output, full_key)
 
 
 if __name__ == "__main__":
@@ -1,211 +1,681 @@
+import concurrent.futures
+import enum
 from dataclasses import dataclass
 from pathlib import Path
 import pandas as pd
+import numpy as np
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+import io
 import logging
 import re 
+from typing import BinaryIO, Callable
+from sensorplot.archive import inner_suffix, is_compressed, open_stream, read_head, read_member
+from sensorplot.dialect import SNIFF_BYTES, Dialect, in_memory, resolve_dialect, source_name, source_suffix
+from sensorplot.interval import index_from_labels, segment_index, with_breaks
+from sensorplot.pyramid import overview
+from sensorplot.store import STORE_SUFFIX, read_store
+from sensorplot.window import csv_byte_vindu, filtrer_tidsvindu
 
 # Opprett logger for denne modulen
 logger = logging.getLogger(__name__)
 
+# Størrelse på plott (tommer) og antall tråder når flere figurer tegnes samtidig
+FIGSIZE = (14, 7)
+DEFAULT_RENDER_WORKERS = 4
+# Høyde per panel (tommer) når seriene fordeles på flere paneler
+PANEL_HEIGHT = 3.5
+
 # --- DATACLASS ---
 @dataclass
 class SensorResult:
     label: str
     df: pd.DataFrame
+    panel: str | None = None
 
 # --- TYPE HINTING ---
-def last_og_rens_data(
-    filsti: str | Path, 
-    alias: str, 
-    col_date: str, 
-    col_time: str | None, 
-    col_data: str
-) -> pd.DataFrame:
+def _les_excel_ark(
+    xl: pd.ExcelFile,
+    sheet: str | int,
+    col_date: str,
+    path: Path | bytes,
+    col_time: str | None = None,
+    overrides: dict | None = None
+) -> tuple[pd.DataFrame, Dialect]:
     """
-    Laster Excel eller CSV-fil med automatisk deteksjon av format og metadata.
+    Leser ett ark fra en allerede åpnet arbeidsbok.
+    Header-rad og datoformat hentes fra dialektregisteret (detekteres første gang).
     """
-    path = Path(filsti)
-    if not path.exists():
-        raise FileNotFoundError(f"Finner ikke filen '{path}'")
+    dialect = resolve_dialect(path, col_date, col_time, sheet, overrides, xl=xl)
+    df = xl.parse(sheet_name=sheet, header=dialect.header_row)
+    return df, dialect
 
-    ext = path.suffix.lower()
-    day_first_config = False
 
-    match ext:
-        case '.xlsx':
-            df_peek = pd.read_excel(path, engine='openpyxl', nrows=30, header=None)
-            
-            header_row = 0
-            found_header = False
-            
-            for idx, row in df_peek.iterrows():
-                row_values = [str(val).strip() for val in row.values]
-                if col_date in row_values:
-                    header_row = int(idx) # type: ignore
-                    found_header = True
-                    break
-            
-            if not found_header:
-                logger.warning(f"Fant ikke '{col_date}' i toppen av {path}. Leser fra start.")
+def _tolk_tid(verdier: pd.Series, dialect: Dialect) -> pd.Series:
+    if dialect.date_format:
+        return pd.to_datetime(verdier, format=dialect.date_format)
+    return pd.to_datetime(verdier, dayfirst=dialect.dayfirst)
 
-            df = pd.read_excel(path, engine='openpyxl', header=header_row)
-            
-            if not df.empty and col_date in df.columns:
-                first_val = df[col_date].dropna().iloc[0]
-                if isinstance(first_val, str) and '.' in first_val:
-                    day_first_config = True
-                else:
-                    day_first_config = False
-        
-        case '.csv':
-            header_row = 0
-            encoding = 'latin1'
-            header_line_content = ""
-            
-            with open(path, 'r', encoding=encoding) as f:
-                for i, line in enumerate(f):
-                    if col_date in line:
-                        header_row = i
-                        header_line_content = line
-                        break
-            
-            if ';' in header_line_content:
-                sep = ';'
-                decimal = ','
-                day_first_config = True
-            else:
-                sep = ','
-                decimal = '.'
-                day_first_config = False
-            
-            df = pd.read_csv(
-                path, 
-                sep=sep, 
-                decimal=decimal, 
-                skiprows=header_row, 
-                encoding=encoding,
-                on_bad_lines='skip'
-            )
-            
-        case _:
-            raise ValueError(f"Ukjent filformat: {ext}")
-    
+
+def _dialekt_hint(dialect: Dialect) -> str:
+    if dialect.date_format:
+        return f" (datoformat '{dialect.date_format}'. Overstyr med 'dialect: {{date_format: ...}}' i YAML)"
+    return ""
+
+
+def _lag_datetime(
+    df: pd.DataFrame,
+    path: Path,
+    alias: str,
+    col_date: str,
+    col_time: str | None,
+    dialect: Dialect
+) -> pd.DataFrame:
+    """
+    Rydder kolonnenavn, lager 'Datetime'-kolonnen og sorterer på tid.
+    Med et kjent datoformat tolkes alle rader strengt med det, så en feil gir
+    feilmelding i stedet for feiltolkede datoer.
+    """
     df.columns = [str(c).strip() for c in df.columns]
-    
-    if col_data not in df.columns:
-         raise ValueError(f"Fant ikke datakolonnen '{col_data}' i {path}. Tilgjengelige: {df.columns.tolist()}")
 
     if col_time and col_time in df.columns:
         if col_date not in df.columns:
              raise ValueError(f"Mangler datokolonne '{col_date}' i {path}")
         try:
-            df['Datetime'] = pd.to_datetime(
-                df[col_date].astype(str) + ' ' + df[col_time].astype(str), 
-                dayfirst=day_first_config
-            )
+            df['Datetime'] = _tolk_tid(
+                df[col_date].astype(str) + ' ' + df[col_time].astype(str), dialect)
         except Exception as e:
-            raise ValueError(f"Feil ved dato/tid sammenslåing i {alias}: {e}")
+            raise ValueError(f"Feil ved dato/tid sammenslåing i {alias}: {e}{_dialekt_hint(dialect)}")
 
     elif col_date in df.columns:
         try:
-            df['Datetime'] = pd.to_datetime(
-                df[col_date].astype(str), 
-                dayfirst=day_first_config
-            )
+            df['Datetime'] = _tolk_tid(df[col_date].astype(str), dialect)
         except Exception as e:
-             raise ValueError(f"Kunne ikke tolke '{col_date}' som dato i {alias}: {e}")
+             raise ValueError(f"Kunne ikke tolke '{col_date}' som dato i {alias}: {e}{_dialekt_hint(dialect)}")
     else:
         raise ValueError(f"Fant verken '{col_date}' eller '{col_time}' i {path}.")
     
-    df = df.sort_values('Datetime')
+    return df.sort_values('Datetime')
+
+
+def _ferdigstill_data(
+    df: pd.DataFrame,
+    path: Path,
+    alias: str,
+    col_date: str,
+    col_time: str | None,
+    col_data: str,
+    dialect: Dialect
+) -> pd.DataFrame:
+    """Lager 'Datetime'-kolonnen, sorterer og plukker ut datakolonnen som 'Alias.Kolonne'."""
+    df.columns = [str(c).strip() for c in df.columns]
+    
+    if col_data not in df.columns:
+         raise ValueError(f"Fant ikke datakolonnen '{col_data}' i {path}. Tilgjengelige: {df.columns.tolist()}")
+
+    df = _lag_datetime(df, path, alias, col_date, col_time, dialect)
     
     df_clean = df[['Datetime', col_data]].copy()
     df_clean.columns = ['Datetime', f'{alias}.{col_data}']
     
     return df_clean
 
+
+def _les_csv(
+    kilde,
+    d: Dialect,
+    skiprows: int = 0,
+    chunk_rows: int | None = None,
+    ferdig: Callable[[pd.DataFrame, Dialect], pd.DataFrame] | None = None
+) -> tuple[pd.DataFrame, bool]:
+    """
+    pd.read_csv med dialekten. Returnerer (DataFrame, ferdig_brukt).
+
+    Med `chunk_rows` og `ferdig` leses filen i biter, og hver bit gjøres ferdig (f.eks. bare
+    'Datetime' og datakolonnen) før neste leses. Toppminnet styres da av bitstørrelsen og
+    ikke av hvor mange kolonner og rader filen har.
+    """
+    les = dict(sep=d.sep, decimal=d.decimal, skiprows=skiprows, encoding=d.encoding, on_bad_lines='skip')
+    if not chunk_rows or ferdig is None:
+        return pd.read_csv(kilde, **les), False
+
+    with pd.read_csv(kilde, chunksize=chunk_rows, **les) as biter:
+        deler = [ferdig(bit, d) for bit in biter]
+    if not deler:
+        # Bare header (eller tom fil): ingen biter å gjøre ferdig
+        return pd.DataFrame(), False
+    return pd.concat(deler, ignore_index=True).sort_values('Datetime'), True
+
+
+def _les_raadata(
+    path: Path,
+    col_date: str,
+    sheet: str | int | None = None,
+    col_time: str | None = None,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+    dialect: dict | None = None,
+    data: bytes | None = None,
+    member: str | None = None,
+    chunk_rows: int | None = None,
+    ferdig: Callable[[pd.DataFrame, Dialect], pd.DataFrame] | None = None
+) -> tuple[pd.DataFrame, Dialect]:
+    """
+    Leser en Excel- eller CSV-fil slik den er. Formatet (tegnkoding, skilletegn, desimaltegn,
+    header-rad, datoformat) hentes fra dialektregisteret, med `dialect` som overstyring.
+    Med start/end leses bare byte-området som dekker tidsvinduet fra tidssorterte CSV-filer
+    (radene må fortsatt filtreres nøyaktig etterpå). Returnerer (DataFrame, Dialect).
+    Med `data` leses innholdet rett fra minnet; `path` brukes da bare til filtype og meldinger.
+
+    Komprimerte filer (.gz, .zst, .zip) pakkes ut strømmende: CSV leses av pandas i én
+    passering rett fra strømmen, mens Excel pakkes ut i minnet. `member` velger filen i et zip-arkiv.
+
+    Med `ferdig` returneres ferdige data i stedet for rådata. Med `chunk_rows` i tillegg leses
+    CSV i biter som gjøres ferdige én for én (se _les_csv); Excel leses alltid helt.
+    """
+    ext = source_suffix(path, data)
+    pakket = is_compressed(path)
+    if pakket:
+        ext = inner_suffix(path, member, data)
+        if ext == '.xlsx':
+            # Arbeidsboken er selv et zip-arkiv og trenger tilfeldig tilgang
+            data = read_member(path, member, data)
+            pakket = False
+    kilde = path if data is None else data
+    ferdig_brukt = False
+
+    match ext:
+        case '.xlsx':
+            with pd.ExcelFile(path if data is None else io.BytesIO(data), engine='openpyxl') as xl:
+                df, d = _les_excel_ark(
+                    xl, sheet if sheet is not None else 0, col_date, kilde, col_time, dialect)
+        
+        case '.csv' if pakket:
+            # Dialekten detekteres fra starten av strømmen; tidsvinduet filtreres etter innlesing
+            hode = kilde if data is None else read_head(path, member, data, n=SNIFF_BYTES)
+            d = resolve_dialect(hode, col_date, col_time, overrides=dialect, member=member)
+            with open_stream(path, member, data) as f:
+                df, ferdig_brukt = _les_csv(f, d, d.header_row, chunk_rows, ferdig)
+
+        case '.csv':
+            d = resolve_dialect(kilde, col_date, col_time, overrides=dialect)
+            
+            vindu = None
+            if data is None and (start is not None or end is not None):
+                vindu = csv_byte_vindu(path, d.encoding, d.header_row, d.sep, col_date,
+                                       col_time, d.dayfirst, start, end, d.date_format)
+
+            if vindu:
+                # Les bare headeren og byte-området som dekker tidsvinduet
+                header_line, fra, til = vindu
+                with open(path, 'rb') as f:
+                    f.seek(fra)
+                    data = f.read(til - fra)
+                logger.debug(f"Tidsvindu i {path}: leser {len(data)} av {path.stat().st_size} bytes.")
+                df, ferdig_brukt = _les_csv(io.BytesIO(header_line + data), d, 0, chunk_rows, ferdig)
+            else:
+                df, ferdig_brukt = _les_csv(
+                    path if data is None else io.BytesIO(data), d, d.header_row, chunk_rows, ferdig)
+            
+        case _:
+            raise ValueError(f"Ukjent filformat: {ext}")
+
+    if ferdig is not None and not ferdig_brukt:
+        df = ferdig(df, d)
+    return df, d
+
+
+def last_og_rens_data(
+    filsti: str | Path | bytes | BinaryIO,
+    alias: str, 
+    col_date: str, 
+    col_time: str | None, 
+    col_data: str,
+    sheet: str | int | None = None,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+    dialect: dict | None = None,
+    member: str | None = None,
+    chunk_rows: int | None = None
+) -> pd.DataFrame:
+    """
+    Laster Excel, CSV eller sensorplot-lager (.spb) med automatisk deteksjon av format og metadata.
+    For Excel kan `sheet` (navn eller indeks) velge et annet ark enn det første.
+    `dialect` overstyrer felt i det detekterte formatet (se sensorplot.dialect.Dialect).
+    Med `start`/`end` returneres bare tidsvinduet [start, end]. For lager og tidssorterte
+    CSV-filer leses da bare den delen av filen som trengs.
+
+    `filsti` kan også være innholdet i minnet (bytes eller BytesIO, f.eks. en opplastet fil
+    i GUI). Det leses da direkte fra bufferet, uten å skrive en midlertidig fil.
+
+    CSV og Excel kan også ligge komprimert (.csv.gz, .csv.zst) eller i et zip-arkiv;
+    `member` velger da filen i arkivet (navn eller mønster, se sensorplot.archive).
+
+    Med `chunk_rows` leses CSV i biter på så mange rader, og bare tid og datakolonne beholdes
+    fra hver bit. Brukes når minnebudsjettet er stramt (se sensorplot.planner).
+    """
+    data = in_memory(filsti)
+    if data is not None:
+        path = Path(source_name(filsti))
+        if source_suffix(filsti, data) == STORE_SUFFIX:
+            raise ValueError(f"Lager ({STORE_SUFFIX}) må leses fra fil, ikke fra minnet: {path}")
+    else:
+        path = Path(filsti)
+        if not path.exists():
+            raise FileNotFoundError(f"Finner ikke filen '{path}'")
+
+        if path.suffix.lower() == STORE_SUFFIX:
+            # Lageret er allerede tidssortert og har ferdige kanaler, lastes uten kopiering
+            df = read_store(path, channels=[col_data], start=start, end=end)
+            df.columns = ['Datetime', f'{alias}.{col_data}']
+            return df
+
+    def ferdig(raa: pd.DataFrame, d: Dialect) -> pd.DataFrame:
+        return filtrer_tidsvindu(_ferdigstill_data(raa, path, alias, col_date, col_time, col_data, d), start, end)
+
+    df, _ = _les_raadata(path, col_date, sheet, col_time, start, end, dialect, data=data, member=member,
+                         chunk_rows=chunk_rows, ferdig=ferdig)
+    return df
+
+
+def last_alle_kanaler(
+    filsti: str | Path,
+    col_date: str,
+    col_time: str | None,
+    sheet: str | int | None = None,
+    kanaler: list[str] | None = None,
+    dialect: dict | None = None,
+    member: str | None = None
+) -> pd.DataFrame:
+    """
+    Laster en loggerfil med 'Datetime' og numeriske kanaler (f.eks. ch1, ch2, Temp).
+    Uten `kanaler` tas alle numeriske kolonner med som ikke er helt tomme.
+    Brukes av 'sensorplot ingest' for å bygge lageret.
+    """
+    path = Path(filsti)
+    if not path.exists():
+        raise FileNotFoundError(f"Finner ikke filen '{path}'")
+
+    df, d = _les_raadata(path, col_date, sheet, col_time, dialect=dialect, member=member)
+    df = _lag_datetime(df, path, path.stem, col_date, col_time, d)
+
+    if kanaler:
+        mangler = [k for k in kanaler if k not in df.columns]
+        if mangler:
+            raise ValueError(f"Fant ikke kanalene {mangler} i {path}. Tilgjengelige: {df.columns.tolist()}")
+    else:
+        kanaler = [
+            c for c in df.select_dtypes(include='number').columns
+            if c not in (col_date, col_time) and df[c].notna().any()
+        ]
+    return df[['Datetime'] + kanaler].reset_index(drop=True)
+
+
+def last_arbeidsbok(
+    filsti: str | Path,
+    oppslag: dict[str, dict],
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None
+) -> dict[str, pd.DataFrame | Exception]:
+    """
+    Laster flere alias fra samme Excel-arbeidsbok med én åpning av filen.
+
+    Args:
+        filsti (str | Path): Sti til .xlsx-filen.
+        oppslag (dict): {'alias': {'sheet': ..., 'col_date': ..., 'col_time': ..., 'col_data': ...}}.
+            Manglende 'sheet' betyr første ark. Valgfri 'dialect' overstyrer formatet.
+        start, end: Valgfritt tidsvindu som resultatene filtreres til.
+
+    Returns:
+        dict: {'alias': DataFrame} for vellykkede alias. Feil per alias returneres som
+              unntaksobjektet, slik at ett ødelagt ark ikke stopper de andre.
+    """
+    path = Path(filsti)
+    if not path.exists():
+        raise FileNotFoundError(f"Finner ikke filen '{path}'")
+
+    resultater: dict[str, pd.DataFrame | Exception] = {}
+    # Hvert ark leses bare én gang per datokolonne, selv om flere alias bruker det
+    lest: dict[tuple, tuple[pd.DataFrame, Dialect]] = {}
+
+    with pd.ExcelFile(path, engine='openpyxl') as xl:
+        for alias, spec in oppslag.items():
+            sheet = spec.get('sheet')
+            sheet = sheet if sheet is not None else 0
+            key = (sheet, spec['col_date'], spec.get('col_time'), repr(spec.get('dialect')))
+            try:
+                if key not in lest:
+                    lest[key] = _les_excel_ark(
+                        xl, sheet, spec['col_date'], path, spec.get('col_time'), spec.get('dialect'))
+                df, d = lest[key]
+                resultater[alias] = filtrer_tidsvindu(_ferdigstill_data(
+                    df.copy(), path, alias, spec['col_date'],
+                    spec.get('col_time'), spec['col_data'], d
+                ), start, end)
+            except Exception as e:
+                resultater[alias] = e
+
+    return resultater
+
+# --- KVALITETSFLAGG ---
+# Kolonne med flagg per rad (uint8) ved siden av verdiene. 0 = god måling.
+FLAG_COLUMN = 'Flagg'
+
+
+class QualityFlag(enum.IntFlag):
+    """Hvorfor en måling er merket som tvilsom. Flere grunner kan kombineres i samme rad."""
+    ZSCORE = 1   # Mer enn z_score standardavvik fra snittet for hele serien
+    ROLLING = 2  # Mer enn z_score standardavvik fra glidende median (lokale spikes)
+    MANUAL = 4   # Innenfor en periode som er utelatt manuelt
+
+
+@dataclass(frozen=True)
+class Rensing:
+    """
+    Hvilke målinger som flagges. Verdiene endres aldri, så en ny terskel krever
+    bare nye flagg, ikke ny innlesing og sammenslåing.
+
+    Args:
+        z_score (float | None): Terskel i standardavvik (None = ingen støyvask).
+        vindu (str | None): Tidsvindu for glidende median (f.eks. '1D'). Brukes sammen med z_score.
+        perioder (tuple): Manuelt utelatte perioder som (start, slutt). None betyr åpen ende.
+    """
+    z_score: float | None = None
+    vindu: str | None = None
+    perioder: tuple = ()
+
+    @property
+    def aktiv(self) -> bool:
+        return self.z_score is not None or bool(self.perioder)
+
+
+def lag_flagg(df: pd.DataFrame, kolonne: str, rensing: Rensing) -> np.ndarray:
+    """Flagg (uint8, se QualityFlag) per rad for `kolonne`. `df` må være sortert på 'Datetime'."""
+    flagg = np.zeros(len(df), dtype=np.uint8)
+    verdier = df[kolonne].to_numpy(dtype=float, na_value=np.nan)
+
+    if rensing.z_score is not None and len(verdier) > 1:
+        std = np.nanstd(verdier, ddof=1)
+        if std > 0:
+            with np.errstate(invalid='ignore'):
+                flagg[np.abs(verdier - np.nanmean(verdier)) > rensing.z_score * std] |= np.uint8(QualityFlag.ZSCORE)
+
+    if rensing.vindu and rensing.z_score is not None and len(verdier) > 1:
+        rullende = pd.Series(verdier, index=pd.DatetimeIndex(df['Datetime'])).rolling(
+            rensing.vindu, center=True, min_periods=2)
+        median = rullende.median().to_numpy()
+        std = rullende.std().to_numpy()
+        with np.errstate(invalid='ignore'):
+            flagg[np.abs(verdier - median) > rensing.z_score * std] |= np.uint8(QualityFlag.ROLLING)
+
+    if rensing.perioder:
+        tider = df['Datetime'].to_numpy()
+        for start, slutt in rensing.perioder:
+            inni = np.ones(len(tider), dtype=bool)
+            if start is not None:
+                inni &= tider >= pd.Timestamp(start).to_datetime64()
+            if slutt is not None:
+                inni &= tider <= pd.Timestamp(slutt).to_datetime64()
+            flagg[inni] |= np.uint8(QualityFlag.MANUAL)
+
+    return flagg
+
+
+def flagg_resultat(df: pd.DataFrame, rensing: Rensing, kolonne: str = 'Resultat') -> tuple[pd.DataFrame, int]:
+    """Grunn kopi av `df` med flaggkolonnen. Returnerer (df, antall flaggede rader)."""
+    flagg = lag_flagg(df, kolonne, rensing)
+    df = df.copy(deep=False)
+    df[FLAG_COLUMN] = flagg
+    return df, int(np.count_nonzero(flagg))
+
+
+def gyldige_rader(df: pd.DataFrame) -> pd.DataFrame:
+    """Radene uten flagg, til plotting og eksport. Uten flagg returneres `df` uendret."""
+    if FLAG_COLUMN not in df.columns:
+        return df
+    ok = df[FLAG_COLUMN].to_numpy() == 0
+    return df if ok.all() else df[ok]
+
+
 def vask_data(df: pd.DataFrame, kolonne: str, z_score: float) -> tuple[pd.DataFrame, int]:
-    data = df[kolonne]
-    std = data.std()
-    
-    if std == 0: return df, 0
-    
-    mean = data.mean()
-    nedre = mean - (z_score * std)
-    ovre = mean + (z_score * std)
-    
-    df_vasket = df[(data >= nedre) & (data <= ovre)].copy()
-    fjernet = len(df) - len(df_vasket)
-    
-    return df_vasket, fjernet
+    """Fjerner radene som z-score flagger (se lag_flagg). Returnerer (df, antall fjernet)."""
+    flagg = lag_flagg(df, kolonne, Rensing(z_score=z_score))
+    return df[flagg == 0], int(np.count_nonzero(flagg))
 
-def plot_resultat(
-    result_series_list: list[SensorResult], 
-    tittel: str, 
-    output_file: str | None = None,
-    x_interval: str | None = None  # <--- NYTT ARGUMENT
-) -> None:
-    """Genererer plottet for FLERE serier."""
-    fig, ax = plt.subplots(figsize=(14, 7))
-    
-    prop_cycle = plt.rcParams['axes.prop_cycle']
-    colors = prop_cycle.by_key()['color']
-    
-    for i, serie in enumerate(result_series_list):
-        df = serie.df
-        label = serie.label
-        farge = colors[i % len(colors)]
-        ax.plot(df['Datetime'], df['Resultat'], label=label, color=farge, linewidth=1.5, alpha=0.9)
-    
-    ax.set_title(tittel, fontsize=14)
-    ax.set_ylabel("Verdi", fontsize=12)
-    
-    # --- X-AKSE FORMATERING ---
-    locator = None
-    
+def tegn_serie(ax, df: pd.DataFrame, label: str, farge, budsjett: int, pyramid=None) -> None:
+    """
+    Tegner 'Resultat' i aksen. Har serien flere punkter enn budsjettet (≈ piksler i
+    bredden), tegnes min/max-båndet og snittet fra pyramiden i stedet for alle rader.
+    Flaggede målinger (se lag_flagg) tegnes ikke, og linjene brytes ved hull i serien.
+    """
+    df = gyldige_rader(df)
+    oversikt = overview(df, 'Resultat', budget=budsjett, pyramid=pyramid)
+    if oversikt is None:
+        # Pyramiden har hullene for hele serien; ellers finnes de fra tidsstemplene
+        segmenter = segment_index(df['Datetime'], None if pyramid is None else pyramid.gaps)
+        x, y = with_breaks(segmenter, df['Datetime'].to_numpy(), df['Resultat'])
+        ax.plot(x, y, label=label, color=farge, linewidth=1.5, alpha=0.9)
+        return
+
+    x, lav, hoy, snitt = with_breaks(index_from_labels(oversikt['segment']), oversikt['Datetime'].to_numpy(),
+                                     oversikt['min'], oversikt['max'], oversikt['mean'])
+    ax.fill_between(x, lav, hoy, color=farge, alpha=0.25, linewidth=0)
+    ax.plot(x, snitt, label=label, color=farge, linewidth=1.0, alpha=0.9)
+
+
+def x_locator(x_interval: str | None):
+    """Locator for x-aksen fra f.eks. '2W' eller '1M'. AutoDateLocator hvis intervallet mangler eller er ugyldig."""
     if x_interval:
         # Prøv å parse format som "2W", "1M" etc.
         match = re.match(r'^(\d+)([DWMYdwmy])$', x_interval)
         if match:
             num = int(match.group(1))
             unit = match.group(2).upper()
-            
+
             if unit == 'D':
-                locator = mdates.DayLocator(interval=num)
+                return mdates.DayLocator(interval=num)
             elif unit == 'W':
-                locator = mdates.WeekdayLocator(interval=num)
+                return mdates.WeekdayLocator(interval=num)
             elif unit == 'M':
-                locator = mdates.MonthLocator(interval=num)
+                return mdates.MonthLocator(interval=num)
             elif unit == 'Y':
-                locator = mdates.YearLocator(base=num)
+                return mdates.YearLocator(base=num)
         else:
             logger.warning(f"Kunne ikke tolke intervall '{x_interval}'. Bruker auto.")
 
     # Fallback til AutoDateLocator hvis ingen manuell config eller ugyldig config
-    if not locator:
-        locator = mdates.AutoDateLocator()
+    return mdates.AutoDateLocator()
 
-    ax.xaxis.set_major_locator(locator)
-    ax.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y'))
-    
-    fig.autofmt_xdate() 
-    
-    ax.autoscale(enable=True, axis='y', tight=False)
-    ax.grid(True, which='major', linestyle='-', alpha=0.8)
-    ax.minorticks_on()
-    ax.grid(True, which='minor', linestyle=':', alpha=0.4)
-    
-    ax.legend()
-    plt.tight_layout()
-    
-    if output_file:
-        try:
-            plt.savefig(output_file)
-            logger.info(f"Plot lagret til fil: {output_file}")
-        except Exception as e:
-            logger.error(f"Kunne ikke lagre plot til {output_file}: {e}")
+
+def tolk_panel(label: str) -> tuple[str, str | None]:
+    """'[Trykk] Baro' -> ('Baro', 'Trykk'). Uten hakeparentes: (label, None)."""
+    match = re.match(r'^\[([^\]]+)\]\s*(.+)$', label.strip())
+    if match:
+        return match.group(2).strip(), match.group(1).strip()
+    return label.strip(), None
+
+
+def grupper_paneler(result_series_list: list[SensorResult]) -> list[tuple[str | None, list[tuple[int, SensorResult]]]]:
+    """
+    Fordeler seriene på paneler i den rekkefølgen panelene først dukker opp.
+    Hver serie beholder indeksen sin, så fargen er den samme som i ett felles plott.
+    """
+    grupper: dict[str | None, list[tuple[int, SensorResult]]] = {}
+    for i, serie in enumerate(result_series_list):
+        grupper.setdefault(serie.panel, []).append((i, serie))
+    return list(grupper.items())
+
+
+def figurstorrelse(antall_paneler: int) -> tuple[float, float]:
+    """Figurstørrelse: vanlig høyde for ett panel, ellers PANEL_HEIGHT per panel."""
+    if antall_paneler <= 1:
+        return FIGSIZE
+    return (FIGSIZE[0], max(FIGSIZE[1], PANEL_HEIGHT * antall_paneler))
+
+
+def lag_paneler(fig: Figure, result_series_list: list[SensorResult]) -> list[tuple]:
+    """
+    Lager én akse per panel, under hverandre med felles tidsakse.
+
+    Returns:
+        list: [(ax, panelnavn, [(indeks, serie), ...]), ...]. Minst én akse, også uten serier.
+    """
+    grupper = grupper_paneler(result_series_list) or [(None, [])]
+    axes = fig.subplots(len(grupper), 1, sharex=True, squeeze=False)
+    return [(axes[i, 0], navn, serier) for i, (navn, serier) in enumerate(grupper)]
+
+
+def tegn_figur(
+    fig: Figure,
+    result_series_list: list[SensorResult],
+    tittel: str,
+    x_interval: str | None = None,
+    pyramids: dict | None = None
+) -> None:
+    """
+    Tegner seriene i en tom figur, ett panel per 'panel' med felles tidsakse.
+    Bruker bare figurens egne metoder (ingen global pyplot-tilstand).
+    `pyramids` er ferdige pyramider per serienavn; de andre bygges ved behov.
+    """
+    colors = matplotlib.rcParams['axes.prop_cycle'].by_key()['color']
+    pyramids = pyramids or {}
+    paneler = lag_paneler(fig, result_series_list)
+
+    for ax, navn, serier in paneler:
+        for i, serie in serier:
+            farge = colors[i % len(colors)]
+            tegn_serie(ax, serie.df, serie.label, farge, budsjett=int(fig.get_figwidth() * fig.dpi),
+                       pyramid=pyramids.get(serie.label))
+
+        ax.set_ylabel(navn or "Verdi", fontsize=12)
+        ax.autoscale(enable=True, axis='y', tight=False)
+        ax.grid(True, which='major', linestyle='-', alpha=0.8)
+        ax.minorticks_on()
+        ax.grid(True, which='minor', linestyle=':', alpha=0.4)
+        ax.legend()
+
+    if len(paneler) == 1:
+        paneler[0][0].set_title(tittel, fontsize=14)
     else:
+        fig.suptitle(tittel, fontsize=14)
+
+    # --- X-AKSE FORMATERING ---
+    # Panelene deler tidsakse, så locator og format settes én gang på den nederste
+    ax_bunn = paneler[-1][0]
+    ax_bunn.xaxis.set_major_locator(x_locator(x_interval))
+    ax_bunn.xaxis.set_major_formatter(mdates.DateFormatter('%d.%m.%Y'))
+
+    fig.autofmt_xdate()
+    fig.tight_layout()
+
+
+def lag_figur(
+    result_series_list: list[SensorResult],
+    tittel: str,
+    x_interval: str | None = None,
+    pyramids: dict | None = None
+) -> Figure:
+    """
+    Lager en ferdig tegnet figur med eget Agg-lerret.
+
+    Figuren registreres ikke i pyplot, så den kan tegnes i en egen tråd og
+    frigjøres av GC når den ikke lenger brukes.
+    """
+    fig = Figure(figsize=figurstorrelse(len(grupper_paneler(result_series_list))))
+    FigureCanvasAgg(fig)
+    tegn_figur(fig, result_series_list, tittel, x_interval, pyramids)
+    return fig
+
+
+def lagre_figur(fig: Figure, output_file: str | Path) -> bool:
+    """Lagrer figuren. Returnerer False (og logger) hvis filen ikke kunne skrives."""
+    try:
+        fig.savefig(output_file)
+        logger.info(f"Plot lagret til fil: {output_file}")
+        return True
+    except Exception as e:
+        logger.error(f"Kunne ikke lagre plot til {output_file}: {e}")
+        return False
+
+
+def plot_resultat(
+    result_series_list: list[SensorResult],
+    tittel: str,
+    output_file: str | None = None,
+    x_interval: str | None = None,
+    pyramids: dict | None = None
+) -> None:
+    """Genererer plottet for FLERE serier. Uten output_file vises det i et vindu."""
+    if output_file:
+        lagre_figur(lag_figur(result_series_list, tittel, x_interval, pyramids), output_file)
+        return
+
+    # Vindu krever pyplot; figuren lukkes igjen når vinduet er lukket
+    fig = plt.figure(figsize=figurstorrelse(len(grupper_paneler(result_series_list))))
+    try:
+        tegn_figur(fig, result_series_list, tittel, x_interval, pyramids)
         logger.info("Viser plot...")
-        plt.show()
\ No newline at end of file
+        plt.show()
+    finally:
+        plt.close(fig)
+
+
+def filnavn_per_serie(output_file: str | Path, labels: list[str]) -> dict[str, Path]:
+    """
+    Én utfil per serie: 'rapport.png' + 'Nivå L1' -> 'rapport_Nivå_L1.png'.
+    Like filnavn (etter at spesialtegn er fjernet) får et løpenummer.
+    """
+    output_file = Path(output_file)
+    suffix = output_file.suffix or '.png'
+    paths: dict[str, Path] = {}
+    brukt: set[str] = set()
+    for label in labels:
+        navn = re.sub(r'[^\w\-]+', '_', label).strip('_') or 'serie'
+        kandidat, n = navn, 2
+        while kandidat.lower() in brukt:
+            kandidat, n = f"{navn}_{n}", n + 1
+        brukt.add(kandidat.lower())
+        paths[label] = output_file.with_name(f"{output_file.stem}_{kandidat}{suffix}")
+    return paths
+
+
+def delte_figurer(result_series_list: list[SensorResult]) -> list[tuple[str, list[SensorResult]]]:
+    """
+    Figurene plot_per_serie skriver: én per panel når seriene har paneler, ellers én per serie.
+    Returnerer [(navn, serier), ...]; navnet gir filnavnet (se filnavn_per_serie).
+    """
+    grupper = grupper_paneler(result_series_list)
+    if len(grupper) > 1:
+        return [(navn or "Verdi", [serie for _, serie in serier]) for navn, serier in grupper]
+    return [(serie.label, [serie]) for serie in result_series_list]
+
+
+def plot_per_serie(
+    result_series_list: list[SensorResult],
+    tittel: str,
+    output_file: str | Path,
+    x_interval: str | None = None,
+    workers: int = DEFAULT_RENDER_WORKERS,
+    pyramids: dict | None = None
+) -> list[Path]:
+    """
+    Tegner og lagrer én figur per serie, eller én per panel når seriene har paneler,
+    parallelt i en trådpool. Returnerer filene som ble skrevet.
+    """
+    figurer = delte_figurer(result_series_list)
+    paths = filnavn_per_serie(output_file, [navn for navn, _ in figurer])
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+
+    def render(figur: tuple[str, list[SensorResult]]) -> Path | None:
+        navn, serier = figur
+        # Hver fil har ett panel; panelnavnet står i tittelen
+        serier = [SensorResult(label=s.label, df=s.df) for s in serier]
+        fig = lag_figur(serier, f"{tittel} - {navn}", x_interval, pyramids)
+        return paths[navn] if lagre_figur(fig, paths[navn]) else None
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sensorplot-render") as executor:
+        written = list(executor.map(render, figurer))
+    return [p for p in written if p is not None]
@@ -0,0 +1,304 @@
+import csv
+import io
+import logging
+import re
+from dataclasses import asdict, dataclass, fields, replace
+from datetime import datetime
+from pathlib import Path
+import pandas as pd
+
+from sensorplot.archive import is_compressed, read_head
+from sensorplot.cache import JsonRegistry, file_fingerprint
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Så mye av starten av en CSV-fil brukes til å finne dialekten
+SNIFF_BYTES = 64 * 1024
+# Antall rader etter headeren som brukes til å finne datoformat og desimaltegn
+SNIFF_ROWS = 50
+# Antall rader vi leter etter header-raden i (Excel)
+HEADER_SEARCH_ROWS = 30
+
+SEPARATORS = ';,\t|'
+ENCODINGS = ('utf-8-sig', 'latin1')
+
+# Datodeler prøves i denne rekkefølgen. Dag-først står foran måned-først, slik at
+# tvetydige datoer (f.eks. 01/02/2024) tolkes norsk.
+_DATE_PARTS = ('%d.%m.%Y', '%Y-%m-%d', '%d/%m/%Y', '%m/%d/%Y', '%d-%m-%Y', '%Y/%m/%d', '%d.%m.%y')
+_TIME_PARTS = (' %H:%M:%S', ' %H:%M:%S.%f', ' %H:%M', 'T%H:%M:%S', '')
+DATE_FORMATS = tuple(d + t for d in _DATE_PARTS for t in _TIME_PARTS)
+
+_DECIMAL_COMMA = re.compile(r'^-?\d+,\d+$')
+# .xlsx er et zip-arkiv
+_ZIP_MAGIC = b'PK\x03\x04'
+
+
+@dataclass
+class Dialect:
+    """
+    Hvordan en loggerfil skal leses.
+
+    Args:
+        encoding (str): Tegnkoding (bare CSV).
+        sep (str): Kolonneskille (bare CSV).
+        decimal (str): Desimaltegn (bare CSV).
+        header_row (int): Raden (0-basert) med kolonnenavnene.
+        date_format (str | None): strptime-format for dato (+ ' ' + tid). None = pandas gjetter.
+        dayfirst (bool): Brukes bare når date_format mangler.
+    """
+    encoding: str = 'latin1'
+    sep: str = ','
+    decimal: str = '.'
+    header_row: int = 0
+    date_format: str | None = None
+    dayfirst: bool = False
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Dialect':
+        return cls().with_overrides(data)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def with_overrides(self, overrides: dict | None) -> 'Dialect':
+        """Ny Dialect der feltene i `overrides` (f.eks. fra YAML) erstatter de detekterte."""
+        if not overrides:
+            return self
+        known = {f.name for f in fields(self)}
+        unknown = set(overrides) - known
+        if unknown:
+            raise ValueError(f"Ukjente dialect-felt: {sorted(unknown)}. Gyldige: {sorted(known)}")
+        return replace(self, **overrides)
+
+
+# ==============================================================================
+#   KILDER I MINNET (f.eks. opplastede filer i GUI)
+# ==============================================================================
+
+def in_memory(source) -> bytes | None:
+    """
+    Innholdet hvis `source` ligger i minnet (bytes, BytesIO, memoryview), ellers None (en sti).
+
+    En BytesIO (som Streamlit sin UploadedFile) gir fra seg bufferet uten kopi så lenge
+    det ikke er endret. Hver lesing lager sin egen io.BytesIO over de samme bytene,
+    så posisjonen i den opprinnelige bufferen aldri brukes og flere tråder kan lese samtidig.
+    """
+    if isinstance(source, (str, Path)):
+        return None
+    if isinstance(source, bytes):
+        return source
+    if isinstance(source, (bytearray, memoryview)):
+        return bytes(source)
+    if isinstance(source, io.BytesIO):
+        return source.getvalue()
+    if hasattr(source, 'read'):
+        source.seek(0)
+        return source.read()
+    raise TypeError(f"Ukjent kilde: {type(source).__name__}. Bruk en sti, bytes eller BytesIO.")
+
+
+def source_name(source) -> str:
+    """Navn til logg og feilmeldinger: stien, eller filnavnet til en opplastet fil."""
+    if isinstance(source, (str, Path)):
+        return str(source)
+    return getattr(source, 'name', None) or '<minne>'
+
+
+def source_suffix(source, data: bytes | None = None) -> str:
+    """Filtypen ('.csv', '.xlsx', ...). Innhold uten filnavn gjenkjennes på zip-signaturen."""
+    suffix = Path(source_name(source)).suffix.lower()
+    if suffix or data is None:
+        return suffix
+    return '.xlsx' if data.startswith(_ZIP_MAGIC) else '.csv'
+
+
+# ==============================================================================
+#   DETEKSJON
+# ==============================================================================
+
+def guess_date_format(values: list[str]) -> str | None:
+    """Første format i DATE_FORMATS som tolker alle eksempelverdiene, ellers None."""
+    values = [v.strip() for v in values if v and v.strip() and v.strip().lower() != 'nan']
+    if not values:
+        return None
+    for fmt in DATE_FORMATS:
+        try:
+            for v in values:
+                datetime.strptime(v, fmt)
+        except ValueError:
+            continue
+        return fmt
+    return None
+
+
+def _dayfirst_from(date_format: str | None, first_value) -> bool:
+    if date_format:
+        return '%d' in date_format and date_format.index('%d') < date_format.index('%m')
+    # Samme gjetning som før: tekstdatoer med punktum er norske (dd.mm.yyyy)
+    return isinstance(first_value, str) and '.' in first_value
+
+
+def _date_samples(rows: list[list], i_date: int, i_time: int | None) -> list[str]:
+    samples = []
+    for row in rows:
+        try:
+            value = str(row[i_date]).strip()
+            if i_time is not None:
+                value += ' ' + str(row[i_time]).strip()
+        except IndexError:
+            continue
+        samples.append(value)
+    return samples
+
+
+def sniff_csv(path, col_date: str, col_time: str | None = None) -> Dialect | None:
+    """
+    Finner dialekten til en CSV-fil (sti eller innhold i minnet) ut fra de første 64 KB.
+    Returnerer None hvis datokolonnen ikke finnes i noen linje.
+    """
+    data = in_memory(path)
+    if data is not None:
+        raw = data[:SNIFF_BYTES]
+    else:
+        with open(path, 'rb') as f:
+            raw = f.read(SNIFF_BYTES)
+    if len(raw) == SNIFF_BYTES and b'\n' in raw:
+        # Ikke del et tegn eller en linje på midten
+        raw = raw[:raw.rindex(b'\n') + 1]
+
+    for encoding in ENCODINGS:
+        try:
+            text = raw.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    # BOM fjernes ved dekoding, så pandas trenger den vanlige utf-8
+    encoding = 'utf-8' if encoding == 'utf-8-sig' and not raw.startswith(b'\xef\xbb\xbf') else encoding
+
+    lines = text.splitlines()
+    header_row = next((i for i, line in enumerate(lines) if col_date in line), None)
+    if header_row is None:
+        return None
+
+    header = lines[header_row]
+    data_lines = [line for line in lines[header_row + 1:header_row + 1 + SNIFF_ROWS] if line.strip()]
+    try:
+        sep = csv.Sniffer().sniff('\n'.join([header] + data_lines), delimiters=SEPARATORS).delimiter
+    except csv.Error:
+        sep = max(SEPARATORS, key=header.count)
+
+    columns = [c.strip() for c in next(csv.reader([header], delimiter=sep))]
+    rows = list(csv.reader(data_lines, delimiter=sep))
+
+    decimal = '.'
+    if sep != ',' and any(_DECIMAL_COMMA.match(field.strip()) for row in rows for field in row):
+        decimal = ','
+
+    i_date = columns.index(col_date) if col_date in columns else None
+    i_time = columns.index(col_time) if col_time and col_time in columns else None
+    samples = _date_samples(rows, i_date, i_time) if i_date is not None else []
+    date_format = guess_date_format(samples)
+
+    return Dialect(
+        encoding=encoding, sep=sep, decimal=decimal, header_row=header_row,
+        date_format=date_format,
+        dayfirst=_dayfirst_from(date_format, samples[0] if samples else None),
+    )
+
+
+def sniff_excel(xl: pd.ExcelFile, sheet: str | int, col_date: str, col_time: str | None = None) -> Dialect | None:
+    """
+    Finner header-raden og datoformatet i ett ark fra de første radene.
+    Datoceller som allerede er datoer i Excel trenger ikke noe format.
+    """
+    df_peek = xl.parse(sheet_name=sheet, nrows=HEADER_SEARCH_ROWS + SNIFF_ROWS, header=None)
+
+    header_row = None
+    for idx, row in df_peek.head(HEADER_SEARCH_ROWS).iterrows():
+        if col_date in [str(val).strip() for val in row.values]:
+            header_row = int(idx)  # type: ignore
+            break
+    if header_row is None:
+        return None
+
+    columns = [str(val).strip() for val in df_peek.iloc[header_row].values]
+    i_date = columns.index(col_date)
+    i_time = columns.index(col_time) if col_time and col_time in columns else None
+    body = df_peek.iloc[header_row + 1:].dropna(subset=[df_peek.columns[i_date]])
+
+    first_value = body.iloc[0, i_date] if not body.empty else None
+    date_format = None
+    if isinstance(first_value, str):
+        date_format = guess_date_format(_date_samples(body.values.tolist(), i_date, i_time))
+
+    return Dialect(header_row=header_row, date_format=date_format,
+                   dayfirst=_dayfirst_from(date_format, first_value))
+
+
+# ==============================================================================
+#   REGISTER (persistert per fil)
+# ==============================================================================
+
+_registry = JsonRegistry('dialects.json')
+
+
+def resolve_dialect(
+    path,
+    col_date: str,
+    col_time: str | None = None,
+    sheet: str | int | None = None,
+    overrides: dict | None = None,
+    xl: pd.ExcelFile | None = None,
+    member: str | None = None
+) -> Dialect:
+    """
+    Dialekten for en fil: fra registeret hvis filen er sett før, ellers detektert og lagret.
+
+    Registeret er nøklet på filens fingeravtrykk (se cache.file_fingerprint) og kolonnene,
+    så en uendret fil tolkes alltid likt uten ny skanning. Felt i `overrides`
+    (YAML 'dialect:') vinner alltid over det detekterte.
+    Innhold i minnet (se in_memory) har ikke noe fingeravtrykk og detekteres hver gang;
+    det koster bare starten av filen.
+
+    Komprimerte CSV-filer (.csv.gz, .zst, CSV i .zip, se sensorplot.archive) detekteres fra
+    starten av den utpakkede strømmen; `member` velger filen i et zip-arkiv.
+    """
+    data = in_memory(path)
+    name = source_name(path)
+    key = None
+    if data is None:
+        path = Path(path)
+        key = f"{file_fingerprint(path)}|{sheet}|{col_date}|{col_time}"
+        if member is not None:
+            key += f"|{member}"
+
+    cached = _registry.get(key) if key else None
+    if cached is not None:
+        dialect = Dialect.from_dict(cached)
+    else:
+        if source_suffix(path, data) == '.xlsx':
+            if xl is None:
+                with pd.ExcelFile(path if data is None else io.BytesIO(data), engine='openpyxl') as xl_own:
+                    dialect = sniff_excel(xl_own, sheet if sheet is not None else 0, col_date, col_time)
+            else:
+                dialect = sniff_excel(xl, sheet if sheet is not None else 0, col_date, col_time)
+        elif data is None and is_compressed(path):
+            dialect = sniff_csv(read_head(path, member, n=SNIFF_BYTES), col_date, col_time)
+        else:
+            dialect = sniff_csv(path if data is None else data, col_date, col_time)
+
+        if dialect is None:
+            where = f" (ark: {sheet})" if sheet is not None else ""
+            logger.warning(f"Fant ikke '{col_date}' i toppen av {name}{where}. Leser fra start.")
+            dialect = Dialect()
+        else:
+            logger.debug(f"Dialekt for {name}: {dialect}")
+            if key:
+                _registry.put(key, dialect.to_dict())
+
+    return dialect.with_overrides(overrides)
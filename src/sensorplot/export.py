@@ -0,0 +1,244 @@
+import logging
+import re
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+from xml.sax.saxutils import escape, quoteattr
+import numpy as np
+
+from sensorplot.core import SensorResult, gyldige_rader
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Excel tillater 1 048 576 rader per ark; første rad er overskriften
+EXCEL_MAX_ROWS = 1_048_575
+# Radene skrives i biter, så minnebruken er den samme uansett lengde på serien
+CHUNK_ROWS = 50_000
+# Excel-datoer er døgn siden 30.12.1899
+_EXCEL_EPOCH = np.datetime64('1899-12-30', 'ns').astype('i8')
+_NS_PER_DAY = 86_400 * 10**9
+_SHEET_NAME_MAX = 31
+_SHEET_NAME_INVALID = re.compile(r'[\[\]:*?/\\]')
+
+
+@dataclass(frozen=True)
+class ExcelFormat:
+    """
+    Visningsformat for eksporten. Verdiene lagres alltid som tall og datoer; formatet
+    bestemmer bare hvordan Excel viser dem.
+
+    Args:
+        date_format (str): Excel-formatkode for datoen.
+        time_format (str): Excel-formatkode for klokkeslettet.
+        decimals (int | None): Antall desimaler som vises (None = Excel bestemmer).
+        split_datetime (bool): Dato og tid i hver sin kolonne, som i loggerfilene.
+    """
+    date_format: str = 'dd.mm.yyyy'
+    time_format: str = 'hh:mm:ss'
+    decimals: int | None = None
+    split_datetime: bool = True
+
+
+# 'no' gir samme oppsett som loggerfilene last_og_rens_data leser (dato og tid hver for seg)
+EXCEL_PRESETS = {
+    'no': ExcelFormat(),
+    'iso': ExcelFormat(date_format='yyyy-mm-dd', time_format='hh:mm:ss', split_datetime=False),
+}
+DEFAULT_EXCEL_PRESET = 'no'
+
+
+def excel_format(preset: str = DEFAULT_EXCEL_PRESET, decimals: int | None = None) -> ExcelFormat:
+    """Et ferdig oppsett ('no' eller 'iso'), eventuelt med fast antall desimaler."""
+    if preset not in EXCEL_PRESETS:
+        raise ValueError(f"Ukjent Excel-format '{preset}'. Gyldige: {', '.join(EXCEL_PRESETS)}")
+    if decimals is not None and decimals < 0:
+        raise ValueError(f"Antall desimaler kan ikke være negativt: {decimals}")
+    base = EXCEL_PRESETS[preset]
+    return ExcelFormat(base.date_format, base.time_format, decimals, base.split_datetime)
+
+
+# ==============================================================================
+#   XML-DELER
+# ==============================================================================
+
+_NS_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_NS_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_NS_PKG = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_HEAD = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+
+# Stilindekser i cellXfs (se _styles_xml)
+_STYLE_DATE, _STYLE_TIME, _STYLE_DATETIME, _STYLE_VALUE = 1, 2, 3, 4
+
+
+def _content_types_xml(sheets: int) -> str:
+    overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{i}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for i in range(1, sheets + 1))
+    return (_HEAD + '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/styles.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+            f'{overrides}</Types>')
+
+
+def _root_rels_xml() -> str:
+    return (_HEAD + f'<Relationships xmlns="{_NS_PKG}">'
+            f'<Relationship Id="rId1" Type="{_NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>')
+
+
+def _workbook_xml(names: list[str]) -> str:
+    sheets = ''.join(f'<sheet name={quoteattr(name)} sheetId="{i}" r:id="rId{i}"/>'
+                     for i, name in enumerate(names, start=1))
+    return _HEAD + f'<workbook xmlns="{_NS_MAIN}" xmlns:r="{_NS_REL}"><sheets>{sheets}</sheets></workbook>'
+
+
+def _workbook_rels_xml(sheets: int) -> str:
+    rels = ''.join(f'<Relationship Id="rId{i}" Type="{_NS_REL}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                   for i in range(1, sheets + 1))
+    rels += f'<Relationship Id="rId{sheets + 1}" Type="{_NS_REL}/styles" Target="styles.xml"/>'
+    return _HEAD + f'<Relationships xmlns="{_NS_PKG}">{rels}</Relationships>'
+
+
+def _styles_xml(fmt: ExcelFormat) -> str:
+    value_format = '0' if fmt.decimals == 0 else None if fmt.decimals is None else '0.' + '0' * fmt.decimals
+    codes = [fmt.date_format, fmt.time_format, f"{fmt.date_format} {fmt.time_format}"]
+    if value_format:
+        codes.append(value_format)
+    num_fmts = ''.join(f'<numFmt numFmtId="{164 + i}" formatCode={quoteattr(code)}/>' for i, code in enumerate(codes))
+    value_id = 167 if value_format else 0
+    xfs = ''.join(f'<xf numFmtId="{num_id}" fontId="0" fillId="0" borderId="0" xfId="0" applyNumberFormat="1"/>'
+                  for num_id in (164, 165, 166, value_id))
+    return (_HEAD + f'<styleSheet xmlns="{_NS_MAIN}">'
+            f'<numFmts count="{len(codes)}">{num_fmts}</numFmts>'
+            '<fonts count="1"><font><sz val="11"/><name val="Calibri"/></font></fonts>'
+            '<fills count="2"><fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill></fills>'
+            '<borders count="1"><border><left/><right/><top/><bottom/><diagonal/></border></borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            f'<cellXfs count="5"><xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>{xfs}</cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            '</styleSheet>')
+
+
+def _text_cell(text: str) -> str:
+    return f'<c t="inlineStr"><is><t>{escape(text)}</t></is></c>'
+
+
+def _sheet_rows(times: np.ndarray, values: np.ndarray, fmt: ExcelFormat, first_row: int):
+    """XML for radene, én bit (CHUNK_ROWS) av gangen."""
+    for start in range(0, len(times), CHUNK_ROWS):
+        t = times[start:start + CHUNK_ROWS]
+        v = values[start:start + CHUNK_ROWS]
+        serial = (t.view('i8') - _EXCEL_EPOCH) / _NS_PER_DAY
+        # Tallene skrives med repr: korteste tekst som leses tilbake til nøyaktig samme verdi
+        value_cells = [
+            '<c/>' if x != x else f'<c s="{_STYLE_VALUE}"><v>{x!r}</v></c>' for x in v.tolist()]
+        rows = first_row + start + np.arange(len(t))
+        if fmt.split_datetime:
+            day = np.floor(serial)
+            yield ''.join(
+                f'<row r="{r}"><c s="{_STYLE_DATE}"><v>{int(d)}</v></c>'
+                f'<c s="{_STYLE_TIME}"><v>{f!r}</v></c>{cell}</row>'
+                for r, d, f, cell in zip(rows.tolist(), day.tolist(), (serial - day).tolist(), value_cells))
+        else:
+            yield ''.join(
+                f'<row r="{r}"><c s="{_STYLE_DATETIME}"><v>{s!r}</v></c>{cell}</row>'
+                for r, s, cell in zip(rows.tolist(), serial.tolist(), value_cells))
+
+
+# ==============================================================================
+#   EKSPORT
+# ==============================================================================
+
+def sheet_names(label: str, parts: int, taken: set[str]) -> list[str]:
+    """
+    Arknavn for en serie: gyldige tegn, maks 31 tegn og unike i arbeidsboka.
+    En serie som må deles får ' (2)', ' (3)' ... på de neste arkene.
+    """
+    base = _SHEET_NAME_INVALID.sub('_', label).strip("' ") or 'Serie'
+    names = []
+    for part in range(1, parts + 1):
+        n = part
+        while True:
+            suffix = '' if n == 1 else f' ({n})'
+            name = base[:_SHEET_NAME_MAX - len(suffix)] + suffix
+            if name.lower() not in taken:
+                break
+            n += 1
+        taken.add(name.lower())
+        names.append(name)
+    return names
+
+
+def write_excel(
+    results: list[SensorResult],
+    target: str | Path | BinaryIO,
+    fmt: ExcelFormat = ExcelFormat(),
+    col_date: str = 'Date',
+    col_time: str | None = 'Time',
+    col_data: str = 'Resultat',
+    max_rows: int = EXCEL_MAX_ROWS
+) -> list[str]:
+    """
+    Skriver seriene til en .xlsx-fil, ett ark per serie (arknavnet er seriens navn).
+
+    Arkene skrives som XML rett inn i zip-arkivet, CHUNK_ROWS rader av gangen, så
+    minnebruken ikke vokser med antall rader. Har en serie flere enn `max_rows` rader,
+    fortsetter den på neste ark. Flaggede målinger tas ikke med.
+    Kolonnenavnene velges slik at filen kan leses inn igjen med last_og_rens_data
+    (col_date, col_time, col_data og arknavnet).
+
+    Args:
+        target: Filsti eller binær fil (f.eks. BytesIO til en nedlasting).
+        col_time (str | None): None gir dato og tid i én kolonne (col_date).
+
+    Returns:
+        list: Navnene på arkene som ble skrevet.
+    """
+    if not results:
+        raise ValueError("Ingen serier å eksportere.")
+    if col_time is None and fmt.split_datetime:
+        fmt = ExcelFormat(fmt.date_format, fmt.time_format, fmt.decimals, split_datetime=False)
+    headers = [col_date, col_time, col_data] if fmt.split_datetime else [col_date, col_data]
+    header_row = '<row r="1">' + ''.join(_text_cell(h) for h in headers) + '</row>'
+    widths = f'<cols><col min="1" max="{len(headers)}" width="20" customWidth="1"/></cols>'
+
+    names = []
+    taken: set[str] = set()
+    # Lav komprimering: pakkingen er ellers den tregeste delen, og filen blir bare litt større
+    with zipfile.ZipFile(target, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=1) as zf:
+        for res in results:
+            df = gyldige_rader(res.df)
+            times = df['Datetime'].to_numpy(dtype='datetime64[ns]')
+            values = df['Resultat'].to_numpy(dtype='f8')
+            parts = max(1, -(-len(times) // max_rows))
+            for name, start in zip(sheet_names(res.label, parts, taken), range(0, parts * max_rows, max_rows)):
+                names.append(name)
+                with zf.open(f'xl/worksheets/sheet{len(names)}.xml', 'w', force_zip64=True) as sheet:
+                    sheet.write(f'{_HEAD}<worksheet xmlns="{_NS_MAIN}">{widths}<sheetData>{header_row}'.encode())
+                    for chunk in _sheet_rows(times[start:start + max_rows], values[start:start + max_rows], fmt, 2):
+                        sheet.write(chunk.encode())
+                    sheet.write(b'</sheetData></worksheet>')
+            if parts > 1:
+                logger.info(f"  -> {res.label}: {len(times)} rader fordelt på {parts} ark.")
+
+        zf.writestr('[Content_Types].xml', _content_types_xml(len(names)))
+        zf.writestr('_rels/.rels', _root_rels_xml())
+        zf.writestr('xl/workbook.xml', _workbook_xml(names))
+        zf.writestr('xl/_rels/workbook.xml.rels', _workbook_rels_xml(len(names)))
+        zf.writestr('xl/styles.xml', _styles_xml(fmt))
+
+    if isinstance(target, (str, Path)):
+        logger.info(f"Excel skrevet: {target} ({len(names)} ark)")
+    return names
@@ -0,0 +1,213 @@
+import ast
+import fnmatch
+import logging
+import re
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   FUNKSJONER I FORMLER
+# ==============================================================================
+#
+#   Alle funksjonene får en Series med sortert DatetimeIndex og returnerer en
+#   Series med samme indeks, slik at de kan kombineres fritt med vanlig
+#   aritmetikk (f.eks. "L1.ch1 - rolling_mean(L1.ch1, '1D')").
+#   Et tidsvindu er en pandas-frekvens ('30min', '1h', '1D'); et heltall betyr
+#   antall rader.
+
+
+def _offset(window) -> str | int:
+    if isinstance(window, (int, np.integer)) and not isinstance(window, bool):
+        return int(window)
+    if isinstance(window, str):
+        to_offset(window)  # Gir ValueError ved ugyldig frekvens
+        return window
+    raise ValueError(f"Ugyldig vindu {window!r}. Bruk f.eks. '1h' eller et heltall.")
+
+
+def rolling_mean(s: pd.Series, window='1h') -> pd.Series:
+    """Glidende gjennomsnitt over de siste `window` (tid eller antall rader)."""
+    return s.rolling(_offset(window), min_periods=1).mean()
+
+
+def diff(s: pd.Series, periods=1) -> pd.Series:
+    """Endring fra forrige rad (eller `periods` rader tilbake)."""
+    return s.diff(int(periods))
+
+
+def cumsum(s: pd.Series) -> pd.Series:
+    """Kumulativ sum. Manglende verdier telles som 0."""
+    return s.fillna(0).cumsum().where(s.notna())
+
+
+def resample_mean(s: pd.Series, rule='1D') -> pd.Series:
+    """
+    Gjennomsnitt per tidsbøtte (f.eks. '1D' = døgnmiddel). Hver rad får snittet
+    for bøtta den ligger i, så resultatet kan kombineres med andre kolonner.
+    """
+    return s.resample(_offset(rule)).transform('mean')
+
+
+def shift(s: pd.Series, lag='1h') -> pd.Series:
+    """
+    Verdien `lag` tidligere: siste måling på eller før (t - lag).
+    Et heltall flytter et antall rader.
+    """
+    lag = _offset(lag)
+    if isinstance(lag, int):
+        return s.shift(lag)
+    times = s.index.values
+    pos = np.searchsorted(times, times - pd.Timedelta(lag).to_timedelta64(), side='right') - 1
+    values = s.to_numpy(dtype=float)[np.clip(pos, 0, None)]
+    values[pos < 0] = np.nan
+    return pd.Series(values, index=s.index)
+
+
+FUNCTIONS = {
+    'rolling_mean': rolling_mean,
+    'diff': diff,
+    'cumsum': cumsum,
+    'resample_mean': resample_mean,
+    'shift': shift,
+}
+
+_CALL = re.compile(r'\b(' + '|'.join(FUNCTIONS) + r')\s*\(')
+_TEMP_PREFIX = '__formel_'
+
+
+# ==============================================================================
+#   EVALUERING
+# ==============================================================================
+
+def _split_args(text: str) -> list[str]:
+    """Deler argumentlisten på komma som ikke står inne i parenteser eller tekst."""
+    args, depth, quote, start = [], 0, None, 0
+    for i, c in enumerate(text):
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in '\'"':
+            quote = c
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+        elif c == ',' and depth == 0:
+            args.append(text[start:i].strip())
+            start = i + 1
+    args.append(text[start:].strip())
+    return [a for a in args if a]
+
+
+def _closing_paren(text: str, open_pos: int) -> int:
+    depth, quote = 0, None
+    for i in range(open_pos, len(text)):
+        c = text[i]
+        if quote:
+            if c == quote:
+                quote = None
+        elif c in '\'"':
+            quote = c
+        elif c == '(':
+            depth += 1
+        elif c == ')':
+            depth -= 1
+            if depth == 0:
+                return i
+    raise ValueError("Mangler avsluttende parentes i formelen.")
+
+
+def has_functions(expression: str) -> bool:
+    return _CALL.search(expression) is not None
+
+
+def evaluate_formula(df: pd.DataFrame, expression: str, engine: str | None = None) -> pd.Series:
+    """
+    Beregner en formel som kan inneholde tidsfunksjonene i FUNCTIONS.
+
+    Funksjonskallene løses innenfra og ut: det innerste kallet beregnes
+    vektorisert på en Series med 'Datetime' som indeks, legges i en midlertidig
+    kolonne og erstattes av kolonnenavnet. Resten av formelen går til
+    DataFrame.eval som før. `df` må være sortert på 'Datetime'.
+    """
+    if not has_functions(expression):
+        return df.eval(expression, engine=engine)
+
+    work = df.copy(deep=False)
+    index = pd.DatetimeIndex(work['Datetime'])
+    n = 0
+    while True:
+        # Siste kall i teksten har ingen kall inni seg
+        matches = list(_CALL.finditer(expression))
+        if not matches:
+            break
+        match = matches[-1]
+        name = match.group(1)
+        open_pos = match.end() - 1
+        close_pos = _closing_paren(expression, open_pos)
+        args = _split_args(expression[open_pos + 1:close_pos])
+        if not args:
+            raise ValueError(f"{name}() mangler argument.")
+
+        try:
+            extra = [ast.literal_eval(a) for a in args[1:]]
+        except (ValueError, SyntaxError):
+            raise ValueError(f"{name}(): argumentene etter det første må være tall eller tekst, f.eks. '1h'.")
+
+        # Et konstant argument (f.eks. cumsum(1)) gjøres om til en kolonne
+        inner = np.asarray(work.eval(args[0], engine=engine), dtype=float)
+        series = pd.Series(np.broadcast_to(inner, (len(work),)).copy(), index=index)
+        try:
+            value = FUNCTIONS[name](series, *extra)
+        except TypeError as e:
+            raise ValueError(f"Feil antall argumenter til {name}(): {e}")
+
+        column = f"{_TEMP_PREFIX}{n}"
+        n += 1
+        work[column] = value.to_numpy()
+        expression = f"{expression[:match.start()]}`{column}`{expression[close_pos + 1:]}"
+
+    return work.eval(expression, engine=engine)
+
+
+# ==============================================================================
+#   MALER ('{alias} = {alias}.ch1 - Baro.ch1 for alias in L*')
+# ==============================================================================
+
+_TEMPLATE = re.compile(r'^(.*?)\s+for\s+(\w+)\s+in\s+(\S+)\s*$')
+DEFAULT_TEMPLATE_VAR = 'alias'
+
+
+def parse_template(formula: str) -> tuple[str, str, str] | None:
+    """'{alias}.ch1 - Baro.ch1 for alias in L*' -> ('{alias}.ch1 - Baro.ch1', 'alias', 'L*'). Ellers None."""
+    match = _TEMPLATE.match(formula.strip())
+    if match is None or '{' + match.group(2) + '}' not in match.group(1):
+        return None
+    return match.group(1).strip(), match.group(2), match.group(3)
+
+
+def expand_template(
+    label: str,
+    formula: str,
+    var: str,
+    pattern: str,
+    aliases: list[str]
+) -> list[tuple[str, str, str]]:
+    """
+    Lager én serie per alias som passer mønsteret (fnmatch, f.eks. 'L*' eller 'L0[1-5]').
+
+    Returns:
+        list: [(label, formel, alias), ...] i samme rekkefølge som `aliases`.
+    """
+    placeholder = '{' + var + '}'
+    if placeholder not in label:
+        # Ellers ville alle seriene fått samme navn og blitt sydd sammen til én
+        label = f"{label} {placeholder}"
+    return [
+        (label.replace(placeholder, alias), formula.replace(placeholder, alias), alias)
+        for alias in aliases if fnmatch.fnmatchcase(alias, pattern)
+    ]
@@ -0,0 +1,166 @@
+import logging
+from dataclasses import dataclass, field
+import numpy as np
+import pandas as pd
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Et opphold lenger enn så mange medianintervaller regnes som et hull i serien
+GAP_FACTOR = 3.0
+# Jitter er denne persentilen av avviket fra medianintervallet (hull ikke medregnet)
+JITTER_PERCENTILE = 90
+# Brukes når intervallet ikke kan bestemmes (under to målinger)
+FALLBACK_TOLERANCE = pd.Timedelta('10min')
+# Verdien 'auto' (eller ingen verdi) i YAML/CLI betyr toleranse fra intervallprofilen
+AUTO = 'auto'
+
+
+# ==============================================================================
+#   INTERVALLPROFIL
+# ==============================================================================
+
+@dataclass
+class IntervalProfile:
+    """
+    Hvor tett og jevnt en logger måler, funnet fra tidsstemplene.
+
+    Args:
+        samples (int): Antall målinger.
+        median (Timedelta | None): Medianintervallet (None under to målinger).
+        jitter (Timedelta): Typisk avvik fra medianintervallet (se JITTER_PERCENTILE).
+        gaps (ndarray): Hull som (start, slutt)-par, form (n, 2), datetime64[ns].
+    """
+    samples: int
+    median: pd.Timedelta | None = None
+    jitter: pd.Timedelta = pd.Timedelta(0)
+    gaps: np.ndarray = field(default_factory=lambda: np.empty((0, 2), dtype='datetime64[ns]'))
+
+    @property
+    def tolerance(self) -> pd.Timedelta:
+        """
+        Toleransen for å slå en annen serie sammen mot denne: nærmeste måling ligger aldri
+        mer enn et halvt intervall (pluss jitter) unna, med mindre det er et hull.
+        """
+        if self.median is None or self.median <= pd.Timedelta(0):
+            return FALLBACK_TOLERANCE
+        return self.median / 2 + self.jitter
+
+    def to_dict(self) -> dict:
+        return {
+            'samples': self.samples,
+            'median': None if self.median is None else self.median.isoformat(),
+            'jitter': self.jitter.isoformat(),
+            'gaps': [[pd.Timestamp(a).isoformat(), pd.Timestamp(b).isoformat()] for a, b in self.gaps],
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'IntervalProfile':
+        gaps = np.array(data.get('gaps') or [], dtype='datetime64[ns]').reshape(-1, 2)
+        median = data.get('median')
+        return cls(samples=int(data['samples']), median=None if median is None else pd.Timedelta(median),
+                   jitter=pd.Timedelta(data.get('jitter') or 0), gaps=gaps)
+
+    @property
+    def longest_gap(self) -> pd.Timedelta:
+        """Det lengste hullet, eller 0 uten hull."""
+        if len(self.gaps) == 0:
+            return pd.Timedelta(0)
+        return pd.Timedelta(int(np.diff(self.gaps.view('i8'), axis=1).max()))
+
+    @property
+    def gap_total(self) -> pd.Timedelta:
+        """Samlet tid uten målinger i hullene."""
+        return pd.Timedelta(int(np.diff(self.gaps.view('i8'), axis=1).sum()))
+
+
+def profile_times(times) -> IntervalProfile:
+    """
+    Intervallprofilen for sorterte tidsstempler (Series/array), vektorisert med np.diff.
+    Like tidsstempler (intervall 0) hoppes over når medianen finnes.
+    """
+    t = np.asarray(times, dtype='datetime64[ns]')
+    steps = np.diff(t.view('i8'))
+    steps = steps[steps > 0]
+    if len(steps) == 0:
+        return IntervalProfile(samples=len(t))
+
+    median = np.median(steps)
+    is_gap = np.diff(t.view('i8')) > GAP_FACTOR * median
+    regular = steps[steps <= GAP_FACTOR * median]
+    jitter = np.percentile(np.abs(regular - median), JITTER_PERCENTILE) if len(regular) else 0.0
+
+    starts = np.flatnonzero(is_gap)
+    gaps = np.column_stack([t[starts], t[starts + 1]]) if len(starts) else np.empty((0, 2), dtype='datetime64[ns]')
+    return IntervalProfile(samples=len(t), median=pd.Timedelta(int(median)),
+                           jitter=pd.Timedelta(int(round(jitter))), gaps=gaps)
+
+
+def parse_tolerance(value) -> pd.Timedelta | None:
+    """Toleranse fra YAML/CLI ('30s', '5min'). None eller 'auto' gir None (= fra intervallprofilen)."""
+    if value is None or (isinstance(value, str) and value.strip().lower() == AUTO):
+        return None
+    if isinstance(value, pd.Timedelta):
+        return value
+    try:
+        tolerance = pd.Timedelta(str(value).strip())
+    except ValueError:
+        raise ValueError(f"Ugyldig toleranse {value!r}. Bruk f.eks. '30s', '5min' eller '{AUTO}'.")
+    if tolerance < pd.Timedelta(0):
+        raise ValueError(f"Toleransen kan ikke være negativ: {value!r}")
+    return tolerance
+
+
+# ==============================================================================
+#   SEGMENTER (sammenhengende biter mellom hullene)
+# ==============================================================================
+
+def segment_index(times, gaps: np.ndarray | None = None) -> np.ndarray:
+    """
+    Segmentindeksen for sorterte tidsstempler: (start, slutt)-offsets per segment, form (k, 2),
+    der slutt er eksklusiv. Hullene finnes fra intervallprofilen, eller gis som `gaps`
+    (IntervalProfile.gaps for hele serien), slik at et utsnitt får samme brudd som serien
+    uten at statistikken beregnes på nytt.
+    """
+    t = np.asarray(times, dtype='datetime64[ns]')
+    if gaps is None:
+        gaps = profile_times(t).gaps
+    # Et segment starter ved første måling etter hvert hull
+    starts = np.unique(np.searchsorted(t, gaps[:, 1], side='left'))
+    starts = starts[(starts > 0) & (starts < len(t))]
+    return index_from_starts(starts, len(t))
+
+
+def index_from_starts(starts: np.ndarray, n: int) -> np.ndarray:
+    """Segmentindeks fra posisjonene der et nytt segment starter (uten 0)."""
+    if n == 0:
+        return np.empty((0, 2), dtype='i8')
+    bounds = np.r_[0, np.asarray(starts, dtype='i8'), n]
+    return np.column_stack([bounds[:-1], bounds[1:]])
+
+
+def index_from_labels(labels) -> np.ndarray:
+    """Segmentindeks fra segmentnummer per rad (f.eks. kolonnen 'segment' i en oversikt)."""
+    labels = np.asarray(labels)
+    return index_from_starts(np.flatnonzero(np.diff(labels)) + 1, len(labels))
+
+
+def with_breaks(index: np.ndarray, x, *ys) -> tuple[np.ndarray, ...]:
+    """
+    Setter inn ett brudd (NaN i y) foran hvert segment etter det første, så linjene i
+    matplotlib og Plotly stopper ved hullene. Bare arrayene som tegnes kopieres, og de er
+    aldri lengre enn tegnebudsjettet.
+
+    Returns:
+        tuple: (x, *ys) med bruddene satt inn.
+    """
+    x = np.asarray(x)
+    ys = [np.asarray(y, dtype='f8') for y in ys]
+    starts = index[1:, 0]
+    if len(starts) == 0:
+        return (x, *ys)
+    return (np.insert(x, starts, x[starts]), *(np.insert(y, starts, np.nan) for y in ys))
@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable
+import pandas as pd
+
+from sensorplot.core import SensorResult
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Minnebudsjett (MB) for den delte cachen i GUI, felles for alle økter i prosessen
+ENV_SHARED_CACHE_MB = 'SENSORPLOT_SHARED_CACHE_MB'
+DEFAULT_SHARED_CACHE_MB = 1024
+
+
+def budget_from_env() -> int:
+    """Budsjettet i bytes fra $SENSORPLOT_SHARED_CACHE_MB (standard 1024 MB)."""
+    value = os.environ.get(ENV_SHARED_CACHE_MB)
+    try:
+        mb = float(value) if value else DEFAULT_SHARED_CACHE_MB
+    except ValueError:
+        logger.warning(f"Ugyldig {ENV_SHARED_CACHE_MB}={value!r}. Bruker {DEFAULT_SHARED_CACHE_MB} MB.")
+        mb = DEFAULT_SHARED_CACHE_MB
+    return int(mb * 1024 * 1024)
+
+
+def content_hash(data: bytes) -> str:
+    """Hash av hele innholdet, slik at samme fil gir samme nøkkel uansett økt og filnavn."""
+    return hashlib.blake2b(data, digest_size=20).hexdigest()
+
+
+def cache_key(*parts) -> str:
+    return hashlib.sha1(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def size_of(value) -> int:
+    """Omtrentlig minnebruk i bytes for en DataFrame eller et SensorResult."""
+    if isinstance(value, SensorResult):
+        value = value.df
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True, deep=False).sum())
+    return 0
+
+
+# ==============================================================================
+#   DELT LRU-CACHE
+# ==============================================================================
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    entries: int = 0
+    bytes: int = 0
+    budget: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class SharedCache:
+    """
+    Prosessvid LRU-cache for innleste filer og beregnede serier, med et minnebudsjett.
+
+    Verdiene deles mellom alle økter og skal behandles som skrivebeskyttet: pipelinen
+    lager grunne kopier før den legger til kolonner, så de cachede DataFrame-ene endres aldri.
+    Når summen av størrelsene går over budsjettet, kastes de minst nylig brukte.
+    En verdi som alene er større enn budsjettet caches ikke.
+
+    Args:
+        budget (int): Maks antall bytes (se size_of).
+    """
+
+    def __init__(self, budget: int):
+        self.budget = budget
+        self._items: OrderedDict[str, tuple[object, int]] = OrderedDict()
+        self._bytes = 0
+        self._hits = self._misses = self._evictions = 0
+        self._lock = threading.Lock()
+        # Én lås per nøkkel som beregnes, så samme fil ikke leses av flere økter samtidig
+        self._pending: dict[str, threading.Lock] = {}
+
+    def get(self, key: str):
+        """Verdien for `key` (og markerer den som nylig brukt), eller None."""
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                self._misses += 1
+                return None
+            self._items.move_to_end(key)
+            self._hits += 1
+            return item[0]
+
+    def put(self, key: str, value) -> None:
+        size = size_of(value)
+        with self._lock:
+            if key in self._items:
+                self._bytes -= self._items.pop(key)[1]
+            if size > self.budget:
+                return
+            self._items[key] = (value, size)
+            self._bytes += size
+            while self._bytes > self.budget:
+                _, (_, evicted) = self._items.popitem(last=False)
+                self._bytes -= evicted
+                self._evictions += 1
+
+    def get_or_compute(self, key: str, compute: Callable[[], object]):
+        """
+        Henter verdien, eller beregner og lagrer den. Ber flere tråder om samme nøkkel
+        samtidig, beregnes den bare én gang; de andre venter og får samme objekt.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            key_lock = self._pending.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                item = self._items.get(key)
+                if item is not None:
+                    # Ble beregnet av en annen tråd mens vi ventet
+                    self._items.move_to_end(key)
+                    return item[0]
+            try:
+                value = compute()
+                self.put(key, value)
+                return value
+            finally:
+                with self._lock:
+                    self._pending.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(hits=self._hits, misses=self._misses, evictions=self._evictions,
+                              entries=len(self._items), bytes=self._bytes, budget=self.budget)
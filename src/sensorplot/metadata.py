@@ -0,0 +1,393 @@
+import concurrent.futures
+import datetime as dt
+import io
+import logging
+import re
+import zipfile
+import xml.etree.ElementTree as ET
+from dataclasses import asdict, dataclass
+from pathlib import Path
+import openpyxl
+from openpyxl.utils import column_index_from_string
+from openpyxl.utils.datetime import from_excel
+import pandas as pd
+
+from sensorplot.archive import HEAD_BYTES, inner_suffix, is_compressed, read_head, read_member, unpacked_size
+from sensorplot.cache import JsonRegistry, file_fingerprint
+from sensorplot.dialect import Dialect, resolve_dialect
+from sensorplot.store import STORE_SUFFIX, SeriesStore
+from sensorplot.window import csv_tidsspenn
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Så mye av dataene etter headeren brukes til å anslå antall rader i en CSV-fil
+ROW_SAMPLE_BYTES = 64 * 1024
+# Antall rader i slutten av et Excel-ark vi leter i etter siste tidsstempel
+EXCEL_TAIL_ROWS = 50
+# Arket pakkes ut strømmende; bare så mye av slutten av XML-en beholdes
+EXCEL_TAIL_BYTES = 256 * 1024
+DEFAULT_INSPECT_WORKERS = 8
+
+
+@dataclass
+class FileMetadata:
+    """
+    Det vi vet om en loggerfil uten å lese hele den.
+
+    Args:
+        path (str): Filen.
+        columns (list): Kolonnenavn (kanaler for .spb).
+        rows_estimate (int): Omtrentlig antall datarader (eksakt for .spb og Excel).
+        first, last (str | None): Første og siste tidsstempel (ISO), None hvis ukjent.
+        dialect (dict | None): Detektert/overstyrt dialekt (None for .spb).
+        sheet (str | int | None): Arket som ble inspisert (Excel).
+        interval (dict | None): Intervallprofilen fra 'sensorplot ingest' (bare .spb, se interval.IntervalProfile).
+    """
+    path: str
+    columns: list[str]
+    rows_estimate: int
+    first: str | None = None
+    last: str | None = None
+    dialect: dict | None = None
+    sheet: str | int | None = None
+    interval: dict | None = None
+
+    @property
+    def span(self) -> tuple[pd.Timestamp | None, pd.Timestamp | None]:
+        return (pd.Timestamp(self.first) if self.first else None,
+                pd.Timestamp(self.last) if self.last else None)
+
+
+def _iso(ts) -> str | None:
+    return None if ts is None or pd.isna(ts) else pd.Timestamp(ts).isoformat()
+
+
+def _tidspunkt(dato, tid, dialect: Dialect) -> pd.Timestamp | None:
+    """Tolker dato (+ tid) fra én Excel-rad på samme måte som ved full innlesing."""
+    if dato is None:
+        return None
+    try:
+        if isinstance(dato, dt.datetime):
+            ts = pd.Timestamp(dato)
+            if isinstance(tid, dt.time):
+                ts = ts.normalize() + pd.Timedelta(
+                    hours=tid.hour, minutes=tid.minute, seconds=tid.second, microseconds=tid.microsecond)
+            return ts
+        tekst = str(dato).strip() + ('' if tid is None else ' ' + str(tid).strip())
+        if dialect.date_format:
+            return pd.to_datetime(tekst, format=dialect.date_format)
+        return pd.to_datetime(tekst, dayfirst=dialect.dayfirst)
+    except (ValueError, TypeError):
+        return None
+
+
+# ==============================================================================
+#   INSPEKSJON PER FILTYPE
+# ==============================================================================
+
+def _inspect_csv(path: Path, col_date: str, col_time: str | None, overrides: dict | None) -> FileMetadata:
+    d = resolve_dialect(path, col_date, col_time, overrides=overrides)
+    columns, first, last, data_start = csv_tidsspenn(
+        path, d.encoding, d.header_row, d.sep, col_date, col_time, d.dayfirst, d.date_format)
+
+    size = path.stat().st_size
+    with open(path, 'rb') as f:
+        f.seek(data_start)
+        sample = f.read(ROW_SAMPLE_BYTES)
+    rows = sample.count(b'\n')
+    if sample and data_start + len(sample) < size:
+        # Anslag ut fra gjennomsnittlig linjelengde i starten av dataene
+        rows = round((size - data_start) * rows / len(sample))
+
+    return FileMetadata(str(path), columns, rows, _iso(first), _iso(last), d.to_dict())
+
+
+def _inspect_packed_csv(path: Path, col_date: str, col_time: str | None, overrides: dict | None,
+                        member: str | None) -> FileMetadata:
+    """
+    Komprimert CSV: bare starten av strømmen pakkes ut. Siste tidsstempel er ukjent
+    uten å pakke ut hele filen, og antall rader anslås fra utpakket størrelse.
+    """
+    d = resolve_dialect(path, col_date, col_time, overrides=overrides, member=member)
+    head = read_head(path, member, n=ROW_SAMPLE_BYTES + HEAD_BYTES)
+    columns, first, _, data_start = csv_tidsspenn(
+        path, d.encoding, d.header_row, d.sep, col_date, col_time, d.dayfirst, d.date_format, head=head)
+
+    sample = head[data_start:]
+    rows = sample.count(b'\n')
+    size = unpacked_size(path, member)
+    if sample and size is not None and size > len(head):
+        rows = round((size - data_start) * rows / len(sample))
+
+    return FileMetadata(str(path), columns, rows, _iso(first), None, d.to_dict())
+
+
+# Navnerom i .xlsx (Office Open XML)
+_XLSX_MAIN = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+_XLSX_REL = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+_XLSX_PKG_REL = 'http://schemas.openxmlformats.org/package/2006/relationships'
+_ROW_START = re.compile(rb'<row[\s>]')
+_ROW_END = b'</row>'
+
+
+def _xlsx_part(target: str) -> str:
+    """Gjør et relasjonsmål fra workbook.xml.rels om til et navn i zip-filen."""
+    return target.lstrip('/') if target.startswith('/') else f"xl/{target}"
+
+
+def _xlsx_parts(zf: zipfile.ZipFile, title: str) -> tuple[str, str | None]:
+    """Finner XML-delen for arket `title` og for de delte strengene (None hvis filen ikke har dem)."""
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    rels = {
+        rel.get('Id'): rel for rel in ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+        if rel.tag == f'{{{_XLSX_PKG_REL}}}Relationship'
+    }
+    rel_id = next(s.get(f'{{{_XLSX_REL}}}id') for s in workbook.iter(f'{{{_XLSX_MAIN}}}sheet')
+                  if s.get('name') == title)
+    shared = next((_xlsx_part(r.get('Target')) for r in rels.values()
+                   if r.get('Type', '').endswith('/sharedStrings')), None)
+    return _xlsx_part(rels[rel_id].get('Target')), shared
+
+
+def _xlsx_shared_strings(zf: zipfile.ZipFile, part: str, wanted: set[int]) -> dict[int, str]:
+    """Leser bare de delte strengene med indeks i `wanted` (strømmende, uten å holde hele tabellen)."""
+    found = {}
+    if not wanted:
+        return found
+    index = 0
+    with zf.open(part) as f:
+        for _, elem in ET.iterparse(f):
+            if elem.tag != f'{{{_XLSX_MAIN}}}si':
+                continue
+            if index in wanted:
+                # Fonetiske hint (rPh) er ikke en del av teksten
+                phonetic = {id(t) for r in elem.iter(f'{{{_XLSX_MAIN}}}rPh') for t in r.iter()}
+                found[index] = ''.join(t.text or '' for t in elem.iter(f'{{{_XLSX_MAIN}}}t')
+                                       if id(t) not in phonetic)
+                if len(found) == len(wanted):
+                    break
+            index += 1
+            elem.clear()
+    return found
+
+
+def _excel_tail_rows(path: Path, ws, first_row: tuple) -> list[list]:
+    """
+    De siste radene i et ark, uten å bygge celler for hele arket.
+
+    openpyxl må tolke alle rader for å nå slutten; her pakkes arkets XML ut
+    strømmende fra zip-filen, og bare de hele <row>-elementene i slutten tolkes.
+    Tallverdier gjøres om til dato/tid når samme kolonne var dato/tid i første datarad.
+    """
+    try:
+        with zipfile.ZipFile(path) as zf:
+            sheet_part, shared_part = _xlsx_parts(zf, ws.title)
+            tail = b''
+            with zf.open(sheet_part) as f:
+                while chunk := f.read(1024 * 1024):
+                    tail = (tail + chunk)[-EXCEL_TAIL_BYTES:]
+
+            start = _ROW_START.search(tail)
+            end = tail.rfind(_ROW_END)
+            if start is None or end < start.start():
+                return []
+            fragment = tail[start.start():end + len(_ROW_END)]
+            sheet_data = ET.fromstring(
+                b'<sheetData xmlns="' + _XLSX_MAIN.encode() + b'">' + fragment + b'</sheetData>')
+            row_elems = list(sheet_data)[-EXCEL_TAIL_ROWS:]
+
+            cells = []
+            for i, row_elem in enumerate(row_elems):
+                for c in row_elem.iter(f'{{{_XLSX_MAIN}}}c'):
+                    ref = c.get('r')
+                    col = column_index_from_string(ref.rstrip('0123456789')) - 1 if ref else -1
+                    value = c.find(f'{{{_XLSX_MAIN}}}v')
+                    if c.get('t') == 'inlineStr':
+                        text = ''.join(t.text or '' for t in c.iter(f'{{{_XLSX_MAIN}}}t'))
+                    else:
+                        text = None if value is None else value.text
+                    if 0 <= col < len(first_row) and text is not None:
+                        cells.append((i, col, c.get('t', 'n'), text))
+
+            wanted = {int(text) for *_, kind, text in cells if kind == 's'}
+            shared = _xlsx_shared_strings(zf, shared_part, wanted) if shared_part else {}
+    except (KeyError, StopIteration, ValueError, ET.ParseError, zipfile.BadZipFile) as e:
+        # Uvanlig oppbygd fil: bruk openpyxl sitt offentlige API (tolker hele arket)
+        logger.debug(f"Kunne ikke lese slutten av {path} direkte ({e}); itererer arket.")
+        min_row = max(1, (ws.max_row or 0) - EXCEL_TAIL_ROWS + 1)
+        return [list(row) for row in ws.iter_rows(min_row=min_row, values_only=True)]
+
+    rows = [[None] * len(first_row) for _ in row_elems]
+    for i, col, kind, text in cells:
+        if kind == 's':
+            value = shared.get(int(text))
+        elif kind in ('str', 'inlineStr', 'e'):
+            value = text
+        elif kind == 'b':
+            value = text == '1'
+        else:
+            number = float(text)
+            value = from_excel(number) if isinstance(first_row[col], (dt.datetime, dt.time)) else number
+        rows[i][col] = value
+    return rows
+
+
+def _inspect_excel(path: Path, col_date: str, col_time: str | None, sheet, overrides: dict | None) -> FileMetadata:
+    d = resolve_dialect(path, col_date, col_time, sheet, overrides)
+    wb = openpyxl.load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet] if isinstance(sheet, str) else wb.worksheets[sheet or 0]
+        header_excel_row = d.header_row + 1  # openpyxl teller fra 1
+        header = next(ws.iter_rows(min_row=header_excel_row, max_row=header_excel_row, values_only=True), ())
+        raw = [None if c is None else str(c).strip() for c in header]
+        columns = [c for c in raw if c]
+        max_row = ws.max_row or 0
+        first_row = ()
+
+        first = last = None
+        if col_date in raw:
+            i_date = raw.index(col_date)
+            i_time = raw.index(col_time) if col_time and col_time in raw else None
+
+            def tid(row):
+                return _tidspunkt(row[i_date], row[i_time] if i_time is not None else None, d)
+
+            first_row = ()
+            for row in ws.iter_rows(min_row=header_excel_row + 1, max_row=header_excel_row + EXCEL_TAIL_ROWS,
+                                    values_only=True):
+                first, first_row = tid(row), row
+                if first is not None:
+                    break
+            for row in _excel_tail_rows(path, ws, first_row):
+                last = tid(row) or last
+
+        rows = max(0, max_row - header_excel_row)
+    finally:
+        wb.close()
+
+    return FileMetadata(str(path), columns, rows, _iso(first), _iso(last), d.to_dict(), sheet)
+
+
+def _inspect_store(path: Path) -> FileMetadata:
+    store = SeriesStore(path)
+    time = store.time
+    first = time[0] if store.rows else None
+    last = time[-1] if store.rows else None
+    return FileMetadata(str(path), list(store.channels), store.rows, _iso(first), _iso(last),
+                        interval=store.header.get('meta', {}).get('interval'))
+
+
+# ==============================================================================
+#   INDEKS
+# ==============================================================================
+
+_index = JsonRegistry('metadata_index.json')
+
+
+def inspect_file(
+    path: str | Path,
+    col_date: str,
+    col_time: str | None = None,
+    sheet: str | int | None = None,
+    overrides: dict | None = None,
+    member: str | None = None
+) -> FileMetadata:
+    """
+    Leser bare header og første/siste tidsstempel fra en fil.
+    Resultatet lagres i metadataindeksen, nøklet på filens fingeravtrykk.
+    For komprimerte filer og arkiver velger `member` filen i et zip-arkiv.
+    """
+    path = Path(path)
+    if not path.exists():
+        raise FileNotFoundError(f"Finner ikke filen '{path}'")
+
+    key = f"{file_fingerprint(path)}|{sheet}|{col_date}|{col_time}|{sorted((overrides or {}).items())}"
+    if member is not None:
+        key += f"|{member}"
+    cached = _index.get(key)
+    if cached is not None:
+        meta = FileMetadata(**cached)
+        meta.path = str(path)
+        return meta
+
+    ext = path.suffix.lower()
+    if is_compressed(path) and inner_suffix(path, member) == '.xlsx':
+        # Excel i et arkiv pakkes ut i minnet; resten av inspeksjonen er som for en vanlig fil
+        meta = _inspect_excel(io.BytesIO(read_member(path, member)), col_date, col_time, sheet, overrides)
+        meta.path = str(path)
+    elif is_compressed(path):
+        meta = _inspect_packed_csv(path, col_date, col_time, overrides, member)
+    elif ext == STORE_SUFFIX:
+        meta = _inspect_store(path)
+    elif ext == '.xlsx':
+        meta = _inspect_excel(path, col_date, col_time, sheet, overrides)
+    elif ext == '.csv':
+        meta = _inspect_csv(path, col_date, col_time, overrides)
+    else:
+        raise ValueError(f"Ukjent filformat: {ext}")
+
+    _index.put(key, asdict(meta))
+    return meta
+
+
+def inspect_files(specs: dict[str, dict], workers: int = DEFAULT_INSPECT_WORKERS) -> dict[str, FileMetadata | Exception]:
+    """
+    Inspiserer mange filer parallelt.
+
+    Args:
+        specs (dict): {'alias': {'path': ..., 'col_date': ..., 'col_time': ..., 'sheet': ..., 'dialect': ...,
+                      'member': ...}}
+        workers (int): Antall tråder.
+
+    Returns:
+        dict: {'alias': FileMetadata}, eller unntaksobjektet hvis filen ikke kunne inspiseres.
+    """
+    resultater: dict[str, FileMetadata | Exception] = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(inspect_file, spec['path'], spec['col_date'], spec.get('col_time'),
+                            spec.get('sheet'), spec.get('dialect'), spec.get('member')): alias
+            for alias, spec in specs.items()
+        }
+        for future in concurrent.futures.as_completed(futures):
+            alias = futures[future]
+            try:
+                resultater[alias] = future.result()
+            except Exception as e:
+                resultater[alias] = e
+    return {alias: resultater[alias] for alias in specs}
+
+
+def validate_metadata(
+    meta: FileMetadata,
+    alias: str,
+    col_date: str,
+    col_data: str,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None
+) -> tuple[list[str], list[str]]:
+    """
+    Sjekker en fil mot det konfigurasjonen forventer, uten å laste dataene.
+
+    Returns:
+        (feil, advarsler): Feil betyr at lasting garantert vil feile.
+    """
+    feil, advarsler = [], []
+    is_store = meta.path.lower().endswith(STORE_SUFFIX)
+
+    if not is_store and col_date not in meta.columns:
+        feil.append(f"{alias}: fant ikke datokolonnen '{col_date}' i {meta.path}. Tilgjengelige: {meta.columns}")
+    if col_data not in meta.columns:
+        feil.append(f"{alias}: fant ikke datakolonnen '{col_data}' i {meta.path}. Tilgjengelige: {meta.columns}")
+
+    first, last = meta.span
+    if start is not None and last is not None and last < start:
+        advarsler.append(f"{alias}: siste måling ({last}) er før tidsvinduet starter ({start}).")
+    if end is not None and first is not None and first > end:
+        advarsler.append(f"{alias}: første måling ({first}) er etter at tidsvinduet slutter ({end}).")
+    return feil, advarsler
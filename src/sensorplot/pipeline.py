@@ -0,0 +1,644 @@
+import concurrent.futures
+import logging
+import queue
+import threading
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Callable, Iterator
+import numpy as np
+import pandas as pd
+
+from sensorplot.core import Rensing, SensorResult, flagg_resultat
+from sensorplot.formula import evaluate_formula, has_functions
+from sensorplot.interval import FALLBACK_TOLERANCE, IntervalProfile, profile_times
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+STAGE_LOAD = 'load'
+STAGE_ALIGN = 'align'
+STAGE_EVAL = 'eval'
+STAGE_CLEAN = 'clean'
+STAGES = (STAGE_LOAD, STAGE_ALIGN, STAGE_EVAL, STAGE_CLEAN)
+
+DEFAULT_WORKERS = {STAGE_LOAD: 4, STAGE_ALIGN: 2, STAGE_EVAL: 2, STAGE_CLEAN: 2}
+# Fast toleranse når intervallet til en serie ikke kan bestemmes (se interval.IntervalProfile)
+DEFAULT_TOLERANCE = FALLBACK_TOLERANCE
+# Står i stedet for mål-aliaset når en familie av maler beregnes samlet
+TEMPLATE_PLACEHOLDER = '__mal__'
+
+
+def parse_workers(value) -> dict[str, int]:
+    """
+    Tolker antall arbeidere per steg fra CLI/YAML/GUI.
+
+    Godtar et tall (samme for alle steg), en dict ({'load': 4, 'eval': 2})
+    eller en liste med 'steg=N' / 'N'. Steg som ikke nevnes får standardverdien.
+    """
+    workers = dict(DEFAULT_WORKERS)
+    if value is None:
+        return workers
+
+    if isinstance(value, int):
+        value = {stage: value for stage in STAGES}
+    elif isinstance(value, str):
+        value = [value]
+    if isinstance(value, (list, tuple)):
+        parsed = {}
+        for item in value:
+            item = str(item).strip()
+            if '=' in item:
+                stage, n = item.split('=', 1)
+                parsed[stage.strip()] = n
+            else:
+                parsed.update({stage: item for stage in STAGES})
+        value = parsed
+
+    for stage, n in value.items():
+        if stage not in STAGES:
+            raise ValueError(f"Ukjent steg '{stage}'. Gyldige: {', '.join(STAGES)}")
+        n = int(n)
+        if n < 1:
+            raise ValueError(f"Antall arbeidere for '{stage}' må være minst 1.")
+        workers[stage] = n
+    return workers
+
+
+class Cancelled(Exception):
+    """Kastes i et steg når kjøringen er avbrutt."""
+
+
+class CancelToken:
+    """Delt avbruddsflagg. Stegene sjekker det før de starter tungt arbeid."""
+
+    def __init__(self):
+        self._event = threading.Event()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def check(self) -> None:
+        if self._event.is_set():
+            raise Cancelled()
+
+
+@dataclass
+class SeriesJob:
+    """
+    En serie som skal beregnes.
+
+    Args:
+        label (str): Navnet på serien i plottet/legenden.
+        formula (str): Formelen slik brukeren skrev den (for feilmeldinger).
+        expression (str): Formelen klargjort for DataFrame.eval (med backticks rundt 'Alias.Kolonne').
+        aliases (list): Filaliasene formelen trenger, i rekkefølgen de slås sammen.
+        engine (str | None): Motor for DataFrame.eval (None = pandas sitt valg).
+        panel (str | None): Panelet serien tegnes i (None = hovedpanelet).
+        template (str | None): Malen serien ble laget fra (se formula.expand_template).
+        target (str | None): Aliaset malen ble fylt ut med.
+    """
+    label: str
+    formula: str
+    expression: str
+    aliases: list[str]
+    engine: str | None = None
+    panel: str | None = None
+    template: str | None = None
+    target: str | None = None
+
+
+@dataclass
+class SeriesFamily:
+    """
+    Serier fra samme mal, f.eks. 25 vannstandsloggere korrigert mot samme barometer.
+
+    De delte aliasene (barometeret) slås sammen én gang mot alle målenes tidspunkter,
+    og formelen beregnes for hele familien i én vektorisert operasjon i stedet for
+    én sammenslåing og én eval per serie.
+
+    Args:
+        members (list): Seriene i familien. Hver har sitt mål-alias først i 'aliases'.
+        shared (list): Aliasene alle seriene bruker (samme rekkefølge i alle).
+        expression (str): Formelen med TEMPLATE_PLACEHOLDER i stedet for mål-aliaset.
+    """
+    members: list[SeriesJob]
+    shared: list[str]
+    expression: str
+
+    @property
+    def label(self) -> str:
+        return f"mal '{self.members[0].template}'"
+
+    @property
+    def formula(self) -> str:
+        return self.members[0].template
+
+    @property
+    def aliases(self) -> list[str]:
+        return [m.target for m in self.members] + self.shared
+
+    @property
+    def engine(self) -> str | None:
+        return self.members[0].engine
+
+
+@dataclass
+class PipelineResult:
+    label: str
+    result: SensorResult | None = None
+    error: str | None = None
+    removed: int = 0
+    # Serien resultatet hører til (flere serier kan ha samme label)
+    job: SeriesJob | SeriesFamily | None = None
+
+
+# ==============================================================================
+#   STEG
+# ==============================================================================
+
+def _per_frame(tolerance, n: int) -> list[pd.Timedelta]:
+    if isinstance(tolerance, (list, tuple)):
+        if len(tolerance) != n:
+            raise ValueError(f"Forventet {n} toleranser, fikk {len(tolerance)}.")
+        return list(tolerance)
+    return [tolerance] * n
+
+
+def auto_tolerances(frames: list[pd.DataFrame]) -> list[pd.Timedelta]:
+    """Toleranse for hver serie etter den første, fra intervallprofilen til serien som slås inn."""
+    return [profile_times(df['Datetime']).tolerance for df in frames[1:]]
+
+
+def align_frames(
+    dfs: list[pd.DataFrame],
+    tolerance: pd.Timedelta | list[pd.Timedelta] = DEFAULT_TOLERANCE
+) -> pd.DataFrame:
+    """
+    Slår sammen tidsseriene på nærmeste tidspunkt (innenfor toleransen).
+    `tolerance` kan være én for alle, eller en liste med én per serie etter den første.
+    """
+    # Grunn kopi, slik at nye kolonner aldri havner i en delt/cachet DataFrame
+    merged = dfs[0].copy(deep=False)
+    for other_df, tol in zip(dfs[1:], _per_frame(tolerance, len(dfs) - 1)):
+        merged = pd.merge_asof(
+            merged, other_df, on='Datetime', direction='nearest', tolerance=tol
+        )
+    return merged
+
+
+def group_families(jobs: list[SeriesJob]) -> list[SeriesJob | SeriesFamily]:
+    """
+    Samler serier fra samme mal i en SeriesFamily når de kan beregnes samlet:
+    målet må være første alias (det bestemmer tidsaksen) og de øvrige aliasene like.
+    Andre serier, og maler med bare én serie, beholdes som de er.
+    """
+    def key(job):
+        if job.template is None or not job.aliases or job.aliases[0] != job.target \
+                or job.target in job.aliases[1:]:
+            return None
+        return job.template, tuple(job.aliases[1:])
+
+    groups: dict[tuple, list[SeriesJob]] = {}
+    for job in jobs:
+        if key(job) is not None:
+            groups.setdefault(key(job), []).append(job)
+
+    result, seen = [], set()
+    for job in jobs:
+        k = key(job)
+        members = groups.get(k) if k is not None else None
+        if not members or len(members) < 2:
+            result.append(job)
+        elif k not in seen:
+            seen.add(k)
+            result.extend(_make_family(members, list(k[1])))
+    return result
+
+
+def _make_family(members: list[SeriesJob], shared: list[str]) -> list[SeriesJob | SeriesFamily]:
+    def generic(job):
+        return job.expression.replace(f"`{job.target}.", f"`{TEMPLATE_PLACEHOLDER}.")
+    expression = generic(members[0])
+    # Formelen må være lik for alle når målet er byttet ut, ellers beregnes de hver for seg
+    if any(generic(m) != expression for m in members) or len({m.engine for m in members}) > 1:
+        return members
+    return [SeriesFamily(members=members, shared=shared, expression=expression)]
+
+
+def _nearest_rows(reference: np.ndarray, query: np.ndarray, tolerance: pd.Timedelta) -> np.ndarray:
+    """
+    Indeksen til nærmeste tidspunkt i `reference` (sortert) for hvert tidspunkt i `query`,
+    eller -1 hvis nærmeste er lenger unna enn toleransen. Som merge_asof(direction='nearest'),
+    men `query` trenger ikke være sortert.
+    """
+    ref = reference.astype('datetime64[ns]').view('i8')
+    q = query.astype('datetime64[ns]').view('i8')
+    if len(ref) == 0:
+        return np.full(len(q), -1)
+    # Bakover: siste tidspunkt <= q. Forover: første tidspunkt >= q. Ved like tidsstempler
+    # i `reference` gir et eksakt treff da den siste av dem, som i merge_asof.
+    left = np.clip(np.searchsorted(ref, q, side='right') - 1, 0, None)
+    right = np.clip(np.searchsorted(ref, q, side='left'), None, len(ref) - 1)
+    # Ved lik avstand vinner det bakre tidspunktet, som i merge_asof
+    rows = np.where(np.abs(q - ref[left]) <= np.abs(ref[right] - q), left, right)
+    rows[np.abs(ref[rows] - q) > tolerance.value] = -1
+    return rows
+
+
+def align_family(
+    family: SeriesFamily,
+    frames: list[pd.DataFrame],
+    tolerance: pd.Timedelta | list[pd.Timedelta] = DEFAULT_TOLERANCE
+) -> tuple[pd.DataFrame, np.ndarray]:
+    """
+    Stabler målene under hverandre (mål-kolonnene omdøpt til TEMPLATE_PLACEHOLDER) og
+    slår hver delt serie sammen med alle målenes tidspunkter i ett binærsøk.
+
+    Gir samme verdier som align_frames per serie, siden hver delt serie uansett slås
+    sammen mot målets tidspunkter. `tolerance` kan være én per delt serie.
+
+    Returns:
+        (long, bounds): Den stablede tabellen og radgrensene for hvert medlem.
+    """
+    n = len(family.members)
+    targets, shared = frames[:n], frames[n:]
+
+    columns = None
+    for member, df in zip(family.members, targets):
+        generic = [TEMPLATE_PLACEHOLDER + c[len(member.target):] if c.startswith(f"{member.target}.") else c
+                   for c in df.columns]
+        if columns is not None and generic != columns:
+            raise ValueError(f"Seriene i {family.label} har ulike kolonner ({columns} / {generic}).")
+        columns = generic
+
+    data = {name: np.concatenate([df.iloc[:, i].to_numpy() for df in targets]) for i, name in enumerate(columns)}
+    times = data['Datetime']
+    for other_df, tol in zip(shared, _per_frame(tolerance, len(shared))):
+        rows = _nearest_rows(other_df['Datetime'].to_numpy(), times, tol)
+        missing = rows < 0
+        for c in other_df.columns:
+            if c == 'Datetime':
+                continue
+            values = other_df[c].to_numpy(dtype=float)[np.clip(rows, 0, None)]
+            values[missing] = np.nan
+            data[c] = values
+
+    bounds = np.cumsum([0] + [len(df) for df in targets])
+    return pd.DataFrame(data, copy=False), bounds
+
+
+def evaluate_family(family: SeriesFamily, long: pd.DataFrame, bounds: np.ndarray) -> pd.DataFrame:
+    """
+    Beregner formelen for hele familien. Ren aritmetikk går i én eval over den stablede
+    tabellen; formler med tidsfunksjoner (rolling_mean osv.) beregnes per medlem, så
+    vinduene ikke går på tvers av loggerne.
+    """
+    if not has_functions(family.expression):
+        return evaluate_expression(long, family.expression, family.engine)
+
+    parts = [
+        np.asarray(evaluate_formula(long.iloc[a:b].reset_index(drop=True), family.expression, family.engine),
+                   dtype=float)
+        for a, b in zip(bounds[:-1], bounds[1:])
+    ]
+    long['Resultat'] = np.concatenate(parts) if parts else np.array([], dtype=float)
+    return long
+
+
+def split_family(family: SeriesFamily, long: pd.DataFrame, bounds: np.ndarray) -> list[pd.DataFrame]:
+    """Deler den stablede tabellen tilbake i én DataFrame per medlem, med de ekte kolonnenavnene."""
+    arrays = {c: long[c].to_numpy() for c in long.columns}
+    frames = []
+    for member, a, b in zip(family.members, bounds[:-1], bounds[1:]):
+        frames.append(pd.DataFrame({
+            (member.target + c[len(TEMPLATE_PLACEHOLDER):] if c.startswith(f"{TEMPLATE_PLACEHOLDER}.") else c): v[a:b]
+            for c, v in arrays.items()
+        }))
+    return frames
+
+
+def evaluate_expression(df: pd.DataFrame, expression: str, engine: str | None = None) -> pd.DataFrame:
+    """
+    Beregner formelen og legger resultatet i kolonnen 'Resultat'.
+    Formelen kan bruke tidsfunksjonene i sensorplot.formula (rolling_mean, diff, ...).
+    """
+    result = evaluate_formula(df, expression, engine)
+    if isinstance(result, (tuple, list)):
+        raise ValueError("Resultat ble liste/tuple.")
+    df['Resultat'] = result
+    return df
+
+
+def clean_result(df: pd.DataFrame, cleaning: Rensing | float | None) -> tuple[pd.DataFrame, int]:
+    """
+    Flagger tvilsomme målinger i 'Resultat' (se core.lag_flagg). Radene beholdes, så
+    en annen terskel senere bare krever nye flagg. Et tall betyr Rensing(z_score=tall).
+    """
+    if isinstance(cleaning, (int, float)):
+        cleaning = Rensing(z_score=float(cleaning))
+    if cleaning is None or not cleaning.aktiv:
+        return df, 0
+    return flagg_resultat(df, cleaning)
+
+
+def run_series(
+    job: SeriesJob,
+    frames: list[pd.DataFrame],
+    cleaning: Rensing | float | None,
+    tolerance: pd.Timedelta | None = None
+) -> PipelineResult:
+    """
+    Kjører align/eval/clean for én serie synkront (uten trådpool).
+    Uten `tolerance` velges den per serie fra intervallprofilen (se auto_tolerances).
+    """
+    merged = align_frames(frames, auto_tolerances(frames) if tolerance is None else tolerance)
+    try:
+        merged = evaluate_expression(merged, job.expression, job.engine)
+    except Exception as e:
+        return PipelineResult(job.label, error=f"Feil i formel '{job.formula}': {e}")
+    merged, removed = clean_result(merged, cleaning)
+    result = SensorResult(label=job.label, df=merged, panel=job.panel)
+    return PipelineResult(job.label, result=result, removed=removed)
+
+
+# ==============================================================================
+#   PIPELINE
+# ==============================================================================
+
+class SeriesPipeline:
+    """
+    Beregner mange serier i steg (load -> align -> eval -> clean) med egne
+    trådpooler og et fast antall arbeidere per steg.
+
+    - Hver fil lastes bare én gang, selv om flere serier bruker den.
+    - Bare et begrenset antall serier er underveis samtidig (mottrykk), så minnebruken
+      holder seg nede selv med mange serier.
+    - Resultatene strømmes ut etter hvert som hver serie blir ferdig.
+    - Et CancelToken stopper alt arbeid som ikke har startet ennå.
+
+    Args:
+        loader (Callable): Funksjon alias -> DataFrame ('Datetime' + 'Alias.Kolonne').
+        workers (dict | None): Antall arbeidere per steg (se parse_workers).
+        token (CancelToken | None): Avbruddsflagg. Lages automatisk hvis det mangler.
+        tolerance (Timedelta | None): Fast toleranse for alle sammenslåinger. None = automatisk:
+            hver serie profileres når den lastes (median intervall, jitter, hull), og toleransen
+            mot den blir et halvt intervall pluss jitter (se interval.IntervalProfile).
+        tolerances (dict | None): Toleranse per alias; vinner over `tolerance`.
+        release (Callable | None): Kalles med aliaset når ingen gjenstående serie trenger filen.
+            Pipelinen slipper da sin referanse, og kalleren kan fjerne filen fra sin cache
+            (brukes ved sekvensiell kjøring, se sensorplot.planner).
+        profiles (dict | None): Ferdige intervallprofiler per alias (f.eks. lagret i et .spb-lager
+            ved ingest). Disse aliasene profileres ikke på nytt når de lastes.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], pd.DataFrame],
+        workers: dict[str, int] | None = None,
+        token: CancelToken | None = None,
+        tolerance: pd.Timedelta | None = None,
+        tolerances: dict[str, pd.Timedelta] | None = None,
+        release: Callable[[str], None] | None = None,
+        profiles: dict[str, IntervalProfile] | None = None
+    ):
+        self.loader = loader
+        self.release = release
+        self.workers = parse_workers(workers)
+        self.token = token or CancelToken()
+        self.tolerance = tolerance
+        self.tolerances = dict(tolerances or {})
+        self.profiles: dict[str, IntervalProfile] = dict(profiles or {})
+        self._loads: dict[str, concurrent.futures.Future] = {}
+        self._loads_lock = threading.Lock()
+
+    def _load_future(self, pools, alias: str) -> concurrent.futures.Future:
+        with self._loads_lock:
+            if alias not in self._loads:
+                self._loads[alias] = pools[STAGE_LOAD].submit(self._load, alias)
+            return self._loads[alias]
+
+    def _load(self, alias: str) -> pd.DataFrame:
+        self.token.check()
+        df = self.loader(alias)
+        # Profilen brukes til å velge toleranse ved sammenslåing. En lagret profil gjenbrukes.
+        profile = self.profiles.get(alias)
+        if profile is None:
+            profile = profile_times(df['Datetime'])
+            self.profiles[alias] = profile
+        logger.debug(f"Intervall for '{alias}': median {profile.median}, jitter {profile.jitter}, "
+                     f"{len(profile.gaps)} hull.")
+        return df
+
+    def tolerance_for(self, alias: str) -> pd.Timedelta:
+        """Toleransen når `alias` slås sammen mot en annen serie: per alias, global eller fra profilen."""
+        if alias in self.tolerances:
+            return self.tolerances[alias]
+        if self.tolerance is not None:
+            return self.tolerance
+        profile = self.profiles.get(alias)
+        return profile.tolerance if profile is not None else DEFAULT_TOLERANCE
+
+    def _align(self, job: SeriesJob | SeriesFamily, frames: list[pd.DataFrame]):
+        self.token.check()
+        if isinstance(job, SeriesFamily):
+            return align_family(job, frames, [self.tolerance_for(a) for a in job.shared])
+        return align_frames(frames, [self.tolerance_for(a) for a in job.aliases[1:]])
+
+    def _eval(self, job: SeriesJob | SeriesFamily, merged):
+        self.token.check()
+        if isinstance(job, SeriesFamily):
+            long, bounds = merged
+            return evaluate_family(job, long, bounds), bounds
+        return evaluate_expression(merged, job.expression, job.engine)
+
+    def _clean(self, job: SeriesJob | SeriesFamily, merged, cleaning) -> PipelineResult | list[PipelineResult]:
+        self.token.check()
+        if isinstance(job, SeriesFamily):
+            return [self._clean(member, df, cleaning) for member, df in zip(job.members, split_family(job, *merged))]
+        merged, removed = clean_result(merged, cleaning)
+        result = SensorResult(label=job.label, df=merged, panel=job.panel)
+        return PipelineResult(job.label, result=result, removed=removed, job=job)
+
+    def _start_job(self, pools, job: SeriesJob, cleaning, done: queue.Queue) -> None:
+        """Kobler stegene for én serie sammen med callbacks, uten å blokkere."""
+        finished = [False]
+        finished_lock = threading.Lock()
+        # Medlemmer av en familie som er tatt ut fordi filen deres ikke kunne leses
+        failed: list[PipelineResult] = []
+
+        def finish(res: PipelineResult | list[PipelineResult]) -> None:
+            # Hver serie (eller familie) skal gi nøyaktig ett utfall, selv om flere filer feiler
+            with finished_lock:
+                if finished[0]:
+                    return
+                finished[0] = True
+            if isinstance(res, PipelineResult) and res.job is None:
+                res.job = job
+            if failed:
+                res = failed + (res if isinstance(res, list) else [res])
+            done.put((job, res))
+
+        def fail(error: BaseException, stage: str) -> None:
+            if isinstance(error, (Cancelled, concurrent.futures.CancelledError)):
+                finish(PipelineResult(job.label))
+            elif stage == STAGE_LOAD:
+                finish(PipelineResult(job.label, error=f"Feil ved lesing for '{job.label}': {error}"))
+            elif stage == STAGE_EVAL:
+                finish(PipelineResult(job.label, error=f"Feil i formel '{job.formula}': {error}"))
+            else:
+                finish(PipelineResult(job.label, error=f"Feil i '{job.label}' ({stage}): {error}"))
+
+        def chain(future, stage: str, next_step: Callable) -> None:
+            def callback(f):
+                try:
+                    value = f.result()
+                except BaseException as e:
+                    fail(e, stage)
+                    return
+                try:
+                    next_step(value)
+                except BaseException as e:
+                    # Poolen kan være stengt hvis kjøringen er avbrutt
+                    fail(e, stage)
+            future.add_done_callback(callback)
+
+        load_futures = [self._load_future(pools, a) for a in job.aliases]
+        remaining = [len(load_futures)]
+        remaining_lock = threading.Lock()
+
+        def start(target: SeriesJob | SeriesFamily, frames: list[pd.DataFrame]) -> None:
+            f_align = pools[STAGE_ALIGN].submit(self._align, target, frames)
+            chain(f_align, STAGE_ALIGN, lambda merged: on_aligned(target, merged))
+
+        def on_loaded(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+            start(job, [f.result() for f in load_futures])
+
+        def on_aligned(target, merged):
+            f_eval = pools[STAGE_EVAL].submit(self._eval, target, merged)
+            chain(f_eval, STAGE_EVAL, lambda evaluated: on_evaluated(target, evaluated))
+
+        def on_evaluated(target, merged):
+            f_clean = pools[STAGE_CLEAN].submit(self._clean, target, merged, cleaning)
+            chain(f_clean, STAGE_CLEAN, finish)
+
+        if not isinstance(job, SeriesFamily):
+            for f in load_futures:
+                chain(f, STAGE_LOAD, on_loaded)
+            return
+
+        # En familie venter til alle filene er lest (eller feilet). Feiler et mål, beregnes
+        # resten av familien som før, og feilen meldes under serien som brukte filen.
+        def on_settled(_):
+            with remaining_lock:
+                remaining[0] -= 1
+                if remaining[0] > 0:
+                    return
+            try:
+                errors = {a: f.exception() for a, f in zip(job.aliases, load_futures)}
+            except concurrent.futures.CancelledError as e:
+                fail(e, STAGE_LOAD)
+                return
+            errors = {a: e for a, e in errors.items() if e is not None}
+            cancelled = next((e for e in errors.values() if isinstance(e, Cancelled)), None)
+            if cancelled is not None:
+                fail(cancelled, STAGE_LOAD)
+                return
+            shared_error = next((errors[a] for a in job.shared if a in errors), None)
+            if shared_error is not None:
+                finish([PipelineResult(m.label, error=f"Feil ved lesing for '{m.label}': {shared_error}", job=m)
+                        for m in job.members])
+                return
+
+            failed.extend(
+                PipelineResult(m.label, error=f"Feil ved lesing for '{m.label}' ({m.target}): {errors[m.target]}",
+                               job=m)
+                for m in job.members if m.target in errors)
+            members = [m for m in job.members if m.target not in errors]
+            if not members:
+                finish([])
+                return
+            target = job if not failed else (
+                SeriesFamily(members=members, shared=job.shared, expression=job.expression)
+                if len(members) > 1 else members[0])
+            by_alias = dict(zip(job.aliases, load_futures))
+            try:
+                start(target, [by_alias[a].result() for a in target.aliases])
+            except BaseException as e:
+                fail(e, STAGE_ALIGN)
+
+        for f in load_futures:
+            f.add_done_callback(on_settled)
+
+    def _release_unused(self, job: SeriesJob | SeriesFamily, uses: Counter) -> None:
+        """Slipper filene til en ferdig serie som ingen av de gjenstående seriene trenger."""
+        for alias in dict.fromkeys(job.aliases):
+            uses[alias] -= 1
+            if uses[alias] == 0:
+                with self._loads_lock:
+                    self._loads.pop(alias, None)
+                self.release(alias)
+
+    def run(self, jobs: list[SeriesJob], cleaning: Rensing | float | None = None,
+            max_in_flight: int | None = None) -> Iterator[PipelineResult]:
+        """
+        Kjører alle serier og gir (yield) resultatene etter hvert som de blir ferdige.
+        Avbrutte serier gis ikke ut. Feil gis ut som PipelineResult med 'error'.
+        """
+        if max_in_flight is None:
+            max_in_flight = self.workers[STAGE_ALIGN] + self.workers[STAGE_EVAL] + self.workers[STAGE_CLEAN]
+
+        pools = {
+            stage: concurrent.futures.ThreadPoolExecutor(
+                max_workers=self.workers[stage], thread_name_prefix=f"sensorplot-{stage}")
+            for stage in STAGES
+        }
+        done: queue.Queue = queue.Queue()
+        pending = deque(jobs)
+        in_flight = 0
+        # Antall serier som fortsatt trenger hver fil
+        uses = Counter(a for job in jobs for a in dict.fromkeys(job.aliases)) if self.release else None
+
+        try:
+            while pending or in_flight:
+                # Slipp inn nye serier bare når det er ledig kapasitet (mottrykk)
+                while pending and in_flight < max_in_flight and not self.token.cancelled:
+                    self._start_job(pools, pending.popleft(), cleaning, done)
+                    in_flight += 1
+
+                if self.token.cancelled:
+                    logger.info("Kjøringen ble avbrutt.")
+                    return
+
+                try:
+                    job, res = done.get(timeout=0.1)
+                except queue.Empty:
+                    continue
+                in_flight -= 1
+                if uses is not None:
+                    self._release_unused(job, uses)
+
+                # En familie gir ett resultat per medlem
+                for item in (res if isinstance(res, list) else [res]):
+                    if item.result is None and item.error is None:
+                        continue  # Avbrutt
+                    yield item
+        except BaseException:
+            # Ctrl+C, GeneratorExit (kalleren sluttet å lese) o.l.: stopp arbeidet som ikke har
+            # startet, og ikke vent på det som kjører, før poolene stenges
+            self.token.cancel()
+            raise
+        finally:
+            for pool in pools.values():
+                pool.shutdown(wait=not self.token.cancelled, cancel_futures=True)
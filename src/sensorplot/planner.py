@@ -0,0 +1,283 @@
+import logging
+import os
+import re
+from dataclasses import dataclass, field
+from pathlib import Path
+import pandas as pd
+
+from sensorplot.archive import inner_suffix, is_compressed
+from sensorplot.metadata import FileMetadata
+from sensorplot.store import STORE_SUFFIX
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Strategiene i økende grad av sparing. Hver tar med tiltakene til de foran.
+STRATEGY_MEMORY = 'memory'          # alt i minnet som float64, flere serier samtidig
+STRATEGY_FLOAT32 = 'float32'        # datakolonnene holdes som float32
+STRATEGY_CHUNKED = 'chunked'        # CSV tolkes i biter; bare tid og datakolonne beholdes
+STRATEGY_SEQUENTIAL = 'sequential'  # én serie om gangen; filer slippes når ingen serie trenger dem mer
+STRATEGIES = (STRATEGY_MEMORY, STRATEGY_FLOAT32, STRATEGY_CHUNKED, STRATEGY_SEQUENTIAL)
+
+# Rader per bit ved bitvis tolking av CSV
+CHUNK_ROWS = 250_000
+# Omtrentlig minne per celle mens en fil tolkes (før den blir til 'Datetime' + datakolonne)
+NUMBER_CELL_BYTES = 8
+TEXT_CELL_BYTES = 64
+EXCEL_CELL_BYTES = 160
+# Antatt linjelengde når antall rader ikke kan leses fra filen
+LINE_BYTES = 40
+# Uten --max-memory brukes denne andelen av det fysiske minnet
+DEFAULT_BUDGET_FRACTION = 0.5
+
+_UNITS = {'K': 2**10, 'M': 2**20, 'G': 2**30, 'T': 2**40}
+_MEMORY = re.compile(r'(\d+(?:\.\d+)?)\s*([KMGT]?)I?B?')
+
+
+def parse_memory(value) -> int | None:
+    """
+    '4G', '512M', '1.5GB' eller et tall i MB -> bytes. None eller 'auto' gir None
+    (standardbudsjettet, se default_budget).
+    """
+    if value is None or str(value).strip().lower() in ('', 'auto'):
+        return None
+    match = _MEMORY.fullmatch(str(value).strip().upper())
+    if match is None or float(match[1]) <= 0:
+        raise ValueError(f"Ugyldig minnegrense {value!r}. Bruk f.eks. 512M eller 4G.")
+    return int(float(match[1]) * _UNITS[match[2] or 'M'])
+
+
+def default_budget() -> int | None:
+    """Halvparten av det fysiske minnet, eller None der det ikke kan leses (f.eks. Windows)."""
+    try:
+        total = os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+    return int(total * DEFAULT_BUDGET_FRACTION)
+
+
+def _mb(n: int) -> str:
+    return f"{n / 2**20:,.0f} MB".replace(',', ' ')
+
+
+# ==============================================================================
+#   ANSLAG PER ALIAS
+# ==============================================================================
+
+@dataclass
+class AliasEstimate:
+    """
+    Anslått minnebruk for ett alias.
+
+    Args:
+        alias (str): Aliaset.
+        kind (str): Filtypen som tolkes ('.csv', '.xlsx', '.spb'); for komprimerte filer innholdet.
+        file_rows (int): Rader som må tolkes (alle filene i et mønster).
+        rows (int): Rader som blir igjen etter tidsvinduet.
+        columns (int): Kolonner i filen.
+        text_columns (int): Dato- og tidskolonnene, som tolkes som tekst.
+        size (int): Filstørrelse på disk i bytes.
+    """
+    alias: str
+    kind: str
+    file_rows: int
+    rows: int
+    columns: int
+    text_columns: int = 1
+    size: int = 0
+
+    def loaded(self, value_bytes: int = 8) -> int:
+        """Ferdig innlest: 'Datetime' (8 bytes) og datakolonnen."""
+        return self.rows * (8 + value_bytes)
+
+    def parse_peak(self, chunk_rows: int | None = None) -> int:
+        """Det tolkingen av filen bruker i tillegg til det ferdige resultatet."""
+        if self.kind == STORE_SUFFIX:
+            # Lageret er memory-mapped; bare kanalen som brukes kopieres
+            return 0
+        if self.kind == '.xlsx':
+            # openpyxl bygger alle cellene uansett; Excel kan ikke leses i biter
+            return self.file_rows * self.columns * EXCEL_CELL_BYTES
+        rows = min(self.file_rows, chunk_rows) if chunk_rows else self.file_rows
+        numbers = max(self.columns - self.text_columns, 0)
+        return rows * (numbers * NUMBER_CELL_BYTES + self.text_columns * TEXT_CELL_BYTES)
+
+
+def _window_fraction(meta: FileMetadata, start, end) -> float:
+    """Andelen av filens tidsrom som ligger i [start, end] (1.0 hvis ukjent)."""
+    first, last = meta.span
+    if first is None or last is None or last <= first or (start is None and end is None):
+        return 1.0
+    lo = max(first, start) if start is not None else first
+    hi = min(last, end) if end is not None else last
+    return min(1.0, max(0.0, (hi - lo) / (last - first)))
+
+
+def estimate_alias(
+    alias: str,
+    meta: FileMetadata | Exception | None,
+    paths: list[Path],
+    col_date: str,
+    col_time: str | None = None,
+    member: str | None = None,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None
+) -> AliasEstimate:
+    """
+    Anslår minnebruken for ett alias ut fra metadataindeksen (rader og kolonner, se
+    metadata.inspect_file) og filstørrelsen. `meta` gjelder én av filene i `paths`;
+    for et mønster skaleres den til alle filene. Uten metadata anslås radene fra størrelsen.
+    """
+    sample = paths[-1] if paths else Path(alias)
+    kind = sample.suffix.lower()
+    if is_compressed(sample):
+        try:
+            kind = inner_suffix(sample, member)
+        except (OSError, ValueError):
+            kind = '.csv'
+    size = sum(p.stat().st_size for p in paths if p.exists())
+
+    if isinstance(meta, FileMetadata):
+        file_rows = meta.rows_estimate * max(len(paths), 1)
+        columns = max(len(meta.columns), 1)
+        text_columns = sum(1 for c in (col_date, col_time) if c and c in meta.columns) or 1
+        rows = round(file_rows * _window_fraction(meta, start, end))
+    else:
+        file_rows = rows = size // LINE_BYTES
+        columns, text_columns = 3, 2
+
+    return AliasEstimate(alias, kind, file_rows, rows, columns, text_columns, size)
+
+
+# ==============================================================================
+#   PLAN
+# ==============================================================================
+
+@dataclass
+class MemoryPlan:
+    """
+    Valgt strategi for en kjøring.
+
+    Args:
+        strategy (str): En av STRATEGIES.
+        budget (int | None): Budsjettet i bytes (None = ingen grense).
+        peaks (dict): Anslått toppminne i bytes per strategi.
+        estimates (dict): {'alias': AliasEstimate}.
+    """
+    strategy: str
+    budget: int | None
+    peaks: dict[str, int] = field(default_factory=dict)
+    estimates: dict[str, AliasEstimate] = field(default_factory=dict)
+
+    @property
+    def level(self) -> int:
+        return STRATEGIES.index(self.strategy)
+
+    @property
+    def peak(self) -> int:
+        return self.peaks.get(self.strategy, 0)
+
+    @property
+    def fits(self) -> bool:
+        return self.budget is None or self.peak <= self.budget
+
+    @property
+    def value_dtype(self) -> str | None:
+        """'float32' når datakolonnene skal nedskaleres, ellers None (uendret)."""
+        return 'float32' if self.level >= STRATEGIES.index(STRATEGY_FLOAT32) else None
+
+    @property
+    def chunk_rows(self) -> int | None:
+        return CHUNK_ROWS if self.level >= STRATEGIES.index(STRATEGY_CHUNKED) else None
+
+    @property
+    def sequential(self) -> bool:
+        return self.strategy == STRATEGY_SEQUENTIAL
+
+
+def series_bytes(aliases: list[str], estimates: dict[str, AliasEstimate], value_bytes: int = 8) -> int:
+    """Én serie under beregning: sammenslått ramme (tid, aliasene, resultat, flagg) og én kopi."""
+    rows = max((estimates[a].rows for a in aliases if a in estimates), default=0)
+    return 2 * rows * (8 + (len(aliases) + 1) * value_bytes + 1)
+
+
+def estimate_peak(
+    strategy: str,
+    estimates: dict[str, AliasEstimate],
+    jobs: list[list[str]],
+    load_workers: int = 4,
+    max_in_flight: int = 6
+) -> int:
+    """
+    Anslått toppminne med en strategi. Parallelt: alle filene i minnet, de største
+    tolkingene samtidig (én per lastearbeider) og de største seriene samtidig.
+    Sekvensielt: den tyngste enkeltserien med sine egne filer.
+    """
+    level = STRATEGIES.index(strategy)
+    value_bytes = 4 if level >= STRATEGIES.index(STRATEGY_FLOAT32) else 8
+    chunk = CHUNK_ROWS if level >= STRATEGIES.index(STRATEGY_CHUNKED) else None
+
+    def largest(values, n):
+        return sum(sorted(values, reverse=True)[:n])
+
+    if strategy != STRATEGY_SEQUENTIAL:
+        loaded = sum(e.loaded(value_bytes) for e in estimates.values())
+        parsing = largest((e.parse_peak(chunk) for e in estimates.values()), load_workers)
+        series = largest((series_bytes(job, estimates, value_bytes) for job in jobs), max_in_flight)
+        return loaded + parsing + series
+
+    peak = 0
+    for job in jobs:
+        own = [estimates[a] for a in dict.fromkeys(job) if a in estimates]
+        peak = max(peak, sum(e.loaded(value_bytes) for e in own)
+                   + largest((e.parse_peak(chunk) for e in own), load_workers)
+                   + series_bytes(job, estimates, value_bytes))
+    return peak
+
+
+def plan_memory(
+    estimates: dict[str, AliasEstimate],
+    jobs: list[list[str]],
+    budget: int | None,
+    load_workers: int = 4,
+    max_in_flight: int = 6
+) -> MemoryPlan:
+    """
+    Velger den første strategien i STRATEGIES som holder seg innenfor budsjettet.
+    Holder ingen, velges den siste (sekvensiell), og planen sier fra med `fits`.
+
+    Args:
+        estimates (dict): {'alias': AliasEstimate} for filene kjøringen trenger.
+        jobs (list): Aliasene hver serie trenger.
+        budget (int | None): Minnebudsjett i bytes. None = ingen grense (alltid 'memory').
+    """
+    peaks = {s: estimate_peak(s, estimates, jobs, load_workers, max_in_flight) for s in STRATEGIES}
+    strategy = STRATEGIES[-1]
+    for candidate in STRATEGIES:
+        if budget is None or peaks[candidate] <= budget:
+            strategy = candidate
+            break
+    return MemoryPlan(strategy, budget, peaks, estimates)
+
+
+def log_plan(plan: MemoryPlan) -> None:
+    """Skriver valgt strategi og anslagene bak den til loggen."""
+    grense = f"budsjett {_mb(plan.budget)}" if plan.budget is not None else "ingen grense"
+    logger.info(f"Minneplan: '{plan.strategy}' (anslått topp {_mb(plan.peak)}, {grense}).")
+
+    detalj = logger.info if plan.strategy != STRATEGY_MEMORY else logger.debug
+    for e in plan.estimates.values():
+        rader = f"{e.rows:,}".replace(',', ' ')
+        detalj(f"  -> {e.alias}: ~{rader} rader, {e.columns} kolonner, {_mb(e.size)} på disk, "
+               f"{_mb(e.parse_peak())} ved tolking, {_mb(e.loaded())} i minnet.")
+    if plan.strategy != STRATEGY_MEMORY:
+        detalj("  -> Anslått topp per strategi: "
+               + ", ".join(f"{s}={_mb(p)}" for s, p in plan.peaks.items()))
+    if not plan.fits:
+        logger.warning(f"Anslått minnebruk ({_mb(plan.peak)}) er over budsjettet ({_mb(plan.budget)}) "
+                       f"selv med sekvensiell kjøring. Begrens tidsvinduet (--from/--to) "
+                       f"eller konverter filene med 'sensorplot ingest'.")
@@ -0,0 +1,320 @@
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+from sensorplot.interval import profile_times, segment_index
+from sensorplot.store import SeriesStore
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+PYRAMID_SUFFIX = '.pyr.npz'
+# Minste bøttebredde. Alle nivåer er BASE_BUCKET * 2**k, slik at bøttene på et
+# nivå alltid deler seg pent i to på nivået under.
+BASE_BUCKET = pd.Timedelta('1s')
+# Finest nivå har bøtter som er minst så mange ganger median-intervallet
+FIRST_LEVEL_FACTOR = 16
+# Vi bygger nivåer til det øverste har så få bøtter som dette
+TOP_LEVEL_BUCKETS = 256
+# Standard antall bøtter (≈ piksler i bredden) for en oversikt
+DEFAULT_BUDGET = 2000
+
+_FIELDS = ('index', 'min', 'max', 'sum', 'count')
+# Nøkkelen for hullene i .npz-filen ('{kanal}|gaps|gaps'). Eldre filer mangler den.
+_GAPS = 'gaps'
+
+
+@dataclass
+class PyramidLevel:
+    """
+    Ett nivå i pyramiden. Bare bøtter med data lagres, så hull i serien tar ikke plass.
+
+    Args:
+        bucket_ns (int): Bøttebredden i nanosekunder.
+        index (ndarray): Bøttenummer (tid // bucket_ns) for hver bøtte, stigende.
+        min, max, sum (ndarray): Aggregater per bøtte.
+        count (ndarray): Antall målinger per bøtte.
+    """
+    bucket_ns: int
+    index: np.ndarray
+    min: np.ndarray
+    max: np.ndarray
+    sum: np.ndarray
+    count: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def coarser(self) -> 'PyramidLevel':
+        """Slår sammen bøttene parvis til nivået over (dobbel bøttebredde)."""
+        parent = self.index >> 1
+        starts = _group_starts(parent)
+        return PyramidLevel(
+            bucket_ns=self.bucket_ns * 2,
+            index=parent[starts],
+            min=np.minimum.reduceat(self.min, starts),
+            max=np.maximum.reduceat(self.max, starts),
+            sum=np.add.reduceat(self.sum, starts),
+            count=np.add.reduceat(self.count, starts),
+        )
+
+    def slice(self, start=None, end=None) -> slice:
+        lo = 0 if start is None else int(np.searchsorted(self.index, _ns(start) // self.bucket_ns, side='left'))
+        hi = len(self.index) if end is None else int(np.searchsorted(self.index, _ns(end) // self.bucket_ns, side='right'))
+        return slice(lo, max(lo, hi))
+
+
+def _ns(ts) -> int:
+    return pd.Timestamp(ts).value
+
+
+def _group_starts(keys: np.ndarray) -> np.ndarray:
+    """Startposisjonen til hver gruppe av like, sorterte nøkler."""
+    if len(keys) == 0:
+        return np.empty(0, dtype=np.intp)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+
+
+# ==============================================================================
+#   PYRAMIDE
+# ==============================================================================
+
+class Pyramid:
+    """
+    Forhåndsaggregerte min/max/snitt/antall per tidsbøtte, på flere oppløsninger.
+
+    En oversikt over et tidsvindu hentes fra det fineste nivået som har plass
+    innenfor budsjettet (antall bøtter ≈ piksler). Tegningen blir da O(piksler)
+    i stedet for O(rader), uansett hvor lang serien er.
+
+    Hullene i serien (se IntervalProfile.gaps) lagres sammen med nivåene, slik at
+    oversikten og rådata fra samme serie brytes på de samme stedene.
+    """
+
+    def __init__(self, levels: list[PyramidLevel], gaps: np.ndarray | None = None):
+        self.levels = levels
+        self.gaps = np.empty((0, 2), dtype='datetime64[ns]') if gaps is None else gaps
+
+    @classmethod
+    def from_series(cls, times, values, base: pd.Timedelta | None = None) -> 'Pyramid':
+        """
+        Bygger pyramiden fra en tidssortert serie. NaN-verdier hoppes over.
+
+        Args:
+            times: Tidsstempler (datetime64 / Series), stigende.
+            values: Måleverdier med samme lengde.
+            base (Timedelta | None): Bøttebredden på fineste nivå. Velges ut fra
+                median-intervallet hvis den mangler.
+        """
+        t = np.asarray(times, dtype='datetime64[ns]').view('i8')
+        v = np.asarray(values, dtype='f8')
+        keep = ~np.isnan(v)
+        t, v = t[keep], v[keep]
+
+        bucket_ns = _first_bucket_ns(t) if base is None else max(1, pd.Timedelta(base).value)
+        index = t // bucket_ns
+        starts = _group_starts(index)
+        level = PyramidLevel(
+            bucket_ns=bucket_ns,
+            index=index[starts],
+            min=np.minimum.reduceat(v, starts) if len(v) else v,
+            max=np.maximum.reduceat(v, starts) if len(v) else v,
+            sum=np.add.reduceat(v, starts) if len(v) else v,
+            count=np.diff(np.r_[starts, len(v)]).astype('i8'),
+        )
+
+        levels = [level]
+        while len(levels[-1]) > TOP_LEVEL_BUCKETS:
+            levels.append(levels[-1].coarser())
+        return cls(levels, gaps=profile_times(t.view('datetime64[ns]')).gaps)
+
+    def level_for(self, start=None, end=None, budget: int = DEFAULT_BUDGET) -> PyramidLevel:
+        """Det fineste nivået med høyst `budget` bøtter i vinduet (ellers det groveste)."""
+        for level in self.levels:
+            rows = level.slice(start, end)
+            if rows.stop - rows.start <= budget:
+                return level
+        return self.levels[-1]
+
+    def window(self, start=None, end=None, budget: int = DEFAULT_BUDGET) -> pd.DataFrame:
+        """
+        Oversikt over [start, end] med høyst ca. `budget` bøtter.
+
+        Returns:
+            DataFrame med 'Datetime' (midt i bøtta), 'min', 'max', 'mean', 'count' og
+            'segment' (nummeret på den sammenhengende biten bøtta hører til).
+        """
+        level = self.level_for(start, end, budget)
+        rows = level.slice(start, end)
+        index = level.index[rows]
+        count = level.count[rows]
+        return pd.DataFrame({
+            'Datetime': pd.to_datetime(index * level.bucket_ns + level.bucket_ns // 2),
+            'min': level.min[rows],
+            'max': level.max[rows],
+            'mean': level.sum[rows] / count,
+            'count': count,
+            'segment': self._segments(level, index),
+        })
+
+    def _segments(self, level: PyramidLevel, index: np.ndarray) -> np.ndarray:
+        """
+        Segmentnummer per bøtte. Et hull bryter bare oversikten når det krysser en
+        bøttegrense; et hull inni én bøtte synes ikke på denne oppløsningen.
+        """
+        gap_buckets = self.gaps.view('i8') // level.bucket_ns
+        crossing = gap_buckets[gap_buckets[:, 0] < gap_buckets[:, 1], 1]
+        starts = np.searchsorted(index, crossing, side='left')
+        breaks = np.zeros(len(index), dtype=bool)
+        breaks[starts[(starts > 0) & (starts < len(index))]] = True
+        return np.cumsum(breaks)
+
+
+def _first_bucket_ns(t: np.ndarray) -> int:
+    """Minste BASE_BUCKET * 2**k som er minst FIRST_LEVEL_FACTOR median-intervaller."""
+    base = BASE_BUCKET.value
+    if len(t) < 2:
+        return base
+    step = float(np.median(np.diff(t)))
+    target = max(step * FIRST_LEVEL_FACTOR, base)
+    return base * 2 ** int(np.ceil(np.log2(target / base)))
+
+
+def overview(df: pd.DataFrame, column: str, start=None, end=None,
+             budget: int = DEFAULT_BUDGET, pyramid: Pyramid | None = None) -> pd.DataFrame | None:
+    """
+    Oversikt over én kolonne i et tidsvindu, eller None hvis rådataene får plass i budsjettet.
+    Uten start/end brukes tidsrommet til df. Antall rader i vinduet finnes med binærsøk, så kallet er billig når pyramiden finnes.
+    """
+    t = df['Datetime'].to_numpy()
+    lo = 0 if start is None else int(np.searchsorted(t, pd.Timestamp(start).to_datetime64(), side='left'))
+    hi = len(t) if end is None else int(np.searchsorted(t, pd.Timestamp(end).to_datetime64(), side='right'))
+    if hi - lo <= budget:
+        return None
+    # En ferdig pyramide kan dekke mer enn df (f.eks. et utsnitt), så vi avgrenser til df
+    start = t[lo] if start is None else start
+    end = t[hi - 1] if end is None else end
+    if pyramid is None:
+        pyramid = Pyramid.from_series(t, df[column].to_numpy())
+    return pyramid.window(start, end, budget)
+
+
+# ==============================================================================
+#   LAGRING (ved siden av .spb-lageret)
+# ==============================================================================
+
+def pyramid_path(store_path: str | Path) -> Path:
+    """'data/L1.spb' -> 'data/L1.pyr.npz'"""
+    store_path = Path(store_path)
+    return store_path.with_name(store_path.stem + PYRAMID_SUFFIX)
+
+
+def write_pyramids(path: str | Path, pyramids: dict[str, Pyramid]) -> Path:
+    """Lagrer pyramider for flere kanaler i én .npz-fil."""
+    path = Path(path)
+    arrays = {}
+    for channel, pyramid in pyramids.items():
+        for i, level in enumerate(pyramid.levels):
+            arrays[f"{channel}|{i}|bucket_ns"] = np.int64(level.bucket_ns)
+            for field in _FIELDS:
+                arrays[f"{channel}|{i}|{field}"] = getattr(level, field)
+        arrays[f"{channel}|{_GAPS}|gaps"] = pyramid.gaps.view('i8')
+
+    # Skriv via filhåndtak, ellers legger numpy til en ekstra '.npz'
+    with open(path, 'wb') as f:
+        np.savez(f, **arrays)
+    logger.info(f"Pyramide skrevet: {path} ({len(pyramids)} kanaler)")
+    return path
+
+
+def read_pyramids(path: str | Path) -> dict[str, Pyramid]:
+    """Leser pyramidene som write_pyramids skrev."""
+    levels: dict[str, dict[int, dict]] = {}
+    gaps: dict[str, np.ndarray] = {}
+    with np.load(path) as data:
+        for key in data.files:
+            channel, i, field = key.rsplit('|', 2)
+            if i == _GAPS:
+                gaps[channel] = data[key].view('datetime64[ns]').reshape(-1, 2)
+                continue
+            levels.setdefault(channel, {}).setdefault(int(i), {})[field] = data[key]
+
+    pyramids = {}
+    for channel, by_level in levels.items():
+        pyramids[channel] = Pyramid([
+            PyramidLevel(
+                bucket_ns=int(fields['bucket_ns']),
+                **{field: fields[field] for field in _FIELDS})
+            for _, fields in sorted(by_level.items())
+        ], gaps=gaps.get(channel))
+    return pyramids
+
+
+def build_store_pyramids(store_path: str | Path) -> Path:
+    """Bygger pyramider for alle kanalene i et .spb-lager og lagrer dem ved siden av."""
+    store = SeriesStore(store_path)
+    pyramids = {c: Pyramid.from_series(store.time, store.channel(c)) for c in store.channels}
+    return write_pyramids(pyramid_path(store_path), pyramids)
+
+
+def _sidecar_is_current(store_path: str | Path) -> bool:
+    """True hvis pyramidefilen finnes og ikke er eldre enn lageret."""
+    sidecar = pyramid_path(store_path)
+    return sidecar.exists() and sidecar.stat().st_mtime >= Path(store_path).stat().st_mtime
+
+
+def load_store_pyramid(store_path: str | Path, channel: str) -> Pyramid | None:
+    """
+    Den lagrede pyramiden for én kanal i et .spb-lager (se build_store_pyramids).
+    None hvis pyramidefilen mangler, er eldre enn lageret eller ikke har kanalen.
+    """
+    try:
+        if not _sidecar_is_current(store_path):
+            return None
+        return read_pyramids(pyramid_path(store_path)).get(channel)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Kunne ikke lese pyramiden for {store_path}: {e}")
+        return None
+
+
+def read_store_overview(store_path: str | Path, channel: str, start=None, end=None,
+                        budget: int = DEFAULT_BUDGET) -> pd.DataFrame:
+    """
+    Tidsvindu fra et .spb-lager, tilpasset budsjettet.
+
+    Får vinduet plass, leses rådataene (som 'min'='max'='mean'); ellers brukes
+    pyramiden ved siden av lageret. Mangler den eller er eldre enn lageret, bygges den.
+    """
+    store = SeriesStore(store_path)
+    data = store.channel(channel)
+    rows = store.window(start, end)
+    if rows.stop - rows.start <= budget:
+        values = data[rows]
+        times = store.time[rows]
+        index = segment_index(times[~np.isnan(values)])
+        return pd.DataFrame({
+            'Datetime': times, 'min': values, 'max': values,
+            'mean': values, 'count': (~np.isnan(values)).astype('i8'),
+            'segment': _segment_labels(index, np.isnan(values)),
+        })
+
+    if not _sidecar_is_current(store_path):
+        logger.info(f"Pyramide mangler eller er utdatert for {store_path}, bygger på nytt.")
+        build_store_pyramids(store_path)
+    return read_pyramids(pyramid_path(store_path))[channel].window(start, end, budget)
+
+
+def _segment_labels(index: np.ndarray, missing: np.ndarray) -> np.ndarray:
+    """Segmentnummer per rad fra en indeks over radene med verdi; manglende rader får forrige nummer."""
+    labels = np.repeat(np.arange(len(index)), np.diff(index, axis=1).ravel())
+    full = np.zeros(len(missing), dtype='i8')
+    full[~missing] = labels
+    # Rader uten verdi arver nummeret til nærmeste måling før (eller 0)
+    last = np.maximum.accumulate(np.where(~missing, np.arange(len(missing)), 0))
+    return full[last]
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+from pathlib import Path
+from typing import NamedTuple
+import pandas as pd
+
+from sensorplot.cache import JsonRegistry, cache_dir, file_version, mark_used, prune_cache
+from sensorplot.core import SensorResult
+from sensorplot.pipeline import SeriesJob
+from sensorplot.sources import expand_source, is_multi_source
+from sensorplot.store import STORE_SUFFIX, SeriesStore, write_store
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Økes når beregningen endres slik at gamle resultater ikke lenger er gyldige
+RUN_CACHE_VERSION = 1
+# Undermappe i cache-mappen for ferdig beregnede serier
+RESULT_CACHE_DIR = 'results'
+
+_runs = JsonRegistry('runs.json')
+
+
+def _hash(data) -> str:
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def source_fingerprint(path: str | Path) -> list[str]:
+    """
+    Fingeravtrykk og endringstidspunkt for en kilde (se cache.file_version).
+    For glob/mappe: ett per fil, så nye filer også gir ny nøkkel.
+    """
+    if is_multi_source(path):
+        return [f"{p.name}:{file_version(p)}" for p in expand_source(path)]
+    return [file_version(path)]
+
+
+# ==============================================================================
+#   NØKLER
+# ==============================================================================
+
+class SeriesKey(NamedTuple):
+    """
+    Nøkkel for én serie.
+
+    Args:
+        slot (str): Serien uten filenes innhold (formel, fil-oppsett, innstillinger).
+            Bestemmer cache-filen, så en ny versjon skriver over den forrige.
+        version (str): Også fingeravtrykket til filene. Må stemme for at resultatet gjenbrukes.
+    """
+    slot: str
+    version: str
+
+
+def series_key(job: SeriesJob, files: dict[str, dict], settings: dict) -> SeriesKey | None:
+    """
+    Nøkkel for én serie: formelen, fil-oppsettet for aliasene den bruker,
+    fingeravtrykket til filene og innstillingene som påvirker beregningen
+    (kolonner, rensing, tidsvindu, overlapp).
+
+    Returnerer None hvis en fil mangler; serien beregnes da på vanlig måte.
+    """
+    try:
+        fingerprints = {alias: source_fingerprint(files[alias]['path']) for alias in job.aliases}
+    except OSError:
+        return None
+    setup = [RUN_CACHE_VERSION, job.label, job.formula, {alias: files[alias] for alias in job.aliases}, settings]
+    return SeriesKey(slot=_hash(setup), version=_hash([setup, fingerprints]))
+
+
+def run_key(series_keys: list[SeriesKey | None], render: dict) -> str | None:
+    """Nøkkel for hele kjøringen: alle serienøklene pluss tittel, x-intervall og utfil."""
+    if not series_keys or None in series_keys:
+        return None
+    return _hash([RUN_CACHE_VERSION, series_keys, render])
+
+
+# ==============================================================================
+#   SERIERESULTATER
+# ==============================================================================
+
+def _result_path(key: SeriesKey) -> Path:
+    folder = cache_dir() / RESULT_CACHE_DIR
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / f"{key.slot}{STORE_SUFFIX}"
+
+
+def load_series_result(key: SeriesKey | None, label: str, panel: str | None = None) -> SensorResult | None:
+    """Henter en tidligere beregnet serie, eller None hvis den ikke finnes eller filene er endret siden."""
+    if key is None:
+        return None
+    path = _result_path(key)
+    if not path.exists():
+        return None
+    try:
+        store = SeriesStore(path)
+        if store.header.get('meta', {}).get('key') != key.version:
+            return None
+        mark_used(path)
+        return SensorResult(label=label, df=store.to_frame(), panel=panel)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Kunne ikke lese cachet resultat for '{label}': {e}")
+        return None
+
+
+def save_series_result(key: SeriesKey | None, result: SensorResult) -> None:
+    """Lagrer en beregnet serie som et lager (.spb) i cache-mappen, over forrige versjon av serien."""
+    if key is None:
+        return
+    path = _result_path(key)
+    tmp = path.with_name(path.name + '.tmp')
+    try:
+        write_store(tmp, result.df, meta={'label': result.label, 'key': key.version})
+        tmp.replace(path)
+    except (OSError, ValueError) as e:
+        logger.warning(f"Kunne ikke cache resultat for '{result.label}': {e}")
+    prune_cache(path.parent)
+
+
+# ==============================================================================
+#   UTFIL
+# ==============================================================================
+
+def output_is_current(output: str | Path | None, key: str | None) -> bool:
+    """
+    True hvis `output` ble skrevet av en kjøring med samme nøkkel, og ingen av
+    filene fra den kjøringen er endret eller slettet siden.
+    """
+    if output is None or key is None:
+        return False
+    entry = _runs.get(str(Path(output).resolve()))
+    if not entry or entry.get('key') != key:
+        return False
+    try:
+        return all(file_version(f) == fp for f, fp in entry.get('files', {}).items())
+    except OSError:
+        return False
+
+
+def remember_output(output: str | Path | None, key: str | None, files: list[Path] | None = None) -> None:
+    """
+    Husker at `output` nå tilsvarer kjøringen med nøkkelen `key`.
+    `files` er filene kjøringen skrev (standard: bare `output`, men --split skriver én per serie).
+    """
+    if output is None or key is None:
+        return
+    files = [Path(output)] if files is None else files
+    if not files or not all(f.exists() for f in files):
+        return
+    _runs.put(str(Path(output).resolve()), {
+        'key': key,
+        'files': {str(f.resolve()): file_version(f) for f in files},
+        'written': pd.Timestamp.now().isoformat(timespec='seconds'),
+    })
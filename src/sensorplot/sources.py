@@ -0,0 +1,155 @@
+import concurrent.futures
+import glob
+import hashlib
+import json
+import logging
+from pathlib import Path
+import pandas as pd
+
+from sensorplot.archive import COMPRESSED_SUFFIXES
+from sensorplot.cache import cache_dir, file_version, mark_used, prune_cache
+from sensorplot.core import last_og_rens_data
+from sensorplot.stitch import DEFAULT_OVERLAP, stitch_sorted
+from sensorplot.store import STORE_SUFFIX, SeriesStore, read_store, write_store
+from sensorplot.window import filtrer_tidsvindu
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Filtyper som tas med når en mappe brukes som kilde (også komprimerte, se sensorplot.archive)
+SOURCE_SUFFIXES = ('.csv', '.xlsx', STORE_SUFFIX, *COMPRESSED_SUFFIXES)
+GLOB_CHARS = '*?['
+DEFAULT_SOURCE_WORKERS = 4
+# Undermappe i cache-mappen for ferdig tolkede enkeltfiler
+FILE_CACHE_DIR = 'files'
+
+
+def is_multi_source(path: str | Path) -> bool:
+    """True hvis stien er et glob-mønster (f.eks. 'data/L1/*.csv') eller en mappe."""
+    text = str(path)
+    return any(c in text for c in GLOB_CHARS) or Path(text).is_dir()
+
+
+def expand_source(path: str | Path) -> list[Path]:
+    """
+    Gjør om et glob-mønster eller en mappe til en sortert liste med filer.
+    '**' i mønsteret søker i undermapper.
+    """
+    text = str(path)
+    if Path(text).is_dir():
+        files = [p for p in Path(text).iterdir() if p.is_file() and p.suffix.lower() in SOURCE_SUFFIXES]
+    else:
+        files = [Path(p) for p in glob.glob(text, recursive=True) if Path(p).is_file()]
+
+    # Lagrenes pyramidefiler (.pyr.npz) og andre følgefiler er ikke kilder
+    files = sorted(p for p in files if p.suffix.lower() in SOURCE_SUFFIXES)
+    if not files:
+        raise FileNotFoundError(f"Fant ingen filer for '{path}'")
+    return files
+
+
+def _cache_path(path: Path, col_date: str, col_time: str | None, col_data: str,
+                sheet, dialect: dict | None, member: str | None = None) -> Path:
+    """
+    Cache-fil for én tolket kildefil, nøklet på filens plassering og oppsettet. En ny
+    versjon av filen skriver over den gamle cache-filen (versjonen står i lagerets meta).
+    """
+    oppsett = [col_date, col_time, col_data, sheet, dialect]
+    if member is not None:
+        # Samme nøkkel som før for filer som ikke er arkiver
+        oppsett.append(member)
+    oppsett = json.dumps(oppsett, sort_keys=True, default=str)
+    key = hashlib.sha1(f"{Path(path).resolve()}|{oppsett}".encode()).hexdigest()
+    folder = cache_dir() / FILE_CACHE_DIR
+    folder.mkdir(parents=True, exist_ok=True)
+    return folder / f"{key}{STORE_SUFFIX}"
+
+
+def load_cached_file(
+    path: Path,
+    col_date: str,
+    col_time: str | None,
+    col_data: str,
+    sheet: str | int | None = None,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+    dialect: dict | None = None,
+    member: str | None = None,
+    chunk_rows: int | None = None
+) -> pd.DataFrame:
+    """
+    Laster én kildefil med kolonnene 'Datetime' og `col_data`.
+
+    Første gang tolkes hele filen og lagres som et lager (.spb) i cache-mappen.
+    Senere kjøringer leser lageret direkte (memory-mapped) så lenge filen er uendret.
+    """
+    if path.suffix.lower() == STORE_SUFFIX:
+        return read_store(path, channels=[col_data], start=start, end=end)
+
+    version = file_version(path)
+    cached = _cache_path(path, col_date, col_time, col_data, sheet, dialect, member)
+    if cached.exists():
+        try:
+            store = SeriesStore(cached)
+        except (OSError, ValueError):
+            store = None
+        if store is not None and store.header.get('meta', {}).get('version') == version:
+            logger.debug(f"  -> {path.name}: fra cache.")
+            mark_used(cached)
+            return store.to_frame([col_data], start, end)
+
+    logger.info(f"  -> Tolker {path.name}...")
+    df = last_og_rens_data(path, path.stem, col_date, col_time, col_data, sheet=sheet, dialect=dialect,
+                           member=member, chunk_rows=chunk_rows)
+    df.columns = ['Datetime', col_data]
+    try:
+        # Skriv til en midlertidig fil først, slik at en avbrutt skriving aldri ser ut som en gyldig cache
+        tmp = cached.with_name(cached.name + '.tmp')
+        write_store(tmp, df, meta={'source': str(path), 'version': version})
+        tmp.replace(cached)
+    except OSError as e:
+        logger.warning(f"Kunne ikke cache {path}: {e}")
+    prune_cache(cached.parent)
+    return filtrer_tidsvindu(df, start, end).reset_index(drop=True)
+
+
+def load_source(
+    source: str | Path,
+    alias: str,
+    col_date: str,
+    col_time: str | None,
+    col_data: str,
+    sheet: str | int | None = None,
+    start: pd.Timestamp | None = None,
+    end: pd.Timestamp | None = None,
+    dialect: dict | None = None,
+    overlap: str = DEFAULT_OVERLAP,
+    workers: int = DEFAULT_SOURCE_WORKERS,
+    member: str | None = None,
+    chunk_rows: int | None = None
+) -> pd.DataFrame:
+    """
+    Laster alle filene i et glob-mønster eller en mappe og syr dem sammen til én
+    sortert serie med kolonnene 'Datetime' og 'Alias.Kolonne'.
+
+    Filene lastes parallelt. Hver fil caches for seg, så bare nye eller endrede
+    filer tolkes på nytt ved neste kjøring.
+    """
+    files = expand_source(source)
+    logger.info(f"  -> {alias}: {len(files)} filer i '{source}'.")
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        pieces = list(executor.map(
+            lambda p: load_cached_file(p, col_date, col_time, col_data, sheet, start, end, dialect, member,
+                                       chunk_rows),
+            files))
+
+    df = stitch_sorted(pieces, on='Datetime', overlap=overlap)
+    if df.empty:
+        df = pd.DataFrame({'Datetime': pd.Series(dtype='datetime64[ns]'), col_data: pd.Series(dtype=float)})
+    df.columns = ['Datetime', f'{alias}.{col_data}']
+    return df
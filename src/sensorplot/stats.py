@@ -0,0 +1,140 @@
+import logging
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from sensorplot.core import SensorResult, gyldige_rader
+from sensorplot.interval import profile_times
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   KONFIGURASJON
+# ==============================================================================
+
+# Kortformer for --stats. Uker starter på mandag, måneder og år på den første.
+PERIODS = {'D': 'D', 'W': 'W-MON', 'M': 'MS', 'Y': 'YS'}
+PERCENTILES = (5, 50, 95)
+STATS_FORMATS = ('.csv', '.parquet')
+STATS_SUFFIX = '_stats.csv'
+
+
+def parse_period(value: str) -> str:
+    """'D', 'W', 'M', 'Y' eller en pandas-frekvens ('6h', '2W') -> regel for resample."""
+    text = str(value).strip()
+    rule = PERIODS.get(text.upper(), text)
+    try:
+        to_offset(rule)
+    except ValueError:
+        raise ValueError(f"Ugyldig periode {value!r}. Bruk {', '.join(PERIODS)} eller f.eks. '6h'.")
+    return rule
+
+
+def stats_columns(percentiles=PERCENTILES) -> list[str]:
+    return ['Serie', 'Periode', 'count', 'min', 'max', 'mean', *(f'p{q:g}' for q in percentiles), 'coverage']
+
+
+# ==============================================================================
+#   STATISTIKK PER PERIODE
+# ==============================================================================
+
+def _period_starts(first, last, rule: str) -> pd.DatetimeIndex:
+    """Starten på hver periode fra første til siste måling, med samme grenser som resample."""
+    edges = pd.Series(0, index=pd.DatetimeIndex([first, last]))
+    return edges.resample(rule, label='left', closed='left').count().index
+
+
+def series_stats(df: pd.DataFrame, rule: str, percentiles=PERCENTILES, kolonne: str = 'Resultat') -> pd.DataFrame:
+    """
+    Min/max/snitt/persentiler og dekning per periode for én serie. Flaggede målinger og NaN telles ikke.
+
+    Alt beregnes fra én sortering på (periode, verdi): min og max er første og siste
+    verdi i hver periode, og persentilene hentes med indeksregning (lineær interpolasjon
+    som np.percentile). Perioder uten målinger tas med, med dekning 0.
+
+    'coverage' er prosent av forventet antall målinger, ut fra medianintervallet til serien.
+    """
+    valid = gyldige_rader(df)
+    t = valid['Datetime'].to_numpy(dtype='datetime64[ns]')
+    v = valid[kolonne].to_numpy(dtype='f8')
+    keep = ~np.isnan(v)
+    t, v = t[keep], v[keep]
+    if len(t) == 0:
+        return pd.DataFrame(columns=stats_columns(percentiles)[1:])
+
+    starts = _period_starts(t[0], t[-1], rule)
+    ends = starts + to_offset(rule)
+    codes = np.searchsorted(starts.values, t, side='right') - 1
+
+    # Tidene er sortert, så kodene er det også; lexsort sorterer verdiene innen hver periode
+    ordered = v[np.lexsort((v, codes))]
+    count = np.bincount(codes, minlength=len(starts))
+    first = np.r_[0, np.cumsum(count)[:-1]]
+    has = count > 0
+
+    def pick(pos):
+        out = np.full(len(starts), np.nan)
+        out[has] = ordered[pos[has]]
+        return out
+
+    stats = {
+        'Periode': starts,
+        'count': count,
+        'min': pick(first),
+        'max': pick(first + count - 1),
+        'mean': np.bincount(codes, weights=v, minlength=len(starts)) / np.where(has, count, np.nan),
+    }
+    for q in percentiles:
+        pos = first + q / 100 * np.maximum(count - 1, 0)
+        lo, hi = np.floor(pos).astype('i8'), np.ceil(pos).astype('i8')
+        stats[f'p{q:g}'] = pick(lo) + (pick(hi) - pick(lo)) * (pos - lo)
+
+    median = profile_times(t).median
+    if median is None:
+        stats['coverage'] = np.where(has, 100.0, 0.0)
+    else:
+        expected = (ends - starts).to_numpy() / median.to_timedelta64()
+        stats['coverage'] = np.minimum(100.0, 100.0 * count / expected)
+    return pd.DataFrame(stats)
+
+
+def compute_stats(results: list[SensorResult], period: str, percentiles=PERCENTILES) -> pd.DataFrame:
+    """Statistikk per periode for alle seriene, i én tabell med seriens navn i 'Serie'."""
+    rule = parse_period(period)
+    frames = []
+    for res in results:
+        stats = series_stats(res.df, rule, percentiles)
+        stats.insert(0, 'Serie', res.label)
+        frames.append(stats)
+    if not frames:
+        return pd.DataFrame(columns=stats_columns(percentiles))
+    return pd.concat(frames, ignore_index=True)
+
+
+# ==============================================================================
+#   LAGRING
+# ==============================================================================
+
+def stats_path(output_file: str | Path | None) -> Path:
+    """Standard filnavn ved siden av plottet: 'plott.png' -> 'plott_stats.csv'."""
+    if not output_file:
+        return Path('sensorplot' + STATS_SUFFIX)
+    output_file = Path(output_file)
+    return output_file.with_name(output_file.stem + STATS_SUFFIX)
+
+
+def write_stats(stats: pd.DataFrame, path: str | Path) -> Path:
+    """Skriver tabellen som CSV eller Parquet, ut fra endelsen."""
+    path = Path(path)
+    suffix = path.suffix.lower()
+    if suffix not in STATS_FORMATS:
+        raise ValueError(f"Ukjent format for statistikk: '{path.suffix}'. Bruk {' eller '.join(STATS_FORMATS)}.")
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if suffix == '.parquet':
+        stats.to_parquet(path, index=False)
+    else:
+        stats.to_csv(path, index=False)
+    logger.info(f"Statistikk skrevet: {path} ({len(stats)} rader)")
+    return path
@@ -0,0 +1,176 @@
+import logging
+import numpy as np
+import pandas as pd
+
+from sensorplot.core import FLAG_COLUMN, SensorResult
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# Gyldige regler for overlappende tidsrom
+OVERLAP_NEWEST = 'newest'
+OVERLAP_AVERAGE = 'average'
+OVERLAP_DROP_DUPLICATES = 'drop_duplicates'
+OVERLAP_POLICIES = (OVERLAP_NEWEST, OVERLAP_AVERAGE, OVERLAP_DROP_DUPLICATES)
+DEFAULT_OVERLAP = OVERLAP_NEWEST
+
+
+def _merge_order(times: list[np.ndarray]) -> np.ndarray:
+    """
+    Finner rekkefølgen som fletter k sorterte tidsarrayer til ett sortert array.
+
+    Flettingen gjøres parvis i runder (turneringsfletting), der hvert par flettes
+    lineært med `searchsorted`. Returnerer indekser inn i de sammenkjedede arrayene.
+    Ved like tidspunkter beholdes rekkefølgen fra input (stabil fletting).
+    """
+    runs = []
+    offset = 0
+    for t in times:
+        runs.append((t, np.arange(offset, offset + len(t))))
+        offset += len(t)
+
+    while len(runs) > 1:
+        merged_runs = []
+        for i in range(0, len(runs) - 1, 2):
+            (ta, ia), (tb, ib) = runs[i], runs[i + 1]
+            # Posisjonen til hvert element fra b i det flettede arrayet
+            pos_b = np.searchsorted(ta, tb, side='right') + np.arange(len(tb))
+            fra_b = np.zeros(len(ta) + len(tb), dtype=bool)
+            fra_b[pos_b] = True
+
+            t_ut = np.empty(len(fra_b), dtype=ta.dtype)
+            i_ut = np.empty(len(fra_b), dtype=np.intp)
+            t_ut[fra_b], t_ut[~fra_b] = tb, ta
+            i_ut[fra_b], i_ut[~fra_b] = ib, ia
+            merged_runs.append((t_ut, i_ut))
+        if len(runs) % 2:
+            merged_runs.append(runs[-1])
+        runs = merged_runs
+
+    return runs[0][1]
+
+
+def _prefer_newest(pieces: list[pd.DataFrame], on: str) -> pd.DataFrame:
+    """
+    Klipper ut overlapp slik at stykket som starter senest vinner i sitt tidsrom.
+    Stykkene må være sortert etter starttid.
+    """
+    result = pieces[0]
+    for piece in pieces[1:]:
+        t = result[on].to_numpy()
+        start, end = piece[on].iloc[0], piece[on].iloc[-1]
+        lo = np.searchsorted(t, start.to_datetime64(), side='left')
+        hi = np.searchsorted(t, end.to_datetime64(), side='right')
+        result = pd.concat([result.iloc[:lo], piece, result.iloc[hi:]], ignore_index=True)
+    return result
+
+
+def _average_duplicates(df: pd.DataFrame, on: str) -> pd.DataFrame:
+    """
+    Slår sammen rader med likt tidspunkt til gjennomsnittet (df må være sortert).
+    Kvalitetsflagg slås sammen med bitvis eller: er én av radene tvilsom, er snittet det også.
+    """
+    t = df[on].to_numpy()
+    is_start = np.empty(len(t), dtype=bool)
+    is_start[:1] = True
+    is_start[1:] = t[1:] != t[:-1]
+    if is_start.all():
+        return df
+
+    starts = np.flatnonzero(is_start)
+    out = {on: t[starts]}
+    for col in df.columns:
+        if col == on:
+            continue
+        if col == FLAG_COLUMN:
+            out[col] = np.bitwise_or.reduceat(df[col].to_numpy().astype(np.uint8), starts)
+            continue
+        values = df[col].to_numpy(dtype=float, na_value=np.nan)
+        gyldig = ~np.isnan(values)
+        summer = np.add.reduceat(np.where(gyldig, values, 0.0), starts)
+        antall = np.add.reduceat(gyldig.astype(np.int64), starts)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            out[col] = np.where(antall > 0, summer / np.maximum(antall, 1), np.nan)
+    return pd.DataFrame(out)
+
+
+def stitch_sorted(
+    pieces: list[pd.DataFrame],
+    on: str = 'Datetime',
+    overlap: str = DEFAULT_OVERLAP
+) -> pd.DataFrame:
+    """
+    Syr sammen flere tidssortert DataFrames til én sortert tidsserie.
+
+    Stykker som ikke overlapper i tid legges bare etter hverandre. Overlappende
+    stykker flettes lineært (k-veis fletting) og håndteres etter `overlap`:
+        - 'newest': Stykket som starter senest vinner i sitt eget tidsrom.
+        - 'average': Rader med likt tidspunkt slås sammen til gjennomsnittet.
+        - 'drop_duplicates': Første rad per tidspunkt beholdes, resten fjernes.
+    """
+    if overlap not in OVERLAP_POLICIES:
+        raise ValueError(f"Ukjent overlapp-regel '{overlap}'. Gyldige: {', '.join(OVERLAP_POLICIES)}")
+
+    pieces = [p for p in pieces if not p.empty]
+    if not pieces:
+        return pd.DataFrame(columns=[on])
+    if len(pieces) == 1:
+        return pieces[0]
+
+    sorted_pieces = []
+    for p in pieces:
+        if not p[on].is_monotonic_increasing:
+            logger.debug("Stykke er ikke tidssortert, sorterer før sammensying.")
+            p = p.sort_values(on, kind='mergesort')
+        sorted_pieces.append(p)
+
+    # Sorter stykkene etter (start, slutt). Stabil, så input-rekkefølgen avgjør likhet.
+    sorted_pieces.sort(key=lambda p: (p[on].iloc[0], p[on].iloc[-1]))
+
+    starts = np.array([p[on].iloc[0].to_datetime64() for p in sorted_pieces])
+    ends = np.array([p[on].iloc[-1].to_datetime64() for p in sorted_pieces])
+    overlapper = starts[1:] <= np.maximum.accumulate(ends)[:-1]
+
+    if not overlapper.any():
+        return pd.concat(sorted_pieces, ignore_index=True)
+
+    logger.info(f"  -> Overlappende tidsrom funnet, bruker regel '{overlap}'.")
+
+    if overlap == OVERLAP_NEWEST:
+        return _prefer_newest(sorted_pieces, on)
+
+    order = _merge_order([p[on].to_numpy() for p in sorted_pieces])
+    merged = pd.concat(sorted_pieces, ignore_index=True).take(order).reset_index(drop=True)
+
+    if overlap == OVERLAP_DROP_DUPLICATES:
+        t = merged[on].to_numpy()
+        keep = np.empty(len(t), dtype=bool)
+        keep[:1] = True
+        keep[1:] = t[1:] != t[:-1]
+        return merged[keep].reset_index(drop=True)
+
+    return _average_duplicates(merged, on)
+
+
+def consolidate_results(
+    raw_results: list[SensorResult],
+    overlap: str = DEFAULT_OVERLAP
+) -> list[SensorResult]:
+    """Slår sammen delresultater med samme serienavn til én tidslinje per serie."""
+    consolidated: dict[str, list[pd.DataFrame]] = {}
+    panels: dict[str, str | None] = {}
+    for res in raw_results:
+        consolidated.setdefault(res.label, []).append(res.df)
+        # Første del som har et panel bestemmer panelet for hele serien
+        if panels.get(res.label) is None:
+            panels[res.label] = res.panel
+
+    final_results = []
+    for label, dfs in consolidated.items():
+        if len(dfs) == 1:
+            final_results.append(SensorResult(label=label, df=dfs[0], panel=panels[label]))
+        else:
+            logger.info(f"  -> Slår sammen {len(dfs)} deler for '{label}'.")
+            final_results.append(SensorResult(label=label, df=stitch_sorted(dfs, overlap=overlap),
+                                              panel=panels[label]))
+    return final_results
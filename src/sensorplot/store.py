@@ -0,0 +1,173 @@
+import json
+import logging
+from pathlib import Path
+import numpy as np
+import pandas as pd
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# ==============================================================================
+#   FILFORMAT
+# ==============================================================================
+#
+#   [ MAGIC (8 bytes) | header-lengde (uint32, little endian) | JSON-header ]
+#   [ fyll til PAGE_SIZE                                                    ]
+#   [ tid: int64 nanosekunder siden epoch, 'rows' elementer                 ]
+#   [ fyll til PAGE_SIZE | kanal 1: float64 | fyll | kanal 2: float64 | ... ]
+#
+#   Alle arrayer starter på en sidegrense, slik at numpy.memmap kan peke rett
+#   inn i filen og et tidsvindu bare berører sidene det trenger.
+
+STORE_SUFFIX = '.spb'
+STORE_MAGIC = b'SPLTSTR1'
+STORE_VERSION = 1
+PAGE_SIZE = 4096
+
+_TIME_DTYPE = np.dtype('<i8')
+_CHANNEL_DTYPE = np.dtype('<f8')
+
+
+def _align(offset: int) -> int:
+    return -(-offset // PAGE_SIZE) * PAGE_SIZE
+
+
+def write_store(path: str | Path, df: pd.DataFrame, meta: dict | None = None) -> Path:
+    """
+    Skriver en DataFrame med 'Datetime' og numeriske kanaler til et lager (.spb).
+
+    Args:
+        path (str | Path): Filen som skal skrives.
+        df (DataFrame): Må ha kolonnen 'Datetime'. Alle andre kolonner lagres som float64-kanaler.
+        meta (dict | None): Valgfri metadata (f.eks. kildefil og alias) som lagres i headeren.
+    """
+    path = Path(path)
+    if 'Datetime' not in df.columns:
+        raise ValueError("Lageret krever en 'Datetime'-kolonne.")
+
+    if not df['Datetime'].is_monotonic_increasing:
+        df = df.sort_values('Datetime', kind='mergesort')
+
+    channels = [str(c) for c in df.columns if c != 'Datetime']
+    rows = len(df)
+    time_values = df['Datetime'].to_numpy(dtype='datetime64[ns]').view(_TIME_DTYPE)
+
+    header = {
+        'version': STORE_VERSION,
+        'rows': rows,
+        'channels': channels,
+        'meta': meta or {},
+    }
+
+    # Offsetene avhenger av hvor stor headeren er, så vi øker til alt får plass
+    data_start = PAGE_SIZE
+    while True:
+        offsets = {'Datetime': data_start}
+        offset = _align(data_start + rows * _TIME_DTYPE.itemsize)
+        for c in channels:
+            offsets[c] = offset
+            offset = _align(offset + rows * _CHANNEL_DTYPE.itemsize)
+        header['offsets'] = offsets
+        header_bytes = json.dumps(header, ensure_ascii=False).encode('utf-8')
+        if len(STORE_MAGIC) + 4 + len(header_bytes) <= data_start:
+            break
+        data_start = _align(len(STORE_MAGIC) + 4 + len(header_bytes) + 1)
+
+    with open(path, 'wb') as f:
+        f.write(STORE_MAGIC)
+        f.write(np.uint32(len(header_bytes)).astype('<u4').tobytes())
+        f.write(header_bytes)
+
+        f.seek(offsets['Datetime'])
+        time_values.astype(_TIME_DTYPE, copy=False).tofile(f)
+        for c in channels:
+            f.seek(offsets[c])
+            df[c].to_numpy(dtype=_CHANNEL_DTYPE, na_value=np.nan).tofile(f)
+
+        # Sørg for at filen er lang nok selv om siste array er tomt
+        f.truncate(max(offset, data_start))
+
+    logger.info(f"Lager skrevet: {path} ({rows} rader, kanaler: {', '.join(channels)})")
+    return path
+
+
+def read_header(path: str | Path) -> dict:
+    """Leser bare headeren fra et lager."""
+    path = Path(path)
+    with open(path, 'rb') as f:
+        magic = f.read(len(STORE_MAGIC))
+        if magic != STORE_MAGIC:
+            raise ValueError(f"{path} er ikke et sensorplot-lager.")
+        length = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+        header = json.loads(f.read(length).decode('utf-8'))
+
+    if header.get('version') != STORE_VERSION:
+        raise ValueError(f"Ukjent lagerversjon {header.get('version')} i {path}.")
+    return header
+
+
+class SeriesStore:
+    """
+    Et åpent lager der tid og kanaler er memory-mappede arrayer.
+    Ingenting leses fra disk før arrayene faktisk brukes.
+    """
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.header = read_header(self.path)
+        self.rows = self.header['rows']
+        self.channels = self.header['channels']
+        self._maps: dict[str, np.ndarray] = {}
+
+    def _map(self, name: str, dtype: np.dtype) -> np.ndarray:
+        if name not in self._maps:
+            if self.rows == 0:
+                self._maps[name] = np.empty(0, dtype=dtype)
+            else:
+                self._maps[name] = np.memmap(
+                    self.path, dtype=dtype, mode='r',
+                    offset=self.header['offsets'][name], shape=(self.rows,))
+        return self._maps[name]
+
+    @property
+    def time(self) -> np.ndarray:
+        """Tidsarrayet som datetime64[ns] (visning av memmap, ingen kopi)."""
+        return self._map('Datetime', _TIME_DTYPE).view('datetime64[ns]')
+
+    def channel(self, name: str) -> np.ndarray:
+        if name not in self.channels:
+            raise ValueError(
+                f"Fant ikke datakolonnen '{name}' i {self.path}. Tilgjengelige: {self.channels}")
+        return self._map(name, _CHANNEL_DTYPE)
+
+    def window(self, start=None, end=None) -> slice:
+        """
+        Finner radene innenfor [start, end] med binærsøk i tidsarrayet.
+        Binærsøket berører bare O(log n) sider av filen.
+        """
+        t = self.time
+        lo = 0 if start is None else int(np.searchsorted(t, pd.Timestamp(start).to_datetime64(), side='left'))
+        hi = len(t) if end is None else int(np.searchsorted(t, pd.Timestamp(end).to_datetime64(), side='right'))
+        return slice(lo, max(lo, hi))
+
+    def to_frame(self, channels: list[str] | None = None, start=None, end=None) -> pd.DataFrame:
+        """Lager en DataFrame som peker rett inn i lageret (ingen kopi av dataene)."""
+        channels = self.channels if channels is None else channels
+        rows = self.window(start, end)
+        data = {'Datetime': self.time[rows]}
+        for c in channels:
+            data[c] = self.channel(c)[rows]
+        return pd.DataFrame(data, copy=False)
+
+
+def read_store(
+    path: str | Path,
+    channels: list[str] | None = None,
+    start=None,
+    end=None
+) -> pd.DataFrame:
+    """
+    Laster et lager som DataFrame med 'Datetime' og valgte kanaler.
+    Med start/end leses bare radene i tidsvinduet.
+    """
+    return SeriesStore(path).to_frame(channels, start, end)
@@ -0,0 +1,256 @@
+import datetime as dt
+import io
+import logging
+import os
+import re
+from typing import BinaryIO
+import pandas as pd
+
+# Opprett logger for denne modulen
+logger = logging.getLogger(__name__)
+
+# Når søkeområdet er mindre enn dette, leser vi resten og lar pandas filtrere
+SEARCH_BLOCK = 64 * 1024
+# Antall jevnt fordelte stikkprøver for å sjekke at filen er tidssortert
+SORT_SAMPLES = 16
+# Hvor mange linjer vi prøver før vi gir opp å finne en tolkbar tidsstempel-linje
+MAX_SKIP_LINES = 20
+# Norsk datoformat (dd.mm.yyyy, valgfritt med HH:MM[:SS]). Tolkes alltid med dagen først.
+_NORSK_DATO = re.compile(r'(\d{1,2})\.(\d{1,2})\.(\d{4})(?:[ T](\d{1,2}):(\d{2})(?::(\d{2}))?)?')
+
+
+def tolk_tidsgrense(verdi, slutt: bool = False) -> pd.Timestamp | None:
+    """
+    Tolker en start- eller sluttgrense fra CLI, YAML eller GUI.
+
+    ISO-datoer (2024-03-01) og norske datoer (01.03.2024 = 1. mars) godtas.
+    En ren dato (uten klokkeslett) som sluttgrense betyr hele dagen,
+    slik at '--to 2024-01-31' tar med alt fram til 31.01.2024 23:59:59.
+    """
+    if verdi is None or verdi == '':
+        return None
+
+    bare_dato = isinstance(verdi, dt.date) and not isinstance(verdi, dt.datetime)
+    if isinstance(verdi, str):
+        ts, bare_dato = _tolk_tekst(verdi.strip())
+    else:
+        ts = pd.Timestamp(verdi)
+
+    if slutt and bare_dato:
+        ts = ts + pd.Timedelta(days=1) - pd.Timedelta(1, unit='ns')
+    return ts
+
+
+def _tolk_tekst(tekst: str) -> tuple[pd.Timestamp, bool]:
+    """
+    Tolker en tidsgrense gitt som tekst. Returnerer (tid, om det var en ren dato).
+    pd.Timestamp leser '01.03.2024' som 3. januar, så punktum-datoer tolkes her med dagen først.
+    """
+    treff = _NORSK_DATO.fullmatch(tekst)
+    if treff:
+        dag, mnd, aar, time, minutt, sekund = (int(g) if g else 0 for g in treff.groups())
+        try:
+            return pd.Timestamp(aar, mnd, dag, time, minutt, sekund), treff.group(4) is None
+        except ValueError:
+            raise ValueError(f"Ugyldig dato '{tekst}' (forventet dd.mm.åååå).") from None
+
+    if re.match(r'\d{1,2}\.\d{1,2}\.', tekst):
+        raise ValueError(
+            f"Kan ikke tolke '{tekst}'. Bruk dd.mm.åååå [tt:mm[:ss]] eller åååå-mm-dd [tt:mm[:ss]].")
+    return pd.Timestamp(tekst), len(tekst) <= 10
+
+
+def filtrer_tidsvindu(df: pd.DataFrame, start=None, end=None) -> pd.DataFrame:
+    """Beholder bare radene der 'Datetime' ligger innenfor [start, end]."""
+    if start is None and end is None:
+        return df
+    mask = pd.Series(True, index=df.index)
+    if start is not None:
+        mask &= df['Datetime'] >= start
+    if end is not None:
+        mask &= df['Datetime'] <= end
+    return df[mask]
+
+
+class _LinjeTid:
+    """Leser tidsstempelet fra enkeltlinjer i en CSV-fil åpnet i binærmodus."""
+
+    def __init__(self, f: BinaryIO, encoding: str, sep: str, i_date: int,
+                 i_time: int | None, day_first: bool, data_start: int, size: int,
+                 date_format: str | None = None):
+        self.f = f
+        self.encoding = encoding
+        self.sep = sep
+        self.i_date = i_date
+        self.i_time = i_time
+        self.day_first = day_first
+        self.data_start = data_start
+        self.size = size
+        self.date_format = date_format
+
+    def _tolk(self, line: bytes) -> pd.Timestamp | None:
+        felt = line.decode(self.encoding, errors='replace').rstrip('\r\n').split(self.sep)
+        try:
+            tekst = felt[self.i_date].strip().strip('"')
+            if self.i_time is not None:
+                tekst += ' ' + felt[self.i_time].strip().strip('"')
+            if self.date_format:
+                return pd.to_datetime(tekst, format=self.date_format)
+            return pd.to_datetime(tekst, dayfirst=self.day_first)
+        except (IndexError, ValueError):
+            return None
+
+    def neste(self, offset: int) -> tuple[int, pd.Timestamp | None]:
+        """
+        Finner første hele linje som starter på eller etter `offset` og har et
+        tolkbart tidsstempel. Returnerer (linjestart, tid), eller (size, None) ved slutten.
+        """
+        self.f.seek(offset)
+        if offset > self.data_start:
+            # Vi havnet midt i en linje, hopp til starten av neste
+            self.f.seek(offset - 1)
+            self.f.readline()
+
+        for _ in range(MAX_SKIP_LINES):
+            pos = self.f.tell()
+            line = self.f.readline()
+            if not line:
+                return self.size, None
+            ts = self._tolk(line)
+            if ts is not None:
+                return pos, ts
+        return self.f.tell(), None
+
+    def siste(self) -> pd.Timestamp | None:
+        """Tidsstempelet på den siste tolkbare linjen i filen."""
+        offset = max(self.data_start, self.size - 4096)
+        siste_ts = None
+        pos = offset
+        while pos < self.size:
+            pos, ts = self.neste(pos)
+            if ts is None:
+                break
+            siste_ts = ts
+            pos = self.f.tell()
+        return siste_ts
+
+
+def _er_sortert(linjer: _LinjeTid) -> bool:
+    """Stikkprøver jevnt fordelte linjer (pluss første og siste) og sjekker at tiden ikke går bakover."""
+    spenn = linjer.size - linjer.data_start
+    punkter = [linjer.data_start + (spenn * i) // SORT_SAMPLES for i in range(SORT_SAMPLES)]
+    tider = [ts for _, ts in (linjer.neste(p) for p in punkter) if ts is not None]
+    siste = linjer.siste()
+    if siste is not None:
+        tider.append(siste)
+    return len(tider) >= 2 and all(a <= b for a, b in zip(tider, tider[1:]))
+
+
+def csv_byte_vindu(
+    path: str | os.PathLike,
+    encoding: str,
+    header_row: int,
+    sep: str,
+    col_date: str,
+    col_time: str | None,
+    day_first: bool,
+    start: pd.Timestamp | None,
+    end: pd.Timestamp | None,
+    date_format: str | None = None
+) -> tuple[bytes, int, int] | None:
+    """
+    Finner byte-området i en tidssortert CSV-fil som dekker tidsvinduet [start, end].
+
+    Bruker binærsøk på byte-offset (seek + les én linje), slik at bare O(log n) linjer
+    må tolkes for å finne vinduet. Området kan inneholde noen få linjer utenfor
+    vinduet i hver ende; de fjernes av filtreringen etter innlesing.
+
+    Returns:
+        (headerlinje, fra_byte, til_byte), eller None hvis filen ikke er sortert eller
+        kolonnene ikke kan finnes. Da må kalleren lese hele filen.
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        for _ in range(header_row):
+            f.readline()
+        header_line = f.readline()
+        data_start = f.tell()
+
+        kolonner = [c.strip().strip('"') for c in header_line.decode(encoding).rstrip('\r\n').split(sep)]
+        if col_date not in kolonner:
+            return None
+        i_date = kolonner.index(col_date)
+        i_time = kolonner.index(col_time) if col_time and col_time in kolonner else None
+
+        linjer = _LinjeTid(f, encoding, sep, i_date, i_time, day_first, data_start, size, date_format)
+        if not _er_sortert(linjer):
+            logger.info(f"  -> {path} er ikke tidssortert, leser hele filen før tidsfilter.")
+            return None
+
+        # Nedre grense: en linjestart der alle linjer foran har tid < start
+        fra = data_start
+        if start is not None:
+            lo, hi = data_start, size
+            while hi - lo > SEARCH_BLOCK:
+                mid = (lo + hi) // 2
+                pos, ts = linjer.neste(mid)
+                if ts is not None and ts < start:
+                    fra = lo = pos
+                else:
+                    hi = mid
+
+        # Øvre grense: en linjestart der alle linjer fra og med har tid > end
+        til = size
+        if end is not None:
+            lo, hi = fra, size
+            while hi - lo > SEARCH_BLOCK:
+                mid = (lo + hi) // 2
+                pos, ts = linjer.neste(mid)
+                if ts is not None and ts <= end:
+                    lo = pos + 1
+                else:
+                    if ts is not None:
+                        til = min(til, pos)
+                    hi = mid
+
+    return header_line, fra, til
+
+
+def csv_tidsspenn(
+    path: str | os.PathLike,
+    encoding: str,
+    header_row: int,
+    sep: str,
+    col_date: str,
+    col_time: str | None,
+    day_first: bool,
+    date_format: str | None = None,
+    head: bytes | None = None
+) -> tuple[list[str], pd.Timestamp | None, pd.Timestamp | None, int]:
+    """
+    Leser bare headeren, første og siste datalinje i en CSV-fil.
+    Med `head` (starten av en komprimert fil, som ikke kan leses bakfra) brukes bare
+    de bytene, og siste tid er None.
+
+    Returns:
+        (kolonner, første tid, siste tid, byte-offset der dataene starter).
+        Tidene er None hvis datokolonnen mangler eller ikke kan tolkes.
+    """
+    size = os.path.getsize(path) if head is None else len(head)
+    with open(path, 'rb') if head is None else io.BytesIO(head) as f:
+        for _ in range(header_row):
+            f.readline()
+        header_line = f.readline()
+        data_start = f.tell()
+
+        kolonner = [c.strip().strip('"') for c in header_line.decode(encoding).rstrip('\r\n').split(sep)]
+        if col_date not in kolonner:
+            return kolonner, None, None, data_start
+        i_date = kolonner.index(col_date)
+        i_time = kolonner.index(col_time) if col_time and col_time in kolonner else None
+
+        linjer = _LinjeTid(f, encoding, sep, i_date, i_time, day_first, data_start, size, date_format)
+        _, foerste = linjer.neste(data_start)
+        siste = linjer.siste() if head is None else None
+
+    return kolonner, foerste, siste, data_start
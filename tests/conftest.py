@@ -0,0 +1,7 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def egen_cache_mappe(tmp_path, monkeypatch):
+    """Hver test får sin egen cache-mappe, så registre ikke lekker mellom tester eller til ~/.cache."""
+    monkeypatch.setenv('SENSORPLOT_CACHE_DIR', str(tmp_path / 'cache'))
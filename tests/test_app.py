@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+from sensorplot.app import add_plotly_series, to_epoch_ms
+from sensorplot.core import SensorResult
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_resultat(rader):
+    return SensorResult(label='Serie', df=pd.DataFrame({
+        'Datetime': pd.date_range('2024-01-01', periods=rader, freq='s'),
+        'Resultat': np.arange(rader, dtype=float),
+    }))
+
+# ==============================================================================
+#   TEST AV PLOTLY-SPOR
+# ==============================================================================
+
+def test_epoch_ms():
+    """Tidsstempler skal bli millisekunder siden epoch."""
+    ms = to_epoch_ms(pd.Series(pd.to_datetime(['1970-01-01 00:00:01', '2024-01-01 00:00:00'])))
+    assert ms.tolist() == [1000.0, 1704067200000.0]
+
+def test_webgl_over_terskel():
+    """Spor over terskelen skal bli Scattergl, mindre spor vanlig Scatter."""
+    fig = go.Figure()
+    stor = add_plotly_series(fig, lag_resultat(5000), '#636EFA', budget=10_000, webgl_threshold=1000)
+    liten = add_plotly_series(fig, lag_resultat(500), '#636EFA', budget=10_000, webgl_threshold=1000)
+
+    assert stor and not liten
+    assert [t.type for t in fig.data] == ['scattergl', 'scatter']
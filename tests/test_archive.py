@@ -0,0 +1,107 @@
+import gzip
+import io
+import zipfile
+import pytest
+import pandas as pd
+from sensorplot.archive import read_head, select_member
+from sensorplot.core import last_og_rens_data
+from sensorplot.metadata import inspect_file
+from sensorplot.sources import load_source
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_csv_bytes(start='2024-01-01', timer=48) -> bytes:
+    """En loggerfil med to linjer før headeren, semikolon og desimalkomma."""
+    tider = pd.date_range(start=start, periods=timer, freq='h')
+    linjer = ["Logger: L1", "Serienr: 123", "Date;Time;LEVEL"] + [
+        f"{t:%d.%m.%Y};{t:%H:%M:%S};{i},5" for i, t in enumerate(tider)
+    ]
+    return ("\n".join(linjer) + "\n").encode('utf-8')
+
+def lag_zip(sti, medlemmer: dict) -> str:
+    with zipfile.ZipFile(sti, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for navn, innhold in medlemmer.items():
+            zf.writestr(navn, innhold)
+    return str(sti)
+
+# ==============================================================================
+#   TEST AV MEDLEMSVALG
+# ==============================================================================
+
+def test_velg_medlem():
+    """Fullt navn eller et mønster som treffer ett medlem; uten navn må det være én datafil."""
+    navn = ['2024/', '2024/L1.csv', '2024/L2.csv', 'les_meg.txt']
+
+    assert select_member(navn, '2024/L2.csv', 'felt.zip') == '2024/L2.csv'
+    assert select_member(navn, 'L1.csv', 'felt.zip') == '2024/L1.csv'
+    assert select_member(['L1.csv', 'les_meg.txt'], None, 'felt.zip') == 'L1.csv'
+    with pytest.raises(ValueError, match="member"):
+        select_member(navn, None, 'felt.zip')
+    with pytest.raises(ValueError, match="flere"):
+        select_member(navn, '*.csv', 'felt.zip')
+    with pytest.raises(FileNotFoundError, match="L3"):
+        select_member(navn, 'L3.csv', 'felt.zip')
+
+# ==============================================================================
+#   TEST AV STRØMMENDE INNLESING
+# ==============================================================================
+
+def test_gzip_og_zip_gir_samme_data_som_csv(tmp_path):
+    """Dialekten detekteres fra den utpakkede strømmen, og resultatet er likt den utpakkede filen."""
+    innhold = lag_csv_bytes()
+    (tmp_path / "L1.csv").write_bytes(innhold)
+    (tmp_path / "L1.csv.gz").write_bytes(gzip.compress(innhold))
+    arkiv = lag_zip(tmp_path / "felt.zip", {'2024/L1.csv': innhold, '2024/L2.csv': lag_csv_bytes('2025-01-01')})
+    fasit = last_og_rens_data(tmp_path / "L1.csv", 'L1', 'Date', 'Time', 'LEVEL')
+
+    fra_gz = last_og_rens_data(tmp_path / "L1.csv.gz", 'L1', 'Date', 'Time', 'LEVEL')
+    fra_zip = last_og_rens_data(arkiv, 'L1', 'Date', 'Time', 'LEVEL', member='*L1.csv')
+
+    pd.testing.assert_frame_equal(fra_gz, fasit)
+    pd.testing.assert_frame_equal(fra_zip, fasit)
+    assert fasit['L1.LEVEL'].iloc[1] == 1.5
+
+def test_opplastet_gzip_og_tidsvindu():
+    """En komprimert fil i minnet (GUI) leses på samme måte, og tidsvinduet filtreres etter innlesing."""
+    opplastet = io.BytesIO(gzip.compress(lag_csv_bytes()))
+    opplastet.name = "L1.csv.gz"
+
+    df = last_og_rens_data(opplastet, 'L1', 'Date', 'Time', 'LEVEL',
+                           start=pd.Timestamp('2024-01-02'), end=pd.Timestamp('2024-01-02 05:00'))
+
+    assert len(df) == 6 and df['Datetime'].iloc[0] == pd.Timestamp('2024-01-02')
+
+def test_les_bare_starten(tmp_path):
+    """read_head pakker bare ut så mye som bes om."""
+    sti = tmp_path / "stor.csv.gz"
+    sti.write_bytes(gzip.compress(lag_csv_bytes(timer=5000)))
+
+    hode = read_head(sti, n=100)
+
+    assert len(hode) == 100 and hode.startswith(b"Logger: L1")
+
+# ==============================================================================
+#   TEST AV METADATA OG MAPPEKILDER
+# ==============================================================================
+
+def test_inspeksjon_av_komprimert_fil(tmp_path):
+    """Header og første tid leses fra starten; siste tid er ukjent uten å pakke ut alt."""
+    sti = tmp_path / "L1.csv.gz"
+    sti.write_bytes(gzip.compress(lag_csv_bytes()))
+
+    meta = inspect_file(sti, 'Date', 'Time')
+
+    assert meta.columns == ['Date', 'Time', 'LEVEL']
+    assert meta.first == '2024-01-01T00:00:00' and meta.last is None
+    assert meta.rows_estimate == 48
+
+def test_mappe_med_komprimerte_filer(tmp_path):
+    """Komprimerte filer i en mappe tas med som kilder og syes sammen med vanlige filer."""
+    (tmp_path / "uke_01.csv.gz").write_bytes(gzip.compress(lag_csv_bytes('2024-01-01', 24)))
+    (tmp_path / "uke_02.csv").write_bytes(lag_csv_bytes('2024-01-02', 24))
+
+    df = load_source(tmp_path, 'L1', 'Date', 'Time', 'LEVEL')
+
+    assert len(df) == 48 and df['Datetime'].is_monotonic_increasing
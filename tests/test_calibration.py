@@ -0,0 +1,76 @@
+import argparse
+import pytest
+import numpy as np
+import pandas as pd
+from sensorplot.calibration import calibrate_frame, parse_calibration
+from sensorplot.cli import get_or_load, normalize_files_dict
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_tabell():
+    """To kalibreringer, bevisst i feil rekkefølge (YAML-rekkefølgen skal ikke spille noen rolle)."""
+    return parse_calibration([
+        {'from': '2024-01-03', 'offset': 10.0, 'scale': 2.0},
+        {'from': '2024-01-02', 'offset': -1.0},
+    ])
+
+def lag_csv(path, dager=4):
+    """En CSV med timesmålinger som alle har verdien 1."""
+    tider = pd.date_range('2024-01-01', periods=dager * 24, freq='h')
+    pd.DataFrame({'Date': tider.strftime('%Y-%m-%d'), 'Time': tider.strftime('%H:%M:%S'),
+                  'LEVEL': 1.0}).to_csv(path, sep=';', index=False)
+    return str(path)
+
+# ==============================================================================
+#   TEST AV KALIBRERINGSTABELL
+# ==============================================================================
+
+def test_kalibrering_per_periode():
+    """Hver måling får kalibreringen som gjelder på sitt tidspunkt; før første brukes rådata."""
+    tabell = lag_tabell()
+    tider = pd.to_datetime(['2024-01-01 23:00', '2024-01-02 00:00', '2024-01-02 23:59', '2024-01-03 00:00', '2025-01-01 00:00'])
+
+    verdier = tabell.apply(tider, np.full(5, 1.0))
+
+    assert verdier.tolist() == [1.0, 0.0, 0.0, 12.0, 12.0]
+
+def test_ugyldig_tabell():
+    """Manglende 'from', ukjente felt og like tidspunkt skal gi en tydelig feil."""
+    with pytest.raises(ValueError, match="'from'"):
+        parse_calibration([{'offset': 1}])
+    with pytest.raises(ValueError, match="Ukjente felt"):
+        parse_calibration([{'from': '2024-01-01', 'ofset': 1}])
+    with pytest.raises(ValueError, match="samme"):
+        parse_calibration([{'from': '2024-01-01'}, {'from': '2024-01-01', 'offset': 2}])
+    with pytest.raises(ValueError):
+        parse_calibration([])
+
+def test_kalibrerer_alle_kanalene_til_aliaset():
+    """Bare kolonnene til aliaset endres, og originalen er uendret."""
+    df = pd.DataFrame({'Datetime': pd.date_range('2024-01-03', periods=3, freq='h'),
+                       'L1.ch1': 1.0, 'L1.ch2': 2.0, 'B.ch1': 1.0})
+
+    ut = calibrate_frame(df, 'L1', lag_tabell())
+
+    assert ut['L1.ch1'].eq(12.0).all() and ut['L1.ch2'].eq(14.0).all()
+    assert ut['B.ch1'].eq(1.0).all() and df['L1.ch1'].eq(1.0).all()
+
+# ==============================================================================
+#   TEST AV KALIBRERING VED INNLESING (CLI)
+# ==============================================================================
+
+def test_kalibrering_fra_yaml_ved_innlesing(tmp_path):
+    """En fil med 'calibration' leses én gang og kalibreres før den legges i cachen."""
+    files = normalize_files_dict({'L1': {'path': lag_csv(tmp_path / "L1.csv"), 'calibration': [
+        {'from': '2024-01-02', 'offset': -1.0},
+        {'from': '2024-01-03', 'offset': 10.0, 'scale': 2.0},
+    ]}})
+    args = argparse.Namespace(col_date='Date', col_data='LEVEL')
+    cache = {}
+
+    df = get_or_load('L1', files, cache, args, 'Time')
+
+    assert df['L1.LEVEL'].value_counts().to_dict() == {12.0: 48, 1.0: 24, 0.0: 24}
+    assert get_or_load('L1', files, cache, args, 'Time') is df
@@ -1,8 +1,11 @@
+import io
 import pytest
 import pandas as pd
 import os
 from pathlib import Path
-from sensorplot.core import last_og_rens_data, vask_data
+import numpy as np
+from sensorplot.core import (FLAG_COLUMN, QualityFlag, Rensing, flagg_resultat, gyldige_rader,
+                             last_og_rens_data, last_arbeidsbok, vask_data)
 
 # ==============================================================================
 #   HJELPEFUNKSJONER
@@ -30,6 +33,28 @@ def test_vask_data_fjerner_stoy():
     assert len(df_vasket) == 8
     assert df_vasket['Resultat'].max() == 10
 
+def test_kvalitetsflagg_beholder_radene():
+    """Flaggene lagres ved siden av verdiene; radene og verdiene er urørt."""
+    tider = pd.date_range('2024-01-01', periods=200, freq='h')
+    verdier = np.sin(np.arange(200) / 10.0)
+    verdier[50] = 3.0    # Lokal spike, for liten for global z-score
+    verdier[150] = 40.0  # Stor utligger
+    df = pd.DataFrame({'Datetime': tider, 'Resultat': verdier})
+
+    flagget, antall = flagg_resultat(
+        df, Rensing(z_score=3.0, vindu='1D', perioder=((tider[10], tider[12]),)))
+    flagg = flagget[FLAG_COLUMN].to_numpy()
+
+    assert len(flagget) == 200 and FLAG_COLUMN not in df.columns
+    assert flagg[150] & QualityFlag.ZSCORE and flagg[150] & QualityFlag.ROLLING
+    assert flagg[50] == QualityFlag.ROLLING
+    assert (flagg[10:13] & QualityFlag.MANUAL).all()
+    assert antall == 5
+
+    gyldig = gyldige_rader(flagget)
+    assert len(gyldig) == 195 and gyldig['Resultat'].max() < 3
+    assert gyldige_rader(df) is df
+
 def test_les_norsk_csv_med_metadata(tmp_path):
     """
     Tester at vi klarer å lese en 'Norsk' CSV-fil fra en logger.
@@ -106,6 +131,52 @@ def test_les_excel_med_metadata(tmp_path):
     # ENDRING: Sjekker 'ExcelTest.Måling'
     assert df['ExcelTest.Måling'].iloc[0] == 500
 
+def test_les_excel_flere_ark(tmp_path):
+    """
+    Tester at vi kan velge ark, og at flere alias kan lastes fra samme arbeidsbok i én omgang.
+    """
+    filnavn = tmp_path / "lokasjon.xlsx"
+    ark1 = pd.DataFrame({"Dato": ["2024-01-01"], "Tid": ["12:00:00"], "ch1": [1.5]})
+    ark2 = pd.DataFrame({"Dato": ["2024-01-02"], "Tid": ["13:00:00"], "ch1": [2.5]})
+    with pd.ExcelWriter(filnavn) as writer:
+        ark1.to_excel(writer, sheet_name="Logger1", index=False)
+        ark2.to_excel(writer, sheet_name="Logger2", index=False)
+
+    # Enkelt ark via last_og_rens_data
+    df = last_og_rens_data(filnavn, "L2", "Dato", "Tid", "ch1", sheet="Logger2")
+    assert df['L2.ch1'].iloc[0] == 2.5
+
+    # Flere ark i én åpning
+    spec = {'col_date': "Dato", 'col_time': "Tid", 'col_data': "ch1"}
+    resultater = last_arbeidsbok(filnavn, {
+        "L1": {**spec, 'sheet': "Logger1"},
+        "L2": {**spec, 'sheet': "Logger2"},
+        "Feil": {**spec, 'sheet': "Finnes ikke"},
+    })
+    assert resultater["L1"]['L1.ch1'].iloc[0] == 1.5
+    assert resultater["L2"]['Datetime'].iloc[0].day == 2
+    assert isinstance(resultater["Feil"], Exception)
+
+def test_les_fra_minnet(tmp_path):
+    """
+    Opplastede filer leses rett fra bufferet (bytes/BytesIO), med samme resultat som fra disk.
+    """
+    csv_fil = lag_csv_fil(tmp_path / "logger.csv",
+                          "Date;Time;LEVEL\n01.01.2024;12:00:00;1,5\n01.01.2024;13:00:00;2,5\n")
+    fra_disk = last_og_rens_data(csv_fil, "L1", "Date", "Time", "LEVEL")
+
+    opplastet = io.BytesIO(Path(csv_fil).read_bytes())
+    opplastet.name = "logger.csv"
+    opplastet.seek(7)  # Posisjonen i bufferet skal ikke ha noe å si
+    pd.testing.assert_frame_equal(last_og_rens_data(opplastet, "L1", "Date", "Time", "LEVEL"), fra_disk)
+    pd.testing.assert_frame_equal(last_og_rens_data(Path(csv_fil).read_bytes(), "L1", "Date", "Time", "LEVEL"), fra_disk)
+
+    # Excel uten filnavn gjenkjennes på innholdet
+    xlsx = tmp_path / "logger.xlsx"
+    pd.DataFrame({"Dato": ["2024-01-01"], "Tid": ["12:00:00"], "ch1": [1.5]}).to_excel(xlsx, index=False)
+    df = last_og_rens_data(io.BytesIO(xlsx.read_bytes()), "X", "Dato", "Tid", "ch1")
+    assert df['X.ch1'].iloc[0] == 1.5
+
 # ==============================================================================
 #   INTEGRASJONSTESTER (Krever ekte filer i tests/data/)
 # ==============================================================================
@@ -2,7 +2,9 @@ import pytest
 import pandas as pd
 from pathlib import Path
 from unittest.mock import patch, MagicMock
-from sensorplot.core import last_og_rens_data, plot_resultat, SensorResult
+import matplotlib.pyplot as plt
+from sensorplot.core import grupper_paneler, lag_figur, last_og_rens_data, plot_per_serie, plot_resultat, tolk_panel, SensorResult
+from sensorplot.stitch import consolidate_results
 
 # ==============================================================================
 #   TEST AV FIL-LESER (CSV Sniffing)
@@ -87,24 +89,10 @@ def test_sammenslaaing_av_serier():
     df3 = pd.DataFrame({'Datetime': pd.to_datetime(['2024-01-01']), 'Resultat': [5]})
     res3 = SensorResult(label="Annen Serie", df=df3)
     
-    # --- SIMULER LOGIKKEN FRA MAIN() ---
+    # --- SAMME LOGIKK SOM I MAIN() ---
     raw_results = [res1, res2, res3]
-    consolidated_dict = {}
+    final_results = consolidate_results(raw_results)
 
-    for res in raw_results:
-        if res.label not in consolidated_dict:
-            consolidated_dict[res.label] = []
-        consolidated_dict[res.label].append(res.df)
-    
-    final_results = []
-    for label, dfs in consolidated_dict.items():
-        if len(dfs) == 1:
-            final_results.append(SensorResult(label=label, df=dfs[0]))
-        else:
-            # Her er selve logikken vi tester: concat + sort
-            combined_df = pd.concat(dfs).sort_values('Datetime')
-            final_results.append(SensorResult(label=label, df=combined_df))
-            
     # --- VERIFISERING ---
     
     # 1. Vi skal sitte igjen med 2 resultater (ikke 3)
@@ -160,4 +148,42 @@ def test_plot_resultat_x_interval(mock_mdates, mock_plt):
     
     # Test 4: "1Y" skal kalle YearLocator(base=1)
     plot_resultat([res], "Tittel", x_interval="1Y")
-    mock_mdates.YearLocator.assert_called_with(base=1)
\ No newline at end of file
+    mock_mdates.YearLocator.assert_called_with(base=1)
+
+def test_plot_til_fil_lekker_ikke_figurer(tmp_path):
+    """Lagring til fil skal ikke etterlate åpne figurer i pyplot."""
+    df = pd.DataFrame({'Datetime': pd.date_range('2024-01-01', periods=3, freq='h'), 'Resultat': [1, 2, 3]})
+    foer = len(plt.get_fignums())
+
+    plot_resultat([SensorResult(label="Test", df=df)], "Tittel", output_file=str(tmp_path / "plot.png"))
+
+    assert (tmp_path / "plot.png").exists()
+    assert len(plt.get_fignums()) == foer
+
+def test_en_fil_per_serie(tmp_path):
+    """--split: én PNG per serie, tegnet parallelt, med filnavn fra serienavnet."""
+    df = pd.DataFrame({'Datetime': pd.date_range('2024-01-01', periods=3, freq='h'), 'Resultat': [1, 2, 3]})
+    serier = [SensorResult(label=navn, df=df) for navn in ["Nivå L1", "Nivå/L1", "Trykk"]]
+
+    filer = plot_per_serie(serier, "Rapport", tmp_path / "ut" / "site.png", workers=3)
+
+    assert [f.name for f in filer] == ["site_Nivå_L1.png", "site_Nivå_L1_2.png", "site_Trykk.png"]
+    assert all(f.exists() for f in filer)
+
+def test_paneler_med_felles_tidsakse():
+    """Serier med samme 'panel' havner i samme akse; alle akser deler tidsakse."""
+    df = pd.DataFrame({'Datetime': pd.date_range('2024-01-01', periods=3, freq='h'), 'Resultat': [1, 2, 3]})
+    serier = [SensorResult("Nivå", df, panel="Nivå"), SensorResult("Trykk", df, panel="Trykk"),
+              SensorResult("Nivå 2", df, panel="Nivå")]
+
+    assert [(navn, [i for i, _ in s]) for navn, s in grupper_paneler(serier)] == [("Nivå", [0, 2]), ("Trykk", [1])]
+
+    fig = lag_figur(serier, "Tittel")
+    ax_nivaa, ax_trykk = fig.axes
+    assert [l.get_label() for l in ax_nivaa.get_lines()] == ["Nivå", "Nivå 2"]
+    assert ax_trykk.get_shared_x_axes().joined(ax_nivaa, ax_trykk)
+
+def test_panel_fra_serienavn():
+    """'[Panel] Navn' gir panelet; uten hakeparentes er det ikke noe panel."""
+    assert tolk_panel("[Trykk] Baro") == ("Baro", "Trykk")
+    assert tolk_panel(" Nivå ") == ("Nivå", None)
@@ -0,0 +1,60 @@
+import pytest
+import pandas as pd
+from pathlib import Path
+import sensorplot.dialect as dialect_mod
+from sensorplot.core import last_og_rens_data
+from sensorplot.dialect import Dialect, guess_date_format, resolve_dialect, sniff_csv
+
+DATA_DIR = Path(__file__).parent / "data"
+BARO_CSV = DATA_DIR / "Barologger 2024.csv"
+
+# ==============================================================================
+#   TEST AV DIALEKTDETEKSJON
+# ==============================================================================
+
+def test_sniff_norsk_csv():
+    """Loggerfilene har metadata over headeren, semikolon, desimalkomma og dd.mm.yyyy."""
+    d = sniff_csv(BARO_CSV, 'Date', 'Time')
+
+    assert d.sep == ';'
+    assert d.decimal == ','
+    assert d.header_row == 10
+    assert d.date_format == '%d.%m.%Y %H:%M:%S'
+    assert d.dayfirst is True
+
+def test_sniff_engelsk_csv(tmp_path):
+    """Komma-separert fil med ISO-datoer og punktum som desimaltegn."""
+    fil = tmp_path / "iso.csv"
+    fil.write_text("Date,Time,LEVEL\n2024-01-31,12:00,1.5\n2024-02-01,12:30,2.5\n", encoding='utf-8')
+
+    d = sniff_csv(fil, 'Date', 'Time')
+
+    assert (d.sep, d.decimal, d.header_row) == (',', '.', 0)
+    assert d.date_format == '%Y-%m-%d %H:%M'
+
+def test_tvetydig_dato_tolkes_dag_foerst():
+    """01/02/2024 kan være begge deler; 13/02 avgjør. Ved tvil velges dag-først."""
+    assert guess_date_format(['01/02/2024', '13/02/2024']) == '%d/%m/%Y'
+    assert guess_date_format(['02/13/2024']) == '%m/%d/%Y'
+    assert guess_date_format(['01/02/2024']) == '%d/%m/%Y'
+
+def test_registeret_hopper_over_ny_skanning(monkeypatch):
+    """Andre gang samme fil lastes skal dialekten hentes fra registeret uten ny skanning."""
+    foerste = resolve_dialect(BARO_CSV, 'Date', 'Time')
+
+    def ingen_skanning(*args, **kwargs):
+        raise AssertionError("Filen ble skannet på nytt")
+    monkeypatch.setattr(dialect_mod, 'sniff_csv', ingen_skanning)
+
+    assert resolve_dialect(BARO_CSV, 'Date', 'Time') == foerste
+    # Overstyring fra YAML vinner over det lagrede
+    assert resolve_dialect(BARO_CSV, 'Date', 'Time', overrides={'dayfirst': False}).dayfirst is False
+
+def test_overstyring_ved_innlesing():
+    """Et feil datoformat i 'dialect' skal gi en tydelig feil, og ukjente felt skal avvises."""
+    with pytest.raises(ValueError, match="datoformat"):
+        last_og_rens_data(BARO_CSV, 'B', 'Date', 'Time', 'LEVEL',
+                          dialect={'date_format': '%Y-%m-%d %H:%M:%S'})
+
+    with pytest.raises(ValueError, match="Ukjente dialect-felt"):
+        Dialect().with_overrides({'separator': ';'})
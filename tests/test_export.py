@@ -0,0 +1,73 @@
+import io
+import zipfile
+import pytest
+import numpy as np
+import pandas as pd
+import sensorplot.export as export
+from sensorplot.core import FLAG_COLUMN, SensorResult, last_og_rens_data
+from sensorplot.export import excel_format, sheet_names, write_excel
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_serie(rader=25, start='2024-03-01 00:00:30'):
+    """Minuttmålinger med sekunder i tidsstempelet og verdier med mange desimaler."""
+    return pd.DataFrame({
+        'Datetime': pd.date_range(start, periods=rader, freq='min'),
+        'Resultat': np.arange(rader) / 3,
+    })
+
+# ==============================================================================
+#   TEST AV EXCEL-EKSPORT
+# ==============================================================================
+
+def test_kan_leses_inn_igjen(tmp_path, monkeypatch):
+    """Norsk format (dato og tid hver for seg) skal leses tilbake med last_og_rens_data, uendret."""
+    monkeypatch.setattr(export, 'CHUNK_ROWS', 7)  # Flere biter enn én
+    df = lag_serie()
+    fil = tmp_path / "ut.xlsx"
+
+    assert write_excel([SensorResult('Nivå', df)], fil, col_date='Date5', col_time='Time6', col_data='ch1') == ['Nivå']
+
+    lest = last_og_rens_data(fil, 'L1', 'Date5', 'Time6', 'ch1', sheet='Nivå')
+    assert (lest['Datetime'] == df['Datetime']).all()
+    assert np.allclose(lest['L1.ch1'], df['Resultat'], rtol=0, atol=1e-12)
+
+def test_deles_paa_flere_ark(tmp_path):
+    """En serie over radgrensen fortsetter på neste ark; arknavnene er gyldige og unike."""
+    fil = tmp_path / "ut.xlsx"
+    navn = write_excel([SensorResult('A/B', lag_serie(25)), SensorResult('a_b', lag_serie(3))], fil,
+                       fmt=excel_format('iso'), max_rows=10)
+
+    # Excel skiller ikke på store og små bokstaver i arknavn
+    assert navn == ['A_B', 'A_B (2)', 'A_B (3)', 'a_b (4)']
+    ark = pd.read_excel(fil, sheet_name=None)
+    assert [len(ark[n]) for n in navn] == [10, 10, 5, 3]
+    assert list(ark['A_B'].columns) == ['Date', 'Resultat']
+    assert ark['A_B (3)']['Date'].iloc[-1] == lag_serie()['Datetime'].iloc[-1]
+
+def test_flagg_nan_og_desimaler():
+    """Flaggede rader tas ikke med, NaN blir tomme celler, og desimalene styres av formatet."""
+    df = lag_serie(5)
+    df.loc[1, 'Resultat'] = np.nan
+    df[FLAG_COLUMN] = np.uint8(0)
+    df.loc[2, FLAG_COLUMN] = 1
+    buffer = io.BytesIO()
+
+    write_excel([SensorResult('S', df)], buffer, fmt=excel_format('no', decimals=2))
+
+    ark = pd.read_excel(io.BytesIO(buffer.getvalue()))
+    assert len(ark) == 4 and ark['Resultat'].isna().tolist() == [False, True, False, False]
+    with zipfile.ZipFile(buffer) as zf:
+        assert 'formatCode="0.00"' in zf.read('xl/styles.xml').decode()
+
+def test_ugyldige_valg():
+    """Ukjent format, negative desimaler og tom eksport gir ValueError."""
+    with pytest.raises(ValueError):
+        excel_format('us')
+    with pytest.raises(ValueError):
+        excel_format('no', decimals=-1)
+    with pytest.raises(ValueError):
+        write_excel([], io.BytesIO())
+    assert sheet_names('x' * 40, 2, set()) == ['x' * 31, 'x' * 27 + ' (2)']
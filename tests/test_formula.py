@@ -0,0 +1,79 @@
+import pytest
+import numpy as np
+import pandas as pd
+from sensorplot.formula import evaluate_formula, expand_template, parse_template
+from sensorplot.pipeline import evaluate_expression
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_data(n=48, freq='h'):
+    """To kanaler slik align-steget leverer dem: stigende L1 og konstant B."""
+    return pd.DataFrame({
+        'Datetime': pd.date_range('2024-01-01', periods=n, freq=freq),
+        'L1.ch1': np.arange(n, dtype=float),
+        'B.ch1': 1.0,
+    })
+
+# ==============================================================================
+#   TEST AV TIDSFUNKSJONER
+# ==============================================================================
+
+def test_rolling_mean_med_tidsvindu():
+    """Et vindu på '3h' tar med målingene de siste tre timene."""
+    res = evaluate_formula(lag_data(), "rolling_mean(`L1.ch1`, '3h')")
+    assert res.iloc[:4].tolist() == [0.0, 0.5, 1.0, 2.0]
+
+def test_shift_og_diff():
+    """shift med tid finner målingen på eller før t - lag; diff med rader."""
+    df = lag_data()
+    assert evaluate_formula(df, "`L1.ch1` - shift(`L1.ch1`, '2h')").iloc[2:].eq(2).all()
+    assert evaluate_formula(df, "diff(`L1.ch1`, 2)").iloc[2:].eq(2).all()
+
+    # Uregelmessige tider: siste måling før t - lag brukes
+    ujevn = df.iloc[[0, 1, 5, 6]].reset_index(drop=True)
+    res = evaluate_formula(ujevn, "shift(`L1.ch1`, '2h')")
+    assert res.isna().tolist() == [True, True, False, False]
+    assert res.iloc[2:].tolist() == [1.0, 1.0]
+
+def test_dognmiddel_og_cumsum():
+    """resample_mean gir hver rad snittet for sitt døgn; cumsum summerer fortløpende."""
+    df = lag_data()
+    res = evaluate_formula(df, "resample_mean(`L1.ch1`, '1D')")
+    assert res.iloc[0] == res.iloc[23] == 11.5
+    assert res.iloc[24] == 35.5
+    assert evaluate_formula(df, "cumsum(`B.ch1`) * 2").iloc[-1] == 96
+
+def test_nestede_kall_i_pipeline():
+    """Funksjoner kan nestes og kombineres med aritmetikk i pipeline-steget."""
+    df = evaluate_expression(lag_data(), "rolling_mean(diff(`L1.ch1` - `B.ch1`), 3) + 10")
+    assert list(df.columns) == ['Datetime', 'L1.ch1', 'B.ch1', 'Resultat']
+    assert df['Resultat'].iloc[1:].eq(11).all()
+
+def test_ugyldig_argument():
+    """Et ugyldig vindu skal gi en tydelig feil."""
+    with pytest.raises(ValueError):
+        evaluate_formula(lag_data(), "rolling_mean(`L1.ch1`, 'ukentlig')")
+    with pytest.raises(ValueError, match="tall eller tekst"):
+        evaluate_formula(lag_data(), "shift(`L1.ch1`, `B.ch1`)")
+
+# ==============================================================================
+#   TEST AV MALER
+# ==============================================================================
+
+def test_mal_fylles_ut_for_alias_som_passer():
+    """'for alias in L*' gir én serie per alias som passer; navnet får aliaset inn."""
+    mal = parse_template("{alias}.ch1 - B.ch1 for alias in L0[1-2]")
+    assert mal == ('{alias}.ch1 - B.ch1', 'alias', 'L0[1-2]')
+    assert expand_template('{alias} korr', *mal, ['L01', 'L02', 'L03', 'B']) == [
+        ('L01 korr', 'L01.ch1 - B.ch1', 'L01'),
+        ('L02 korr', 'L02.ch1 - B.ch1', 'L02'),
+    ]
+    # Uten plassholder i navnet legges aliaset til, så seriene ikke slås sammen
+    assert expand_template('Nivå', '{x}.ch1', 'x', '*', ['A'])[0][0] == 'Nivå A'
+
+def test_vanlig_formel_er_ikke_mal():
+    """Uten 'for ... in', eller uten plassholderen i formelen, er det ingen mal."""
+    assert parse_template("L1.ch1 - B.ch1") is None
+    assert parse_template("L1.ch1 for alias in L*") is None
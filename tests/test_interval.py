@@ -0,0 +1,124 @@
+import pytest
+import numpy as np
+import pandas as pd
+from sensorplot.interval import (
+    FALLBACK_TOLERANCE, IntervalProfile, parse_tolerance, profile_times, segment_index, with_breaks)
+from sensorplot.cli import stored_profiles
+from sensorplot.pipeline import SeriesJob, SeriesPipeline
+from sensorplot.store import write_store
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_kanal(alias, freq, n, start='2024-01-01'):
+    """En logger med fast intervall og stigende verdier."""
+    return pd.DataFrame({
+        'Datetime': pd.date_range(start, periods=n, freq=freq),
+        f'{alias}.LEVEL': np.arange(n, dtype=float),
+    })
+
+def beregn(frames, **kwargs):
+    """Kjører 'A - B' gjennom pipelinen og gir resultatet."""
+    job = SeriesJob(label='Diff', formula='A - B', expression='`A.LEVEL` - `B.LEVEL`', aliases=['A', 'B'])
+    pipeline = SeriesPipeline(lambda alias: frames[alias], **kwargs)
+    res = next(iter(pipeline.run([job])))
+    return res.result.df, pipeline
+
+# ==============================================================================
+#   TEST AV INTERVALLPROFIL
+# ==============================================================================
+
+def test_profil_med_hull_og_jitter():
+    """Medianintervall, jitter og hull finnes fra tidsstemplene alene."""
+    tider = pd.date_range('2024-01-01', periods=100, freq='15min').to_numpy()
+    tider[1::2] += np.timedelta64(30, 's')  # Hver andre måling 30 s for sent
+    tider = np.concatenate([tider, tider[-1] + np.timedelta64(6, 'h') + np.arange(5) * np.timedelta64(15, 'm')])
+
+    profil = profile_times(tider)
+
+    assert profil.samples == 105
+    assert profil.median == pd.Timedelta('15min')
+    assert profil.jitter == pd.Timedelta('30s')
+    assert len(profil.gaps) == 1
+    assert pd.Timestamp(profil.gaps[0, 1]) - pd.Timestamp(profil.gaps[0, 0]) == pd.Timedelta('6h')
+    assert profil.tolerance == pd.Timedelta('8min')
+    assert IntervalProfile.from_dict(profil.to_dict()).to_dict() == profil.to_dict()
+
+def test_for_faa_maalinger_gir_fast_toleranse():
+    """Uten minst to målinger kan intervallet ikke bestemmes."""
+    assert profile_times(pd.to_datetime(['2024-01-01'])).tolerance == FALLBACK_TOLERANCE
+
+def test_tolk_toleranse():
+    """'auto' og tomt betyr automatisk; ellers en tidsavstand."""
+    assert parse_tolerance('auto') is None and parse_tolerance(None) is None
+    assert parse_tolerance('30s') == pd.Timedelta(seconds=30)
+    with pytest.raises(ValueError):
+        parse_tolerance('en stund')
+
+# ==============================================================================
+#   TEST AV AUTOMATISK TOLERANSE VED SAMMENSLÅING
+# ==============================================================================
+
+def test_timeslogger_slaas_sammen_uten_hull():
+    """Mot en timeslogger skal alle minuttmålinger få en partner (fast 10 min ga mest NaN)."""
+    frames = {'A': lag_kanal('A', 'min', 24 * 60), 'B': lag_kanal('B', 'h', 25)}
+
+    auto, pipeline = beregn(frames)
+    fast, _ = beregn(frames, tolerance=pd.Timedelta('10min'))
+
+    assert pipeline.profiles['B'].median == pd.Timedelta('1h')
+    assert auto['Resultat'].notna().all()
+    assert fast['Resultat'].isna().mean() > 0.6
+
+def test_sekundlogger_bygger_ikke_bro_over_hull():
+    """Et hull i en sekundlogger skal gi NaN, ikke målinger fra flere minutter unna."""
+    b = lag_kanal('B', 's', 600)
+    b = b[(b['Datetime'] < '2024-01-01 00:02') | (b['Datetime'] >= '2024-01-01 00:07')]
+    frames = {'A': lag_kanal('A', 's', 600), 'B': b.reset_index(drop=True)}
+
+    auto, _ = beregn(frames)
+    overstyrt, _ = beregn(frames, tolerances={'B': pd.Timedelta('10min')})
+
+    assert auto['Resultat'].isna().sum() == 300
+    assert overstyrt['Resultat'].notna().all()
+
+def test_lagret_profil_fra_lager_brukes(tmp_path):
+    """Profilen som ingest lagret i .spb-headeren brukes av pipelinen i stedet for en ny profilering."""
+    frames = {'A': lag_kanal('A', 'min', 24 * 60), 'B': lag_kanal('B', 'h', 25)}
+    lager = write_store(tmp_path / "B.spb", frames['B'].rename(columns={'B.LEVEL': 'LEVEL'}),
+                        meta={'interval': profile_times(frames['B']['Datetime']).to_dict()})
+
+    profiler = stored_profiles({'A': {'path': str(tmp_path / "a.csv")}, 'B': {'path': str(lager)}}, ['A', 'B'])
+    lagret = IntervalProfile(samples=25, median=pd.Timedelta('2h'))
+    _, pipeline = beregn(frames, profiles={'B': lagret})
+
+    assert list(profiler) == ['B'] and profiler['B'].median == pd.Timedelta('1h')
+    assert pipeline.profiles['B'] is lagret and pipeline.tolerance_for('B') == lagret.tolerance
+    assert pipeline.profiles['A'].median == pd.Timedelta('1min')
+
+# ==============================================================================
+#   TEST AV SEGMENTINDEKS
+# ==============================================================================
+
+def test_segmentindeks_og_brudd():
+    """Hvert hull starter et nytt segment; bruddene gir NaN mellom segmentene."""
+    tider = np.concatenate([
+        pd.date_range('2024-01-01', periods=10, freq='h'),
+        pd.date_range('2024-01-03', periods=5, freq='h'),
+        pd.date_range('2024-01-05', periods=3, freq='h'),
+    ])
+    segmenter = segment_index(tider)
+    assert segmenter.tolist() == [[0, 10], [10, 15], [15, 18]]
+
+    profil = profile_times(tider)
+    assert profil.longest_gap == pd.Timedelta('1D 20h')
+    assert profil.gap_total == pd.Timedelta('1D 15h') + pd.Timedelta('1D 20h')
+
+    x, y = with_breaks(segmenter, tider, np.arange(18))
+    assert len(x) == len(y) == 20
+    assert np.flatnonzero(np.isnan(y)).tolist() == [10, 16]
+
+    # Et utsnitt bruker hullene fra hele serien og får bare bruddene som ligger i det
+    assert segment_index(tider[8:12], profil.gaps).tolist() == [[0, 2], [2, 4]]
+    assert segment_index(tider[:5], profil.gaps).tolist() == [[0, 5]]
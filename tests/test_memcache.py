@@ -0,0 +1,62 @@
+import threading
+import time
+import numpy as np
+import pandas as pd
+from sensorplot.memcache import SharedCache, size_of
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_df(rader=1000):
+    """En DataFrame på rundt 16 KB per 1000 rader (tid + verdi)."""
+    return pd.DataFrame({
+        'Datetime': pd.date_range('2024-01-01', periods=rader, freq='min'),
+        'Resultat': np.zeros(rader),
+    })
+
+# ==============================================================================
+#   TEST AV DELT CACHE
+# ==============================================================================
+
+def test_lru_innenfor_budsjett():
+    """Over budsjettet kastes den minst nylig brukte; treff og bom telles."""
+    df = lag_df()
+    cache = SharedCache(budget=int(size_of(df) * 2.5))
+    cache.put('a', df)
+    cache.put('b', lag_df())
+    assert cache.get('a') is df          # 'a' er nå nyligst brukt
+    cache.put('c', lag_df())             # 'b' må vike
+
+    assert cache.get('b') is None
+    assert cache.get('c') is not None
+    stats = cache.stats()
+    assert (stats.entries, stats.evictions, stats.hits, stats.misses) == (2, 1, 2, 1)
+    assert stats.bytes <= stats.budget
+
+def test_for_stor_verdi_caches_ikke():
+    """En verdi som alene er større enn budsjettet skal ikke fortrenge alt annet."""
+    cache = SharedCache(budget=100)
+    cache.put('stor', lag_df())
+    assert cache.get('stor') is None and cache.stats().entries == 0
+
+def test_samtidige_kall_beregner_en_gang():
+    """Ber flere økter om samme fil samtidig, leses den bare én gang."""
+    cache = SharedCache(budget=10**8)
+    kall = []
+
+    def beregn():
+        kall.append(1)
+        time.sleep(0.05)
+        return lag_df()
+
+    resultater = []
+    traader = [threading.Thread(target=lambda: resultater.append(cache.get_or_compute('fil', beregn)))
+               for _ in range(6)]
+    for t in traader:
+        t.start()
+    for t in traader:
+        t.join()
+
+    assert len(kall) == 1
+    assert all(r is resultater[0] for r in resultater)
@@ -0,0 +1,97 @@
+import openpyxl
+import pytest
+import pandas as pd
+from pathlib import Path
+import sensorplot.cli as cli_mod
+import sensorplot.metadata as metadata_mod
+from sensorplot.cli import main as cli_main
+from sensorplot.core import last_og_rens_data
+from sensorplot.metadata import EXCEL_TAIL_ROWS, _excel_tail_rows, inspect_file, validate_metadata
+
+DATA_DIR = Path(__file__).parent / "data"
+
+# ==============================================================================
+#   TEST AV METADATAINDEKS
+# ==============================================================================
+
+@pytest.mark.parametrize("filnavn, col_data", [
+    ("Laksmyra 3 2024.csv", "LEVEL"),
+    ("TAP-Baro.xlsx", "ch1"),
+])
+def test_inspect_stemmer_med_full_innlesing(filnavn, col_data):
+    """Tidsrom og kolonner fra header/første/siste rad skal stemme med full innlesing."""
+    sti = DATA_DIR / filnavn
+
+    meta = inspect_file(sti, 'Date', 'Time')
+    df = last_og_rens_data(sti, 'A', 'Date', 'Time', col_data)
+
+    assert col_data in meta.columns
+    assert meta.span == (df['Datetime'].min(), df['Datetime'].max())
+    assert abs(meta.rows_estimate - len(df)) / len(df) < 0.05
+
+@pytest.mark.parametrize("filnavn", ["TAP-Baro.xlsx", "TAP-data.xlsx", "Baro.xlsx"])
+def test_excel_slutt_stemmer_med_openpyxl(filnavn, monkeypatch):
+    """Radene lest direkte fra slutten av arkets XML skal være de samme som openpyxl gir."""
+    sti = DATA_DIR / filnavn
+    wb = openpyxl.load_workbook(sti, read_only=True, data_only=True)
+    try:
+        ws = wb.worksheets[0]
+        alle = [list(r) for r in ws.iter_rows(values_only=True)]
+        foran = alle[-EXCEL_TAIL_ROWS - 1]
+        forventet = [(r + [None] * len(foran))[:len(foran)] for r in alle[-EXCEL_TAIL_ROWS:]]
+
+        def ingen_iterering(*args, **kwargs):
+            raise AssertionError("Hele arket ble iterert")
+        monkeypatch.setattr(ws, 'iter_rows', ingen_iterering)
+
+        assert _excel_tail_rows(sti, ws, tuple(foran)) == forventet
+    finally:
+        wb.close()
+
+def test_indeksen_gjenbrukes(monkeypatch):
+    """Andre inspeksjon av en uendret fil skal komme fra indeksen."""
+    sti = DATA_DIR / "Barologger 2024.csv"
+    foerste = inspect_file(sti, 'Date', 'Time')
+
+    def ingen_lesing(*args, **kwargs):
+        raise AssertionError("Filen ble lest på nytt")
+    monkeypatch.setattr(metadata_mod, 'csv_tidsspenn', ingen_lesing)
+
+    assert inspect_file(sti, 'Date', 'Time') == foerste
+
+def test_validering_finner_feil_kolonne():
+    """En feilstavet datakolonne og et tidsvindu utenfor filen skal meldes uten lasting."""
+    meta = inspect_file(DATA_DIR / "Barologger 2024.csv", 'Date', 'Time')
+
+    feil, advarsler = validate_metadata(meta, 'B', 'Date', 'LEVLE', start=pd.Timestamp('2030-01-01'))
+
+    assert len(feil) == 1 and "LEVLE" in feil[0]
+    assert len(advarsler) == 1
+
+def test_cli_hopper_over_serie_med_feil_kolonne(tmp_path, monkeypatch):
+    """Med feil datakolonne hoppes serien over uten at filen lastes, og ingen figur skrives."""
+    def ingen_lasting(*args, **kwargs):
+        raise AssertionError("Filen ble lastet")
+    monkeypatch.setattr(cli_mod, 'last_og_rens_data', ingen_lasting)
+
+    cli_main(['--files', f'B={DATA_DIR / "Barologger 2024.csv"}', '--datecol', 'Date',
+              '--timecol', 'Time', '--datacol', 'LEVLE', '--series', 'Trykk=B.LEVLE',
+              '--output', str(tmp_path / "plot.png")])
+
+    assert not (tmp_path / "plot.png").exists()
+
+def test_cli_hopper_over_serier_med_feil_fil(tmp_path, monkeypatch):
+    """En fil som mangler skal ikke lastes, men seriene som ikke bruker den beregnes og plottes."""
+    lastet = []
+    original = cli_mod.last_og_rens_data
+    def tell(path, *args, **kwargs):
+        lastet.append(Path(path).name)
+        return original(path, *args, **kwargs)
+    monkeypatch.setattr(cli_mod, 'last_og_rens_data', tell)
+
+    cli_main(['--files', f'B={DATA_DIR / "Barologger 2024.csv"}', f'L={tmp_path / "mangler.csv"}',
+              '--datecol', 'Date', '--timecol', 'Time', '--datacol', 'LEVEL',
+              '--series', 'Trykk=B.LEVEL', 'Nivå=L.LEVEL - B.LEVEL', '--output', str(tmp_path / "plot.png")])
+
+    assert lastet == ["Barologger 2024.csv"]
+    assert (tmp_path / "plot.png").exists()
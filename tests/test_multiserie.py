@@ -88,4 +88,64 @@ def test_independent_pairs(tmp_path):
     assert "B2" in loaded_dfs_cache
     assert len(loaded_dfs_cache) == 4
 
-    print("\nTest 'Independent Pairs' OK: Klarte å skille L1/B1 og L2/B2.")
\ No newline at end of file
+    print("\nTest 'Independent Pairs' OK: Klarte å skille L1/B1 og L2/B2.")
+
+def test_flere_ark_i_samme_arbeidsbok(tmp_path):
+    """
+    TESTER SCENARIO: Logger og baro ligger på hvert sitt ark i samme arbeidsbok.
+    Begge alias skal lastes i samme omgang når det første trengs.
+    """
+    dates = pd.date_range(start="2024-01-01 12:00", periods=3, freq='h')
+    full_path = tmp_path / "lokasjon.xlsx"
+    with pd.ExcelWriter(full_path) as writer:
+        for sheet, value in [("Logger", 100), ("Baro", 10)]:
+            pd.DataFrame({'Date5': dates.date, 'Time6': dates.time, 'ch1': [value] * 3}).to_excel(
+                writer, sheet_name=sheet, index=False)
+
+    files_dict = {
+        "L": {'path': str(full_path), 'cols': {}, 'sheet': "Logger"},
+        "B": {'path': str(full_path), 'cols': {}, 'sheet': "Baro"},
+    }
+    loaded_dfs_cache = {}
+
+    res = process_single_series(
+        series_label="Kompensert",
+        formula="L.ch1 - B.ch1",
+        all_files_dict=files_dict,
+        loaded_dfs_cache=loaded_dfs_cache,
+        global_args=MockArgs(),
+        global_time_col='Time6'
+    )
+
+    assert res.df['Resultat'].tolist() == [90, 90, 90]
+    assert set(loaded_dfs_cache) == {"L", "B"}
+
+def test_ubrukte_ark_lastes_ikke(tmp_path):
+    """
+    TESTER SCENARIO: Arbeidsboken har et tredje ark med eget alias som ingen serie bruker.
+    Bare arkene serien trenger skal lastes sammen.
+    """
+    dates = pd.date_range(start="2024-01-01 12:00", periods=3, freq='h')
+    full_path = tmp_path / "lokasjon.xlsx"
+    with pd.ExcelWriter(full_path) as writer:
+        for sheet, value in [("Logger", 100), ("Baro", 10), ("Ekstra", 1)]:
+            pd.DataFrame({'Date5': dates.date, 'Time6': dates.time, 'ch1': [value] * 3}).to_excel(
+                writer, sheet_name=sheet, index=False)
+
+    files_dict = {
+        alias: {'path': str(full_path), 'cols': {}, 'sheet': sheet}
+        for alias, sheet in [("L", "Logger"), ("B", "Baro"), ("E", "Ekstra")]
+    }
+    loaded_dfs_cache = {}
+
+    res = process_single_series(
+        series_label="Kompensert",
+        formula="L.ch1 - B.ch1",
+        all_files_dict=files_dict,
+        loaded_dfs_cache=loaded_dfs_cache,
+        global_args=MockArgs(),
+        global_time_col='Time6'
+    )
+
+    assert res.df['Resultat'].tolist() == [90, 90, 90]
+    assert set(loaded_dfs_cache) == {"L", "B"}
@@ -0,0 +1,187 @@
+import threading
+import time
+import pytest
+import pandas as pd
+from sensorplot.pipeline import CancelToken, SeriesFamily, SeriesJob, SeriesPipeline, group_families, parse_workers
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_kanal(alias, verdi, n=5):
+    """Lager en DataFrame slik loaderen leverer den ('Datetime' + 'Alias.LEVEL')."""
+    return pd.DataFrame({
+        'Datetime': pd.date_range('2024-01-01', periods=n, freq='h'),
+        f'{alias}.LEVEL': [float(verdi)] * n
+    })
+
+def lag_jobb(label, expression, aliases):
+    return SeriesJob(label=label, formula=expression, expression=expression, aliases=aliases)
+
+# ==============================================================================
+#   TEST AV PIPELINE
+# ==============================================================================
+
+def test_parse_workers():
+    """Antall arbeidere kan gis som tall, 'steg=N' eller dict; ukjente steg avvises."""
+    assert parse_workers(3)['eval'] == 3
+    assert parse_workers(['load=8'])['load'] == 8
+    assert parse_workers({'clean': 1})['clean'] == 1
+    with pytest.raises(ValueError):
+        parse_workers(['foo=2'])
+
+def test_hver_fil_lastes_en_gang():
+    """Flere serier som deler et alias skal bare trigge én lesing av filen."""
+    kall = []
+    lock = threading.Lock()
+
+    def loader(alias):
+        with lock:
+            kall.append(alias)
+        return lag_kanal(alias, {'A': 10, 'B': 3}[alias])
+
+    jobs = [
+        lag_jobb('Diff', '`A.LEVEL` - `B.LEVEL`', ['A', 'B']),
+        lag_jobb('Sum', '`A.LEVEL` + `B.LEVEL`', ['A', 'B']),
+        lag_jobb('Bare A', '`A.LEVEL` * 2', ['A']),
+    ]
+
+    resultater = {r.label: r for r in SeriesPipeline(loader).run(jobs)}
+
+    assert sorted(kall) == ['A', 'B']
+    assert resultater['Diff'].result.df['Resultat'].iloc[0] == 7
+    assert resultater['Sum'].result.df['Resultat'].iloc[0] == 13
+    assert resultater['Bare A'].result.df['Resultat'].iloc[0] == 20
+
+def test_feil_gir_ett_resultat_per_serie():
+    """Lesefeil og formelfeil skal rapporteres per serie uten å stoppe de andre."""
+    def loader(alias):
+        if alias == 'Mangler':
+            raise FileNotFoundError("finnes ikke")
+        return lag_kanal(alias, 1)
+
+    jobs = [
+        lag_jobb('Ok', '`A.LEVEL` + 1', ['A']),
+        lag_jobb('Lesefeil', '`Mangler.LEVEL` + `Mangler.LEVEL`', ['Mangler']),
+        lag_jobb('Formelfeil', '`A.LEVEL` +* 1', ['A']),
+    ]
+
+    resultater = list(SeriesPipeline(loader).run(jobs, max_in_flight=1))
+
+    assert len(resultater) == 3
+    feil = {r.label: r.error for r in resultater}
+    assert feil['Ok'] is None
+    assert 'Feil ved lesing' in feil['Lesefeil']
+    assert 'Feil i formel' in feil['Formelfeil']
+
+def test_avbrudd_stopper_resten():
+    """Etter cancel() skal ingen nye serier startes eller gis ut."""
+    token = CancelToken()
+    kall = []
+
+    def loader(alias):
+        kall.append(alias)
+        return lag_kanal(alias, 1)
+
+    jobs = [lag_jobb(f'S{i}', f'`K{i}.LEVEL` + 1', [f'K{i}']) for i in range(20)]
+    pipeline = SeriesPipeline(loader, workers={'load': 1}, token=token)
+
+    resultater = []
+    for res in pipeline.run(jobs, max_in_flight=1):
+        resultater.append(res)
+        token.cancel()
+
+    assert len(resultater) == 1
+    assert len(kall) < len(jobs)
+
+def test_avbrudd_utenfra_venter_ikke_paa_arbeid_som_kjorer():
+    """Ctrl+C (eller at kalleren slutter å lese) skal avbryte uten å vente på filer som lastes."""
+    slipp = threading.Event()
+
+    def loader(alias):
+        if alias == 'Treg':
+            slipp.wait(timeout=5)
+        return lag_kanal(alias, 1)
+
+    jobs = [lag_jobb('Rask', '`Rask.LEVEL` + 1', ['Rask']), lag_jobb('Treg', '`Treg.LEVEL` + 1', ['Treg'])]
+    pipeline = SeriesPipeline(loader)
+    resultater = pipeline.run(jobs)
+
+    try:
+        assert next(resultater).label == 'Rask'
+        start = time.monotonic()
+        with pytest.raises(KeyboardInterrupt):
+            resultater.throw(KeyboardInterrupt())
+        assert time.monotonic() - start < 1
+        assert pipeline.token.cancelled
+    finally:
+        slipp.set()
+
+# ==============================================================================
+#   TEST AV MALER (SERIEFAMILIER)
+# ==============================================================================
+
+def lag_malserie(alias, baro='B'):
+    job = lag_jobb(f'{alias} korr', f'`{alias}.LEVEL` - `{baro}.LEVEL` / 2', [alias, baro])
+    job.template, job.target = '{alias} korr = {alias}.LEVEL - B.LEVEL / 2 for alias in L*', alias
+    return job
+
+@pytest.mark.parametrize('dobbel', [False, True])
+def test_familie_gir_samme_resultat_som_hver_for_seg(dobbel):
+    """
+    En familie beregnes samlet, men hver serie skal bli lik som om den ble beregnet alene.
+    Også når barometeret har to målinger med samme tidsstempel (da vinner den siste, som i merge_asof).
+    """
+    def loader(alias):
+        df = lag_kanal(alias, {'L1': 10, 'L2': 20, 'L3': 30, 'B': 4}[alias], n=6)
+        if alias == 'L2':
+            # Egen tidsakse, forskjøvet 10 minutter fra barometeret
+            df['Datetime'] += pd.Timedelta('10min')
+        if alias == 'B':
+            df['B.LEVEL'] = [4.0, 6.0, 8.0, 10.0, 12.0, 14.0]
+            if dobbel:
+                df.loc[2, 'Datetime'] = df.loc[1, 'Datetime']
+        return df
+
+    jobs = [lag_malserie(a) for a in ['L1', 'L2', 'L3']]
+    gruppert = group_families(jobs)
+    assert len(gruppert) == 1 and isinstance(gruppert[0], SeriesFamily)
+
+    samlet = {r.label: r for r in SeriesPipeline(loader).run(gruppert)}
+    enkeltvis = {r.label: r for r in SeriesPipeline(loader).run(jobs)}
+
+    assert len(samlet) == 3 and sorted(samlet) == sorted(enkeltvis)
+    for label, res in samlet.items():
+        assert res.job in jobs
+        pd.testing.assert_frame_equal(res.result.df, enkeltvis[label].result.df)
+
+@pytest.mark.parametrize('feiler', [['L2'], ['L1', 'L3']])
+def test_familie_med_fil_som_feiler(feiler):
+    """Kan ikke et mål leses, feiler bare den serien; resten av familien beregnes som alene."""
+    def loader(alias):
+        if alias in feiler:
+            raise ValueError("korrupt fil")
+        return lag_kanal(alias, {'L1': 10, 'L2': 20, 'L3': 30, 'B': 4}[alias], n=6)
+
+    jobs = [lag_malserie(a) for a in ['L1', 'L2', 'L3']]
+    resultater = {r.label: r for r in SeriesPipeline(loader).run(group_families(jobs))}
+    enkeltvis = {r.label: r for r in SeriesPipeline(loader).run(jobs)}
+
+    assert sorted(resultater) == ['L1 korr', 'L2 korr', 'L3 korr']
+    for label, res in resultater.items():
+        if label[:2] in feiler:
+            assert res.result is None and label[:2] in res.error and "korrupt fil" in res.error
+            assert res.job.label == label
+        else:
+            pd.testing.assert_frame_equal(res.result.df, enkeltvis[label].result.df)
+
+def test_familie_faller_tilbake():
+    """Én serie, eller ulik formel etter utfylling, gir vanlige enkeltserier."""
+    assert group_families([lag_malserie('L1')]) == [lag_malserie('L1')]
+
+    ulik = [lag_malserie('L1'), lag_malserie('L2', baro='C')]
+    assert all(isinstance(j, SeriesJob) for j in group_families(ulik))
+
+    annen = lag_malserie('L2')
+    annen.expression = '`L2.LEVEL` * 3 - `B.LEVEL` / 2'
+    assert all(isinstance(j, SeriesJob) for j in group_families([lag_malserie('L1'), annen]))
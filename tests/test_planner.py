@@ -0,0 +1,101 @@
+import pytest
+import pandas as pd
+from sensorplot.core import last_og_rens_data
+from sensorplot.metadata import FileMetadata
+from sensorplot.pipeline import SeriesJob, SeriesPipeline
+from sensorplot.planner import (STRATEGIES, AliasEstimate, estimate_alias, estimate_peak, parse_memory,
+                                plan_memory)
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_anslag(rader=1_000_000, kolonner=10):
+    """To store CSV-filer med dato og tid som tekst."""
+    return {alias: AliasEstimate(alias, '.csv', rader, rader, kolonner, text_columns=2) for alias in ('A', 'B')}
+
+def lag_csv(path, timer=1000):
+    """En CSV med flere kolonner enn den som brukes, i norsk format."""
+    tider = pd.date_range('2024-01-01', periods=timer, freq='h')
+    pd.DataFrame({'Date': tider.strftime('%d.%m.%Y'), 'Time': tider.strftime('%H:%M:%S'),
+                  'LEVEL': range(timer), 'Temp': 4.0}).to_csv(path, sep=';', decimal=',', index=False)
+    return path
+
+# ==============================================================================
+#   TEST AV BUDSJETT OG STRATEGI
+# ==============================================================================
+
+def test_tolk_minnegrense():
+    """Enheter K/M/G (med eller uten B); et rent tall er MB, 'auto' gir standardbudsjettet."""
+    assert parse_memory('4G') == 4 * 2**30
+    assert parse_memory('512mb') == 512 * 2**20
+    assert parse_memory(1.5) == int(1.5 * 2**20)
+    assert parse_memory('auto') is None
+    with pytest.raises(ValueError):
+        parse_memory('mye')
+    with pytest.raises(ValueError):
+        parse_memory('0G')
+
+def test_strategi_strammes_inn_med_budsjettet():
+    """Hver strategi sparer minne; planen velger den første som holder seg innenfor budsjettet."""
+    anslag = lag_anslag()
+    jobs = [['A', 'B'], ['A']]
+    topper = [estimate_peak(s, anslag, jobs) for s in STRATEGIES]
+
+    assert topper == sorted(topper, reverse=True) and len(set(topper)) == len(topper)
+    assert plan_memory(anslag, jobs, None).strategy == 'memory'
+    for strategi, topp in zip(STRATEGIES, topper):
+        plan = plan_memory(anslag, jobs, topp)
+        assert plan.strategy == strategi and plan.fits
+
+    for_lite = plan_memory(anslag, jobs, 1)
+    assert for_lite.strategy == 'sequential' and not for_lite.fits
+    assert for_lite.value_dtype == 'float32' and for_lite.chunk_rows and for_lite.sequential
+
+def test_anslag_fra_metadata_og_tidsvindu(tmp_path):
+    """Radene i et mønster skaleres med antall filer, og tidsvinduet tar bare med sin del."""
+    filer = [tmp_path / f"uke_{i}.csv" for i in range(4)]
+    for f in filer:
+        f.write_text("x" * 400)
+    meta = FileMetadata(str(filer[-1]), ['Date', 'Time', 'LEVEL'], 100,
+                        first='2024-01-01T00:00:00', last='2024-01-11T00:00:00')
+
+    anslag = estimate_alias('L1', meta, filer, 'Date', 'Time', start=pd.Timestamp('2024-01-06'))
+    uten_meta = estimate_alias('L2', OSError("feil"), filer, 'Date', 'Time')
+
+    assert (anslag.file_rows, anslag.rows, anslag.text_columns, anslag.size) == (400, 200, 2, 1600)
+    assert uten_meta.rows == 1600 // 40
+
+# ==============================================================================
+#   TEST AV TILTAKENE
+# ==============================================================================
+
+def test_bitvis_lesing_gir_samme_data(tmp_path):
+    """CSV lest i biter (bare tid og datakolonne beholdes) skal gi det samme som vanlig lesing."""
+    sti = lag_csv(tmp_path / "L1.csv")
+    start, slutt = pd.Timestamp('2024-01-10'), pd.Timestamp('2024-01-20')
+
+    hel = last_og_rens_data(sti, 'L1', 'Date', 'Time', 'LEVEL', start=start, end=slutt)
+    biter = last_og_rens_data(sti, 'L1', 'Date', 'Time', 'LEVEL', start=start, end=slutt, chunk_rows=37)
+
+    pd.testing.assert_frame_equal(biter.reset_index(drop=True), hel.reset_index(drop=True))
+
+def test_sekvensiell_kjoring_slipper_filer():
+    """Med release slippes hver fil så snart ingen gjenstående serie trenger den."""
+    sluppet = []
+
+    def loader(alias):
+        return pd.DataFrame({'Datetime': pd.date_range('2024-01-01', periods=3, freq='h'),
+                             f'{alias}.LEVEL': 1.0})
+
+    jobs = [SeriesJob(label, e, e, aliases) for label, e, aliases in [
+        ('AB', '`A.LEVEL` + `B.LEVEL`', ['A', 'B']),
+        ('A', '`A.LEVEL`', ['A']),
+        ('C', '`C.LEVEL`', ['C']),
+    ]]
+    pipeline = SeriesPipeline(loader, release=sluppet.append)
+
+    resultater = [r.label for r in pipeline.run(jobs, max_in_flight=1)]
+
+    assert resultater == ['AB', 'A', 'C']
+    assert sluppet == ['B', 'A', 'C']
@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pandas as pd
+from sensorplot.cli import main as cli_main
+from sensorplot.pyramid import (
+    Pyramid, build_store_pyramids, load_store_pyramid, overview, pyramid_path, read_pyramids,
+    read_store_overview, write_pyramids)
+from sensorplot.store import write_store
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_lang_serie(rader=100_000):
+    """Ett-minutts serie med et tydelig topp- og bunnpunkt midt i."""
+    verdier = np.zeros(rader)
+    verdier[rader // 2] = 100.0
+    verdier[rader // 2 + 1] = -50.0
+    return pd.DataFrame({
+        'Datetime': pd.date_range('2020-01-01', periods=rader, freq='min'),
+        'Resultat': verdier,
+    })
+
+def lag_serie_med_hull(rader=100_000):
+    """To like lange biter med minuttdata og fire uker uten målinger mellom."""
+    df = lag_lang_serie(rader)
+    df.loc[rader // 2:, 'Datetime'] += pd.Timedelta('28D')
+    return df
+
+# ==============================================================================
+#   TEST AV PYRAMIDEINDEKS
+# ==============================================================================
+
+def test_nivaaer_aggregerer_riktig():
+    """Hvert nivå skal ha samme min/max/snitt/antall som en groupby på bøttene."""
+    df = lag_lang_serie(10_000)
+    df.loc[5, 'Resultat'] = np.nan
+    pyramide = Pyramid.from_series(df['Datetime'], df['Resultat'])
+
+    assert len(pyramide.levels) > 1
+    for nivaa in pyramide.levels:
+        bøtte = df['Datetime'].astype('int64') // nivaa.bucket_ns
+        fasit = df['Resultat'].groupby(bøtte).agg(['min', 'max', 'sum', 'count'])
+        assert np.allclose(nivaa.min, fasit['min'])
+        assert np.allclose(nivaa.max, fasit['max'])
+        assert np.allclose(nivaa.sum, fasit['sum'])
+        assert (nivaa.count == fasit['count'].to_numpy()).all()
+
+def test_oversikt_holder_budsjettet_og_beholder_topper():
+    """Oversikten skal ha høyst budsjettet antall punkter, uten å miste ekstremverdier."""
+    df = lag_lang_serie()
+    oversikt = overview(df, 'Resultat', budget=500)
+
+    assert len(oversikt) <= 500
+    assert oversikt['max'].max() == 100.0
+    assert oversikt['min'].min() == -50.0
+    assert oversikt['count'].sum() == len(df)
+
+    # Få rader i vinduet -> rådata brukes direkte
+    assert overview(df.iloc[:100], 'Resultat', budget=500) is None
+
+def test_pyramide_ved_siden_av_lager(tmp_path):
+    """Pyramiden skal kunne lagres/leses, og bygges automatisk for et lager som mangler den."""
+    df = lag_lang_serie().rename(columns={'Resultat': 'ch1'})
+    lager = write_store(tmp_path / "L1.spb", df)
+
+    oversikt = read_store_overview(lager, 'ch1', budget=1000)
+    assert pyramid_path(lager).exists()
+    assert len(oversikt) <= 1000
+    assert oversikt['max'].max() == 100.0
+
+    lest = read_pyramids(write_pyramids(tmp_path / "kopi.pyr.npz", read_pyramids(pyramid_path(lager))))
+    assert [len(n) for n in lest['ch1'].levels] == [len(n) for n in read_pyramids(pyramid_path(lager))['ch1'].levels]
+
+    # Et smalt vindu får plass i budsjettet og leses rått fra lageret
+    smalt = read_store_overview(lager, 'ch1', start='2020-01-01 00:00', end='2020-01-01 00:09', budget=1000)
+    assert len(smalt) == 10
+
+def test_oversikt_brytes_ved_hull(tmp_path):
+    """Oversikten skal ha to segmenter, også etter lagring og lesing av pyramiden."""
+    df = lag_serie_med_hull()
+    pyramide = Pyramid.from_series(df['Datetime'], df['Resultat'])
+    assert len(pyramide.gaps) == 1
+
+    oversikt = pyramide.window(budget=500)
+    assert oversikt['segment'].unique().tolist() == [0, 1]
+    # Bøttene før hullet hører til første segment
+    assert (oversikt.loc[oversikt['segment'] == 0, 'Datetime'] < df['Datetime'].iloc[50_000]).all()
+
+    lest = read_pyramids(write_pyramids(tmp_path / "hull.pyr.npz", {'ch1': pyramide}))['ch1']
+    assert (lest.gaps == pyramide.gaps).all()
+    assert lest.window(budget=500)['segment'].tolist() == oversikt['segment'].tolist()
+
+def test_lagret_pyramide_brukes_ved_plotting(tmp_path, monkeypatch):
+    """En serie rett fra et lager tegnes fra pyramidefilen; en utdatert pyramidefil brukes ikke."""
+    df = lag_lang_serie().rename(columns={'Resultat': 'ch1'})
+    lager = write_store(tmp_path / "L1.spb", df)
+    build_store_pyramids(lager)
+    assert load_store_pyramid(lager, 'ch1') is not None
+    assert load_store_pyramid(lager, 'ch2') is None
+
+    bygget = []
+    original = Pyramid.from_series.__func__
+    monkeypatch.setattr(Pyramid, 'from_series',
+                        classmethod(lambda cls, *a, **kw: bygget.append(1) or original(cls, *a, **kw)))
+    argumenter = ['--files', f'L1={lager}', '--datacol', 'ch1', '--series', 'Nivå=L1.ch1',
+                  '--output', str(tmp_path / "plot.png")]
+
+    cli_main(argumenter)
+    assert bygget == [] and (tmp_path / "plot.png").exists()
+
+    stat = os.stat(lager)
+    os.utime(lager, ns=(stat.st_atime_ns, os.stat(pyramid_path(lager)).st_mtime_ns + 1_000_000_000))
+    assert load_store_pyramid(lager, 'ch1') is None
+    cli_main(argumenter + ['--no-cache'])
+    assert bygget == [1]
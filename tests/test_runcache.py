@@ -0,0 +1,150 @@
+import os
+import pytest
+import pandas as pd
+from pathlib import Path
+import sensorplot.cli as cli_mod
+from sensorplot.cli import main as cli_main
+from sensorplot.runcache import RESULT_CACHE_DIR
+from sensorplot.store import STORE_SUFFIX
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_fil(sti: Path, verdier) -> Path:
+    """Lager en liten loggerfil med én måling per time fra 1. januar 2024."""
+    tider = pd.date_range(start='2024-01-01', periods=len(verdier), freq='h')
+    linjer = ["Date;Time;LEVEL"] + [f"{t:%d.%m.%Y};{t:%H:%M:%S};{v}" for t, v in zip(tider, verdier)]
+    sti.write_text("\n".join(linjer) + "\n", encoding='utf-8')
+    return sti
+
+def lag_argumenter(tmp_path, *ekstra):
+    """To filer og to serier, hver serie fra sin egen fil."""
+    return ['--files', f'A={tmp_path / "a.csv"}', f'B={tmp_path / "b.csv"}',
+            '--datecol', 'Date', '--timecol', 'Time', '--datacol', 'LEVEL',
+            '--series', 'SerieA=A.LEVEL * 2', 'SerieB=B.LEVEL + 1',
+            '--output', str(tmp_path / "plot.png"), *ekstra]
+
+@pytest.fixture
+def tell_plott(monkeypatch):
+    """Teller kall til plot_resultat og hvilke serier som faktisk ble beregnet."""
+    plott, beregnet = [], []
+    original_plot = cli_mod.plot_resultat
+    def plot(results, *args, **kwargs):
+        plott.append([r.label for r in results])
+        return original_plot(results, *args, **kwargs)
+    monkeypatch.setattr(cli_mod, 'plot_resultat', plot)
+
+    original_rapport = cli_mod.report_series_result
+    def rapport(res):
+        beregnet.append(res.label)
+        return original_rapport(res)
+    monkeypatch.setattr(cli_mod, 'report_series_result', rapport)
+    return plott, beregnet
+
+# ==============================================================================
+#   TEST AV KJØRINGSCACHE
+# ==============================================================================
+
+def test_uendret_kjoering_gjenbruker_utfil(tmp_path, tell_plott):
+    """Samme konfigurasjon og filer to ganger skal bare tegne plottet én gang."""
+    plott, beregnet = tell_plott
+    lag_fil(tmp_path / "a.csv", [1, 2, 3])
+    lag_fil(tmp_path / "b.csv", [4, 5, 6])
+
+    cli_main(lag_argumenter(tmp_path))
+    cli_main(lag_argumenter(tmp_path))
+
+    assert len(plott) == 1
+    assert sorted(beregnet) == ['SerieA', 'SerieB']
+
+def test_bare_endret_serie_beregnes_paa_nytt(tmp_path, tell_plott):
+    """Endres én fil, skal bare serien som bruker den beregnes, men plottet tegnes på nytt."""
+    plott, beregnet = tell_plott
+    lag_fil(tmp_path / "a.csv", [1, 2, 3])
+    lag_fil(tmp_path / "b.csv", [4, 5, 6])
+    cli_main(lag_argumenter(tmp_path))
+    beregnet.clear()
+
+    lag_fil(tmp_path / "b.csv", [4, 5, 6, 7])
+    cli_main(lag_argumenter(tmp_path))
+
+    assert beregnet == ['SerieB']
+    assert plott[-1] == ['SerieA', 'SerieB']
+
+def test_endret_tittel_og_no_cache(tmp_path, tell_plott):
+    """Ny tittel tegner på nytt uten ny beregning; --no-cache beregner alt."""
+    plott, beregnet = tell_plott
+    lag_fil(tmp_path / "a.csv", [1, 2, 3])
+    lag_fil(tmp_path / "b.csv", [4, 5, 6])
+    cli_main(lag_argumenter(tmp_path))
+    beregnet.clear()
+
+    cli_main(lag_argumenter(tmp_path, '--tittel', 'Ny tittel'))
+    assert len(plott) == 2 and beregnet == []
+
+    cli_main(lag_argumenter(tmp_path, '--tittel', 'Ny tittel', '--no-cache'))
+    assert len(plott) == 3 and sorted(beregnet) == ['SerieA', 'SerieB']
+
+def test_endring_midt_i_stor_fil_oppdages(tmp_path, tell_plott):
+    """En endring midt i en stor fil som ikke endrer lengden skal gi ny beregning og nytt plott."""
+    plott, beregnet = tell_plott
+    verdier = [1] * 20_000
+    lag_fil(tmp_path / "a.csv", verdier)
+    lag_fil(tmp_path / "b.csv", [4, 5, 6])
+    cli_main(lag_argumenter(tmp_path))
+    beregnet.clear()
+
+    verdier[10_000] = 9
+    sti = lag_fil(tmp_path / "a.csv", verdier)
+    stat = sti.stat()
+    os.utime(sti, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    cli_main(lag_argumenter(tmp_path))
+
+    assert beregnet == ['SerieA']
+    assert len(plott) == 2
+
+def test_minneplan_er_del_av_noekkelen(tmp_path, tell_plott):
+    """Resultater lagret som float32 under et stramt minnebudsjett skal ikke gjenbrukes uten budsjett."""
+    plott, beregnet = tell_plott
+    lag_fil(tmp_path / "a.csv", [1, 2, 3])
+    lag_fil(tmp_path / "b.csv", [4, 5, 6])
+
+    cli_main(lag_argumenter(tmp_path, '--max-memory', '1K'))
+    beregnet.clear()
+    cli_main(lag_argumenter(tmp_path))
+
+    assert sorted(beregnet) == ['SerieA', 'SerieB']
+    assert len(plott) == 2
+
+def test_split_med_paneler_gjenbrukes(tmp_path, monkeypatch):
+    """Med paneler skriver --split én fil per panel; en uendret kjøring skal likevel gjenbruke dem."""
+    lag_fil(tmp_path / "a.csv", [1, 2, 3])
+    lag_fil(tmp_path / "b.csv", [4, 5, 6])
+    tegnet = []
+    original = cli_mod.plot_per_serie
+    def tell(results, *args, **kwargs):
+        tegnet.append([r.label for r in results])
+        return original(results, *args, **kwargs)
+    monkeypatch.setattr(cli_mod, 'plot_per_serie', tell)
+    argumenter = ['--files', f'A={tmp_path / "a.csv"}', f'B={tmp_path / "b.csv"}',
+                  '--datecol', 'Date', '--timecol', 'Time', '--datacol', 'LEVEL',
+                  '--series', '[P1] SerieA=A.LEVEL', '[P2] SerieB=B.LEVEL', '[P2] SerieC=B.LEVEL * 2',
+                  '--split', '--output', str(tmp_path / "plot.png")]
+
+    cli_main(argumenter)
+    cli_main(argumenter)
+
+    assert len(tegnet) == 1
+    assert sorted(p.name for p in tmp_path.glob("plot_*.png")) == ["plot_P1.png", "plot_P2.png"]
+
+def test_ny_versjon_av_serie_skriver_over_resultatet(tmp_path, tell_plott):
+    """Et endret resultat for samme serie skal erstatte det gamle i cachen, ikke legges ved siden av."""
+    lag_fil(tmp_path / "a.csv", [1, 2, 3])
+    lag_fil(tmp_path / "b.csv", [4, 5, 6])
+    for verdier in ([4, 5, 6, 7], [4, 5, 6, 7, 8]):
+        cli_main(lag_argumenter(tmp_path))
+        lag_fil(tmp_path / "b.csv", verdier)
+    cli_main(lag_argumenter(tmp_path))
+
+    assert len(list((tmp_path / "cache" / RESULT_CACHE_DIR).glob(f"*{STORE_SUFFIX}"))) == 2
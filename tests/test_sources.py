@@ -0,0 +1,112 @@
+import os
+import time
+import pytest
+import pandas as pd
+from pathlib import Path
+import sensorplot.sources as sources_mod
+from sensorplot.cli import main as cli_main
+from sensorplot.cache import CACHE_MAX_AGE_DAYS
+from sensorplot.sources import FILE_CACHE_DIR, expand_source, load_source
+from sensorplot.store import STORE_SUFFIX
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_ukefil(mappe: Path, navn: str, start: str, verdier) -> Path:
+    """Lager en liten loggerfil (semikolon, desimalkomma) med én måling per time."""
+    tider = pd.date_range(start=start, periods=len(verdier), freq='h')
+    linjer = ["Date;Time;LEVEL"] + [
+        f"{t:%d.%m.%Y};{t:%H:%M:%S};{str(float(v)).replace('.', ',')}" for t, v in zip(tider, verdier)
+    ]
+    sti = mappe / navn
+    sti.write_text("\n".join(linjer) + "\n", encoding='utf-8')
+    return sti
+
+# ==============================================================================
+#   TEST AV GLOB- OG MAPPEKILDER
+# ==============================================================================
+
+def test_mappe_og_glob_gir_samme_filer(tmp_path):
+    """En mappe tar med alle støttede filer; et mønster bare de som matcher."""
+    lag_ukefil(tmp_path, "uke_02.csv", '2024-01-08', [1])
+    lag_ukefil(tmp_path, "uke_01.csv", '2024-01-01', [1])
+    (tmp_path / "notater.txt").write_text("ikke data")
+
+    assert [p.name for p in expand_source(tmp_path)] == ["uke_01.csv", "uke_02.csv"]
+    assert [p.name for p in expand_source(tmp_path / "uke_01*")] == ["uke_01.csv"]
+    with pytest.raises(FileNotFoundError, match="Fant ingen filer"):
+        expand_source(tmp_path / "*.xlsx")
+
+def test_filer_syes_sammen_sortert(tmp_path):
+    """Filene skal bli én sortert serie; overlappende timer tas fra den nyeste filen."""
+    lag_ukefil(tmp_path, "b.csv", '2024-01-01 02:00', [30, 40])
+    lag_ukefil(tmp_path, "a.csv", '2024-01-01 00:00', [10, 20, 99])
+
+    df = load_source(tmp_path / "*.csv", 'L1', 'Date', 'Time', 'LEVEL')
+
+    assert list(df.columns) == ['Datetime', 'L1.LEVEL']
+    assert df['Datetime'].is_monotonic_increasing
+    assert df['L1.LEVEL'].tolist() == [10, 20, 30, 40]
+
+def test_bare_endrede_filer_tolkes_paa_nytt(tmp_path, monkeypatch):
+    """Andre lasting skal bare tolke filen som er endret; resten kommer fra cache."""
+    lag_ukefil(tmp_path, "uke_01.csv", '2024-01-01', [1, 2])
+    lag_ukefil(tmp_path, "uke_02.csv", '2024-01-08', [3, 4])
+    load_source(tmp_path, 'L1', 'Date', 'Time', 'LEVEL')
+
+    tolket = []
+    original = sources_mod.last_og_rens_data
+    def tell(path, *args, **kwargs):
+        tolket.append(Path(path).name)
+        return original(path, *args, **kwargs)
+    monkeypatch.setattr(sources_mod, 'last_og_rens_data', tell)
+
+    lag_ukefil(tmp_path, "uke_02.csv", '2024-01-08', [3, 4, 5])
+    df = load_source(tmp_path, 'L1', 'Date', 'Time', 'LEVEL')
+
+    assert tolket == ["uke_02.csv"]
+    assert df['L1.LEVEL'].tolist() == [1, 2, 3, 4, 5]
+
+def test_endring_midt_i_stor_fil_tolkes_paa_nytt(tmp_path):
+    """En endring som ikke endrer lengden (1,0 -> 9,0) midt i en stor fil skal ikke gi cachet resultat."""
+    verdier = [1.0] * 20_000
+    lag_ukefil(tmp_path, "a1.csv", '2024-01-01', verdier)
+    assert load_source(tmp_path / "a*.csv", 'L1', 'Date', 'Time', 'LEVEL')['L1.LEVEL'].max() == 1.0
+
+    verdier[10_000] = 9.0
+    sti = lag_ukefil(tmp_path, "a1.csv", '2024-01-01', verdier)
+    stat = sti.stat()
+    os.utime(sti, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert load_source(tmp_path / "a*.csv", 'L1', 'Date', 'Time', 'LEVEL')['L1.LEVEL'].max() == 9.0
+
+def test_ny_versjon_skriver_over_cache(tmp_path):
+    """En fil som vokser for hver eksport skal ha én cache-fil, ikke én per versjon; gamle filer ryddes."""
+    kilde = tmp_path / "data"
+    kilde.mkdir()
+    cache = tmp_path / "cache" / FILE_CACHE_DIR
+    cache.mkdir(parents=True)
+    gammel = cache / f"foreldet{STORE_SUFFIX}"
+    gammel.write_bytes(b"x")
+    for_lenge_siden = time.time() - (CACHE_MAX_AGE_DAYS + 1) * 86400
+    os.utime(gammel, (for_lenge_siden, for_lenge_siden))
+
+    for timer in range(2, 6):
+        lag_ukefil(kilde, "uke_01.csv", '2024-01-01', list(range(timer)))
+        assert len(load_source(kilde, 'L1', 'Date', 'Time', 'LEVEL')) == timer
+
+    assert not gammel.exists()
+    assert len(list(cache.glob(f"*{STORE_SUFFIX}"))) == 1
+
+def test_cli_med_glob_alias(tmp_path):
+    """Et glob-mønster skal kunne brukes som fil i CLI, med tidsvindu."""
+    lag_ukefil(tmp_path, "uke_01.csv", '2024-01-01', [1, 2, 3])
+    lag_ukefil(tmp_path, "uke_02.csv", '2024-01-08', [4, 5, 6])
+    utfil = tmp_path / "plot.png"
+
+    cli_main(['--files', f'L1={tmp_path / "uke_*.csv"}', '--datecol', 'Date', '--timecol', 'Time',
+              '--datacol', 'LEVEL', '--series', 'Nivå=L1.LEVEL', '--from', '2024-01-05',
+              '--output', str(utfil)])
+
+    assert utfil.exists()
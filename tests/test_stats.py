@@ -0,0 +1,63 @@
+import pytest
+import numpy as np
+import pandas as pd
+from sensorplot.core import FLAG_COLUMN, SensorResult
+from sensorplot.stats import compute_stats, parse_period, series_stats, write_stats
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_serie(dager=3, freq='h'):
+    """Timesmålinger med verdien 0..23 hver dag, så statistikken per døgn er kjent."""
+    tider = pd.date_range('2024-01-01', periods=dager * 24, freq=freq)
+    return pd.DataFrame({'Datetime': tider, 'Resultat': tider.hour.astype(float)})
+
+# ==============================================================================
+#   TEST AV STATISTIKK PER PERIODE
+# ==============================================================================
+
+def test_dognstatistikk_som_pandas():
+    """Min/max/snitt/persentiler per døgn skal stemme med resample + quantile."""
+    df = lag_serie()
+    stats = series_stats(df, parse_period('D'))
+
+    fasit = df.set_index('Datetime')['Resultat'].resample('D')
+    assert stats['Periode'].tolist() == list(fasit.mean().index)
+    assert stats['mean'].tolist() == fasit.mean().tolist()
+    assert np.allclose(stats['p95'], fasit.quantile(0.95))
+    assert stats[['min', 'max', 'count', 'coverage']].iloc[0].tolist() == [0.0, 23.0, 24, 100.0]
+
+def test_dekning_og_flagg():
+    """Et halvt døgn uten data gir 50 % dekning; flaggede målinger telles ikke."""
+    df = lag_serie()
+    df = df[(df['Datetime'] < '2024-01-02 00:00') | (df['Datetime'] >= '2024-01-02 12:00')].copy()
+    df[FLAG_COLUMN] = np.uint8(0)
+    df.loc[df['Resultat'] == 23, FLAG_COLUMN] = 1
+
+    stats = series_stats(df, parse_period('D'))
+
+    assert stats['coverage'].tolist() == pytest.approx([23 / 24 * 100, 11 / 24 * 100, 23 / 24 * 100])
+    assert stats['max'].max() == 22.0
+
+def test_uker_starter_mandag_og_tomme_perioder_tas_med():
+    """'W' gir uker fra mandag; en uke uten målinger får dekning 0."""
+    df = pd.concat([lag_serie(2), lag_serie(2).assign(Datetime=lambda d: d['Datetime'] + pd.Timedelta('14D'))])
+    stats = series_stats(df, parse_period('W'))
+
+    assert [p.day_name() for p in stats['Periode']] == ['Monday'] * 3
+    assert stats['count'].tolist() == [48, 0, 48]
+    assert stats['coverage'].iloc[1] == 0 and np.isnan(stats['mean'].iloc[1])
+
+def test_flere_serier_til_fil(tmp_path):
+    """Alle seriene havner i én tabell som kan skrives som CSV og Parquet."""
+    results = [SensorResult('A', lag_serie()), SensorResult('B', lag_serie(1))]
+    stats = compute_stats(results, 'D')
+    assert stats.groupby('Serie').size().to_dict() == {'A': 3, 'B': 1}
+
+    pd.testing.assert_frame_equal(pd.read_parquet(write_stats(stats, tmp_path / "s.parquet")), stats)
+    assert len(pd.read_csv(write_stats(stats, tmp_path / "s.csv"))) == 4
+    with pytest.raises(ValueError):
+        write_stats(stats, tmp_path / "s.xlsx")
+    with pytest.raises(ValueError):
+        parse_period('hver tirsdag')
@@ -0,0 +1,73 @@
+import pytest
+import pandas as pd
+from sensorplot.stitch import stitch_sorted
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_serie(start, verdier, freq='h'):
+    """Lager en tidssortert DataFrame med én verdi per tidssteg."""
+    return pd.DataFrame({
+        'Datetime': pd.date_range(start=start, periods=len(verdier), freq=freq),
+        'Resultat': [float(v) for v in verdier]
+    })
+
+# ==============================================================================
+#   TEST AV SAMMENSYING (K-veis fletting)
+# ==============================================================================
+
+def test_ikke_overlappende_stykker_legges_etter_hverandre():
+    """Stykker uten overlapp skal bare legges etter hverandre i tidsrekkefølge."""
+    df_2024 = lag_serie('2024-01-01', [3, 4])
+    df_2023 = lag_serie('2023-01-01', [1, 2])
+
+    resultat = stitch_sorted([df_2024, df_2023])
+
+    assert resultat['Datetime'].is_monotonic_increasing
+    assert resultat['Resultat'].tolist() == [1, 2, 3, 4]
+
+def test_overlapp_nyeste_vinner():
+    """Med 'newest' skal stykket som starter senest overstyre det eldre i sitt tidsrom."""
+    gammel = lag_serie('2024-01-01 00:00', [1, 1, 1, 1, 1])   # 00:00 - 04:00
+    ny = lag_serie('2024-01-01 02:00', [9, 9, 9, 9])          # 02:00 - 05:00
+
+    resultat = stitch_sorted([ny, gammel], overlap='newest')
+
+    assert resultat['Resultat'].tolist() == [1, 1, 9, 9, 9, 9]
+    assert resultat['Datetime'].is_unique
+
+def test_overlapp_gjennomsnitt():
+    """Med 'average' skal like tidspunkter slås sammen til gjennomsnittet."""
+    a = lag_serie('2024-01-01 00:00', [2, 2, 2])
+    b = lag_serie('2024-01-01 01:00', [4, 4, 4])
+
+    resultat = stitch_sorted([a, b], overlap='average')
+
+    assert resultat['Resultat'].tolist() == [2, 3, 3, 4]
+
+def test_gjennomsnitt_slaar_sammen_flagg():
+    """Ved snitt av like tidspunkter er resultatet flagget hvis én av radene var det."""
+    a = lag_serie('2024-01-01 00:00', [10, 20])
+    b = lag_serie('2024-01-01 01:00', [30, 40])
+    a['Flagg'], b['Flagg'] = [0, 1], [4, 0]
+
+    resultat = stitch_sorted([a, b], overlap='average')
+
+    assert resultat['Resultat'].tolist() == [10, 25, 40]
+    assert resultat['Flagg'].tolist() == [0, 5, 0]
+
+def test_overlapp_fjern_duplikater_fletter_lineaert():
+    """Med 'drop_duplicates' skal tidspunktene flettes og første forekomst beholdes."""
+    a = lag_serie('2024-01-01 00:00', [1, 1, 1], freq='2h')   # 00, 02, 04
+    b = lag_serie('2024-01-01 01:00', [2, 2, 2], freq='2h')   # 01, 03, 05
+    c = lag_serie('2024-01-01 04:00', [3, 3])                 # 04, 05
+
+    resultat = stitch_sorted([a, b, c], overlap='drop_duplicates')
+
+    assert resultat['Datetime'].dt.hour.tolist() == [0, 1, 2, 3, 4, 5]
+    assert resultat['Resultat'].tolist() == [1, 2, 1, 2, 1, 2]
+
+def test_ukjent_overlapp_regel():
+    with pytest.raises(ValueError):
+        stitch_sorted([lag_serie('2024-01-01', [1])], overlap='tull')
@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+from sensorplot.core import last_og_rens_data
+from sensorplot.store import SeriesStore, read_header, read_store, write_store
+from sensorplot.cli import main as cli_main
+
+# ==============================================================================
+#   TEST AV LAGER (.spb)
+# ==============================================================================
+
+def lag_logger_df(rader=1000):
+    return pd.DataFrame({
+        'Datetime': pd.date_range(start='2024-01-01', periods=rader, freq='min'),
+        'ch1': np.arange(rader, dtype=float),
+        'ch2': np.full(rader, 7.5),
+    })
+
+def test_skriv_og_les_lager(tmp_path):
+    """Lageret skal gi tilbake nøyaktig samme tid og kanaler som ble skrevet."""
+    df = lag_logger_df()
+    sti = write_store(tmp_path / "L1.spb", df, meta={'alias': 'L1'})
+
+    header = read_header(sti)
+    assert header['rows'] == 1000
+    assert header['channels'] == ['ch1', 'ch2']
+    assert header['meta']['alias'] == 'L1'
+
+    lest = read_store(sti)
+    pd.testing.assert_frame_equal(lest, df)
+
+def test_tidsvindu_leser_bare_utsnitt(tmp_path):
+    """Et tidsvindu skal gi bare radene innenfor, som visning inn i memmap (uten kopi)."""
+    sti = write_store(tmp_path / "L1.spb", lag_logger_df())
+
+    lager = SeriesStore(sti)
+    utsnitt = lager.to_frame(['ch1'], start='2024-01-01 01:00', end='2024-01-01 01:09')
+
+    assert len(utsnitt) == 10
+    assert utsnitt['ch1'].iloc[0] == 60.0
+    assert np.shares_memory(utsnitt['ch1'].to_numpy(), lager.channel('ch1'))
+
+def test_last_og_rens_data_kjenner_igjen_lager(tmp_path):
+    """last_og_rens_data skal lese .spb som et tredje format ved siden av .xlsx/.csv."""
+    sti = write_store(tmp_path / "L1.spb", lag_logger_df())
+
+    df = last_og_rens_data(sti, "L1", "Date5", "Time6", "ch2")
+
+    assert df.columns.tolist() == ['Datetime', 'L1.ch2']
+    assert df['L1.ch2'].iloc[0] == 7.5
+
+def test_ingest_kommando(tmp_path):
+    """'sensorplot ingest' skal konvertere en CSV til lager med alle numeriske kanaler."""
+    csv = tmp_path / "logger.csv"
+    csv.write_text("Serial: 1\nDate;Time;LEVEL;TEMP\n10.05.2024;12:00:00;10,5;4,0\n10.05.2024;12:30:00;10,6;4,1\n",
+                   encoding='latin1')
+
+    cli_main(['ingest', '--files', f'L1={csv}', '--out', str(tmp_path / 'arkiv'),
+              '--datecol', 'Date', '--timecol', 'Time'])
+
+    df = read_store(tmp_path / 'arkiv' / 'L1.spb')
+    assert df.columns.tolist() == ['Datetime', 'LEVEL', 'TEMP']
+    assert df['LEVEL'].tolist() == [10.5, 10.6]
+    assert df['Datetime'].iloc[0].day == 10
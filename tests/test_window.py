@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+import numpy as np
+from sensorplot.core import last_og_rens_data
+from sensorplot.window import csv_byte_vindu, tolk_tidsgrense
+
+# ==============================================================================
+#   HJELPEFUNKSJONER
+# ==============================================================================
+
+def lag_stor_norsk_csv(path, perioder=20000, stokk=False):
+    """Lager en 'Norsk' loggerfil med 10-minutters data (ca. 4,5 måneder)."""
+    tider = pd.date_range(start='2024-01-01', periods=perioder, freq='10min')
+    verdier = np.arange(perioder) / 10
+    rekkefolge = np.random.default_rng(1).permutation(perioder) if stokk else np.arange(perioder)
+    linjer = [
+        f"{tider[i].strftime('%d.%m.%Y;%H:%M:%S')};{str(verdier[i]).replace('.', ',')}"
+        for i in rekkefolge
+    ]
+    with open(path, 'w', encoding='latin1') as f:
+        f.write("Serial number: 1\nDate;Time;LEVEL\n" + "\n".join(linjer) + "\n")
+    return path
+
+# ==============================================================================
+#   TEST AV TIDSVINDU
+# ==============================================================================
+
+def test_tolk_tidsgrense_ren_dato_som_slutt():
+    """En ren dato som sluttgrense skal ta med hele dagen."""
+    assert tolk_tidsgrense("2024-01-31", slutt=True) == pd.Timestamp("2024-01-31 23:59:59.999999999")
+    assert tolk_tidsgrense("2024-01-31 12:00", slutt=True) == pd.Timestamp("2024-01-31 12:00")
+    assert tolk_tidsgrense(None) is None
+
+def test_tolk_tidsgrense_norsk_dato_er_dag_foerst():
+    """'01.03.2024' er 1. mars, ikke 3. januar; også med klokkeslett og som sluttgrense."""
+    assert tolk_tidsgrense("01.03.2024") == pd.Timestamp("2024-03-01")
+    assert tolk_tidsgrense("1.3.2024 06:30") == pd.Timestamp("2024-03-01 06:30")
+    assert tolk_tidsgrense("01.03.2024 06:30:15") == pd.Timestamp("2024-03-01 06:30:15")
+    assert tolk_tidsgrense("31.01.2024", slutt=True) == pd.Timestamp("2024-01-31 23:59:59.999999999")
+    assert tolk_tidsgrense("01.03.2024 12:00", slutt=True) == pd.Timestamp("2024-03-01 12:00")
+
+    for ugyldig in ["31.02.2024", "01.03.24", "01.03.2024 kl 12"]:
+        with pytest.raises(ValueError):
+            tolk_tidsgrense(ugyldig)
+
+def test_csv_tidsvindu_leser_bare_utsnitt(tmp_path):
+    """
+    For en sortert CSV skal binærsøket bare lese en liten del av filen,
+    og resultatet skal være identisk med å filtrere hele filen.
+    """
+    sti = lag_stor_norsk_csv(tmp_path / "logger.csv")
+    start, end = pd.Timestamp('2024-02-01'), pd.Timestamp('2024-02-07 23:59')
+
+    vindu = csv_byte_vindu(sti, 'latin1', 1, ';', 'Date', 'Time', True, start, end)
+    assert vindu is not None
+    _, fra, til = vindu
+    assert (til - fra) < sti.stat().st_size / 5
+
+    hel = last_og_rens_data(sti, "L", "Date", "Time", "LEVEL")
+    forventet = hel[(hel['Datetime'] >= start) & (hel['Datetime'] <= end)]
+    utsnitt = last_og_rens_data(sti, "L", "Date", "Time", "LEVEL", start=start, end=end)
+
+    assert len(utsnitt) == len(forventet) == 7 * 144
+    assert utsnitt['L.LEVEL'].tolist() == forventet['L.LEVEL'].tolist()
+
+def test_csv_tidsvindu_usortert_fil_faller_tilbake(tmp_path):
+    """En usortert fil skal leses helt, men fortsatt gi riktig tidsvindu."""
+    sti = lag_stor_norsk_csv(tmp_path / "usortert.csv", perioder=2000, stokk=True)
+    start, end = pd.Timestamp('2024-01-05'), pd.Timestamp('2024-01-06')
+
+    assert csv_byte_vindu(sti, 'latin1', 1, ';', 'Date', 'Time', True, start, end) is None
+
+    utsnitt = last_og_rens_data(sti, "L", "Date", "Time", "LEVEL", start=start, end=end)
+    assert len(utsnitt) == 145
+    assert utsnitt['Datetime'].is_monotonic_increasing